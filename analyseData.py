@@ -7,101 +7,53 @@ from dash import Dash, html, dcc
 import dash_bootstrap_components as dbc
 import plotly.express as px
 import pandas as pd
-from dash import html, dcc, Input, Output, State, callback
-import google.generativeai as genai
+from dash import html, dcc, Input, Output, State, callback, ctx
+from dash.exceptions import PreventUpdate
 import joblib
 import numpy as np
-import shap
 import os
-
-
-
-
-# Load data
-import pandas as pd 
-demographic_df = pd.read_csv('data/demographics.csv')
-academic_df = pd.read_csv('data/academicPerformance.csv')
-activities_df = pd.read_csv('data/extracurricularActivities.csv')
-behavior_df = pd.read_csv('data/behavioralPatterns.csv')
-
-
-
-
-demographic_df.head()
-
-
-
-
-academic_df
-
-
-
-
-activities_df
-
-
-
-behavior_df
-
-
-
-
-# Rename ID columns to StudentID for consistency
-demographic_df.rename(columns={'ID': 'StudentID'}, inplace=True)
-academic_df.rename(columns={'Student ID': 'StudentID'}, inplace=True)
-
-
-
-
-merged_df = demographic_df.merge(academic_df, on='StudentID') \
-                          .merge(activities_df, on='StudentID') \
-                          .merge(behavior_df, on='StudentID')
-
-
-
-pd.set_option('display.max_columns', None)
-merged_df.head()
-
-
-
-
-merged_df.shape
-
-
-
-
-print("Duplicated rows:",merged_df.duplicated().sum())
-
-
-
-
-missing_representations = ['NA', 'N/A', '', 'na', 'n/a', 'NaN']
-missing_check = merged_df.isin(missing_representations) | merged_df.isnull()
-missing_summary = missing_check.sum().sort_values(ascending=False)
-print("Missing values per column (including text forms):\n", missing_summary[missing_summary > 0])
-
-
-
-
-cat_columns = merged_df.select_dtypes(include="object").columns
-print("\n🔤 Categorical column unique values:")
-for col in cat_columns:
-    print(f"- {col}: {merged_df[col].nunique()} unique values")
-
-
-
-# Student with missing grades 
-merged_df['Missing grades'] = merged_df[['Python', 'HCD', 'Communication']].isnull().any(axis=1)
-
-
-
-# How many student missing grades for each course
-merged_df[['Python', 'HCD', 'Communication']].isnull().sum()
-
-
-
-# Students who missed all the tests 
-merged_df[merged_df[['Python', 'HCD', 'Communication']].isnull().all(axis=1)]
+from figureScaling import register_scatter_zoom, SCATTER_SPECS
+from figureRegistry import warm_up, build_figure, FIGURE_SPECS
+from summaryStats import summary_box_figure
+from responseCaching import asset_src, install_response_caching
+from metrics import timed, install_metrics_route
+from studentData import load_sources, merge_sources, add_derived_columns, GRADE_COLS
+from jobQueue import make_job_manager, model_version
+from queryBackend import make_backend
+from studentIndex import StudentIndex
+from sharedDataset import attach_dataset
+from llmBackend import make_llm
+from queryPlan import answer_question
+from streamingStats import correlation_state, card_state, sketch_state
+from predictionCache import PredictionCache
+from shapInteractions import ShapInteractions, stored_interactions
+from shapSampling import estimate_importance, use_approximation, CONFIDENCE
+from timePyramid import TimePyramid
+from trainModel import encode_features as train_encode_features
+from driftMonitor import DriftReference, record_drift, REFERENCE_PATH, STATUS_COLORS, PSI_MODERATE, PSI_SIGNIFICANT
+
+
+
+
+# Under gunicorn the master loads the data once into shared memory and the
+# workers attach it read-only (see gunicorn.conf.py and sharedDataset)
+shared_dataset = attach_dataset()
+if shared_dataset is None:
+    # Load data (ID columns are renamed to StudentID for consistency)
+    demographic_df, academic_df, activities_df, behavior_df = load_sources()
+
+    # StudentID -> row ranges over the sorted source tables, for the drill-down
+    student_index = StudentIndex.from_sources(demographic_df, academic_df, activities_df, behavior_df)
+
+    merged_df = merge_sources(demographic_df, academic_df, activities_df, behavior_df)
+
+    # Numeric grades, grade summaries and calendar columns (see studentData.add_derived_columns)
+    add_derived_columns(merged_df)
+else:
+    merged_df, student_index = shared_dataset
+
+# Group-by aggregates run in pandas or as SQL on a shared SQLite file (DATA_BACKEND)
+backend = make_backend(merged_df)
 
 
 # #### Problem statement
@@ -136,32 +88,26 @@ merged_df[merged_df[['Python', 'HCD', 'Communication']].isnull().all(axis=1)]
 
 
 
-grade_map = {'A':4.0, 'A-':3.7, 'B+':3.3, 'B':3.0, 'B-':2.7, 'C+':2.3, 'C':2.0, 'N/A': None}
-grade_cols = ['Javascript', 'Python', 'HCD', 'Communication']
-for col in grade_cols:
-    merged_df[col + '_num'] = merged_df[col].map(grade_map)
-
+grade_cols = GRADE_COLS
 
 
-# Melt for some visuals
-melted = merged_df.melt(id_vars=['StudentID', 'Course Completion'], 
-                 value_vars=[col + '_num' for col in grade_cols], 
-                 var_name='Course', value_name='Grade')
-melted['Course'] = melted['Course'].str.replace('_num', '')
+# Grade quantile sketches per course and completion status for the distribution
+# charts; kept per data partition and mergeable across cohorts (see streamingStats)
+grade_sketches = sketch_state(merged_df).relabel({col + '_num': col for col in grade_cols})
 
 
 
 
-def GradeBoxplot(melted_df):
+def GradeBoxplot(grades):
     """
     Creates a styled boxplot figure for grade distribution across courses.
-    melted_df: DataFrame with columns 'Course', 'Grade'
+    grades: DataFrame with columns 'Course', 'Grade', or QuantileSketches of the course grades
     """
     # Define your custom colors for courses
     custom_colors = ['#55c3c7', '#744674', '#684c64']
 
-    fig_box = px.box(
-        melted_df,
+    fig_box = summary_box_figure(
+        grades,
         x='Course',
         y='Grade',
         color='Course',
@@ -211,935 +157,6 @@ def GradeBoxplot(melted_df):
 
 
 
-# Grade variance per student
-merged_df['Grade Std Dev'] = merged_df[[col + '_num' for col in grade_cols]].std(axis=1)
-fig_std = px.histogram(
-    merged_df,
-    x='Grade Std Dev',
-    nbins=10,
-    title='Grade Consistency (Std Dev) per Student',
-    color_discrete_sequence=['#744674'] 
-)
-
-# Apply custom layout styling
-fig_std.update_layout(
-    plot_bgcolor='#f7f7f7', 
-    paper_bgcolor='#f9f9f9', 
-    font=dict(
-        family="Arial",
-        size=14,
-        color="#333333"
-    ),
-    title_font=dict(
-        size=20,
-        color="#2c3e50"
-    ),
-    xaxis=dict(
-        title='Standard Deviation of Grades',
-        gridcolor='#e0e0e0',
-        linecolor='#2c3e50',
-        zerolinecolor='#cccccc'
-    ),
-    yaxis=dict(
-        title='Number of Students',
-        gridcolor='#e0e0e0',
-        linecolor='#2c3e50',
-        zerolinecolor='#cccccc'
-    ),
-    bargap=0.1,
-)
-
-
-
-# Count missing grades per student
-merged_df['Missing Grades'] = merged_df[[col + '_num' for col in grade_cols]].isna().sum(axis=1)
-
-# Create histogram with custom color
-fig_missing = px.histogram(
-    merged_df,
-    x='Missing Grades',
-    title='Number of Missing Grades per Student',
-    color_discrete_sequence=['#55c3c7']
-)
-
-# Apply custom styling
-fig_missing.update_layout(
-    plot_bgcolor='#f7f7f7',
-    paper_bgcolor='#ffffff', 
-    font=dict(
-        family="Arial",
-        size=14,
-        color="#333333"
-    ),
-    title_font=dict(
-        size=20,
-        color="#2c3e50"
-    ),
-    xaxis=dict(
-        title='Missing Grade Count',
-        gridcolor='#e0e0e0',
-        linecolor='#2c3e50',
-        zerolinecolor='#cccccc'
-    ),
-    yaxis=dict(
-        title='Number of Students',
-        gridcolor='#e0e0e0',
-        linecolor='#2c3e50',
-        zerolinecolor='#cccccc'
-    ),
-    bargap=0.1,
-)
-
-
-
-
-# Completion status comparison
-fig_violin = px.violin(
-    melted,
-    x='Course',
-    y='Grade',
-    color='Course Completion',  # categorical color
-    box=True,
-    points='all',
-    title='Grade Comparison by Course Completion Status',
-    color_discrete_sequence=['#744674', '#55c3c7']  # customize for each category
-)
-
-# Apply custom layout styling
-fig_violin.update_layout(
-    plot_bgcolor='#f7f7f7',       # Inside the plot area
-    paper_bgcolor='#ffffff',      # Outside the plot area
-    font=dict(
-        family="Arial",
-        size=14,
-        color="#333333"
-    ),
-    title_font=dict(
-        size=20,
-        color="#2c3e50"
-    ),
-    xaxis=dict(
-        title='Course',
-        gridcolor='#e0e0e0',
-        linecolor='#2c3e50',
-        zerolinecolor='#cccccc'
-    ),
-    yaxis=dict(
-        title='Grade',
-        gridcolor='#e0e0e0',
-        linecolor='#2c3e50',
-        zerolinecolor='#cccccc'
-    )
-)
-
-
-# Behavioral
-
-
-
-# correlation between time spent on materials and academic performance.
-# Calculate average grade
-merged_df['Average Grade'] = merged_df[[col + '_num' for col in ['Javascript', 'Python', 'HCD', 'Communication']]].mean(axis=1)
-
-# Create scatter plot
-fig_time = px.scatter(
-    merged_df,
-    x='Time Spent On Materials (Hours)',
-    y='Average Grade',
-    trendline='ols',
-    title='Study Time vs Academic Performance',
-    hover_data=['StudentID'],
-    color_discrete_sequence=['#1f77b4']  # Optional: single point color
-)
-
-# Customize layout (backgrounds, gridlines, etc.)
-fig_time.update_layout(
-    paper_bgcolor='#f8f9fa',   # Full background (outside plot)
-    plot_bgcolor='#ffffff',    # Inside plot area background
-    title_font_color='black',
-    font=dict(color='black'),
-    xaxis=dict(
-        title='Time Spent On Materials (Hours)',
-        gridcolor='#e0e0e0',
-        linecolor='black',
-        zerolinecolor='black'
-    ),
-    yaxis=dict(
-        title='Average Grade',
-        gridcolor='#e0e0e0',
-        linecolor='black',
-        zerolinecolor='black'
-    )
-)
-
-# Customize marker style if needed
-fig_time.update_traces(marker=dict(size=10, color='#55c3c7'))
-
-# Show figure
-
-
-
-
-# Forum Engagement Impact
-# Understand if forum participation (posts + time) leads to better grades. 
-fig_forum = px.scatter(
-    merged_df,
-    x='Forum Posts',
-    y='Average Grade',
-    size='Time Spent On Forum (Hours)',
-    color='Course Completion',  # This will automatically get a color scale
-    title='Forum Engagement vs Academic Performance',
-    hover_data=['StudentID'],
-    color_discrete_sequence=['#55c3c7', '#744674']  # customize if categorical
-)
-
-# Customize layout (backgrounds, fonts, axes)
-fig_forum.update_layout(
-    paper_bgcolor='#f0f0f0',   # Full figure background
-    plot_bgcolor='#ffffff',    # Plot area background
-    title_font_color='black',
-    font=dict(color='black', size=14),
-    xaxis=dict(
-        title='Forum Posts',
-        gridcolor='#dcdcdc',
-        linecolor='black',
-        zerolinecolor='black',
-        # tickfont=dict(color='black'),
-        # titlefont=dict(color='black')
-    ),
-    yaxis=dict(
-        title='Average Grade',
-        gridcolor='#dcdcdc',
-        linecolor='black',
-        zerolinecolor='black',
-        # tickfont=dict(color='black'),
-        # titlefont=dict(color='black')
-    ),
-    legend=dict(
-        bgcolor='#f0f0f0',
-        bordercolor='gray',
-        borderwidth=1,
-        font=dict(color='black')
-    )
-)
-
-# Optional: Change marker styling globally
-fig_forum.update_traces(marker=dict(line=dict(width=1, color='black')))
-
-# Show the figure
-
-
-
-
-# Communication Patterns (Instructor Messages)
-# Analyze how communication with instructors relates to grades.
-fig_msgs = px.scatter(
-    merged_df,
-    x='Instructor Messages',
-    y='Average Grade',
-    title='Instructor Messages vs Academic Performance',
-    hover_data=['StudentID'],
-    color_discrete_sequence=['#744674']  # Customize point color here
-)
-
-fig_msgs.update_layout(
-    paper_bgcolor='#fafafa',   # Figure background (outside plot)
-    plot_bgcolor='#ffffff',    # Plot area background
-    title_font_color='#264653',
-    font=dict(color='#264653', size=14),
-    xaxis=dict(
-        title='Instructor Messages',
-        gridcolor='#e0e0e0',
-        linecolor='#264653',
-        zerolinecolor='#264653',
-        # tickfont=dict(color='#264653'),
-        # titlefont=dict(color='#264653')
-    ),
-    yaxis=dict(
-        title='Average Grade',
-        gridcolor='#e0e0e0',
-        linecolor='#264653',
-        zerolinecolor='#264653',
-        # tickfont=dict(color='#264653'),
-        # titlefont=dict(color='#264653')
-    )
-)
-
-fig_msgs.update_traces(marker=dict(size=10, line=dict(width=1, color='#264653')))
-
-
-
-
-
-# Assignment Completion Patterns 
-# Show patterns between assignment completion and grades. 
-fig_assign = px.scatter(
-    merged_df,
-    x='Completed Assignments',
-    y='Average Grade',
-    title='Assignment Completion vs Academic Performance',
-    hover_data=['StudentID'],
-    color_discrete_sequence=['#2a9d8f']  # Customize marker color here
-)
-
-fig_assign.update_layout(
-    paper_bgcolor='#f7f9f9',   # Figure background (outside plot)
-    plot_bgcolor='#ffffff',    # Plot area background
-    title_font_color='#264653',
-    font=dict(color='#264653', size=14),
-    xaxis=dict(
-        title='Completed Assignments',
-        gridcolor='#d3d3d3',
-        linecolor='#264653',
-        zerolinecolor='#264653',
-        # tickfont=dict(color='#264653'),
-        # titlefont=dict(color='#264653')
-    ),
-    yaxis=dict(
-        title='Average Grade',
-        gridcolor='#d3d3d3',
-        linecolor='#264653',
-        zerolinecolor='#264653',
-        # tickfont=dict(color='#264653'),
-        # titlefont=dict(color='#264653')
-    )
-)
-
-fig_assign.update_traces(marker=dict(size=9, line=dict(width=1, color='#264653')))
-
-
-
-# Performance Gap Identification
-
-
-
-# how demographic groups relate to academic performance (average or per-course grades).
-fig_gender = px.box(
-    merged_df,
-    x='Gender',
-    y='Average Grade',
-    title='Gender vs Academic Performance',
-    color='Gender',  # color boxes by gender
-    color_discrete_map={'Male': '#55c3c7', 'Female': '#643464'},  # customize colors
-)
-
-fig_gender.update_layout(
-    paper_bgcolor='#f9fafb',   # Figure background
-    plot_bgcolor='#ffffff',    # Plot area background
-    title_font_color='#264653',
-    font=dict(color='#264653', size=14),
-    xaxis=dict(
-        title='Gender',
-        gridcolor='#e0e0e0',
-        linecolor='#264653',
-        zerolinecolor='#264653',
-        # tickfont=dict(color='#264653'),
-        # titlefont=dict(color='#264653')
-    ),
-    yaxis=dict(
-        title='Average Grade',
-        gridcolor='#e0e0e0',
-        linecolor='#264653',
-        zerolinecolor='#264653',
-        # tickfont=dict(color='#264653'),
-        # titlefont=dict(color='#264653')
-    ),
-    legend=dict(
-        title='Gender',
-        bgcolor='#f9fafb',
-        bordercolor='#ccc',
-        borderwidth=1,
-        font=dict(color='#264653')
-    )
-)
-
-fig_gender.update_traces(
-    marker=dict(line=dict(width=1, color='#264653'))  # box outline color
-)
-
-
-
-
-
-# Income scatter
-fig_income = px.scatter(
-    merged_df,
-    x='Income Level',
-    y='Average Grade',
-    trendline='ols',
-    title='Income vs Academic Performance',
-    color_discrete_sequence=['#643464']  # Customize marker color here (blueviolet)
-)
-
-fig_income.update_layout(
-    paper_bgcolor='#f5f7fa',   # Figure background (outside plot)
-    plot_bgcolor='#ffffff',    # Plot area background
-    title_font_color='#2c3e50',
-    font=dict(color='#2c3e50', size=14),
-    xaxis=dict(
-        title='Income Level',
-        gridcolor='#dcdcdc',
-        linecolor='#2c3e50',
-        zerolinecolor='#2c3e50',
-        # tickfont=dict(color='#2c3e50'),
-        # titlefont=dict(color='#2c3e50')
-    ),
-    yaxis=dict(
-        title='Average Grade',
-        gridcolor='#dcdcdc',
-        linecolor='#2c3e50',
-        zerolinecolor='#2c3e50',
-        # tickfont=dict(color='#2c3e50'),
-        # titlefont=dict(color='#2c3e50')
-    )
-)
-
-fig_income.update_traces(marker=dict(size=10, line=dict(width=1, color='#2c3e50')))
-
-
-
-
-
-# Employment Impact 
-fig_employment = px.box(
-    merged_df,
-    x='Employment Status',
-    y='Average Grade',
-    title='Employment Status vs Academic Performance',
-    color='Employment Status',
-    color_discrete_map={
-        'Full-time': '#2a9d8f',
-        'Part-time': '#643464',
-        'Unemployed': '#e3dde5',
-        # Add more categories/colors as needed
-    }
-)
-
-fig_employment.update_layout(
-    paper_bgcolor='#f9fbfc',    # Figure background
-    plot_bgcolor='#ffffff',     # Plot area background
-    title_font_color='#264653',
-    font=dict(color='#264653', size=14),
-    xaxis=dict(
-        title='Employment Status',
-        gridcolor='#e0e0e0',
-        linecolor='#264653',
-        zerolinecolor='#264653',
-        # tickfont=dict(color='#264653'),
-        # titlefont=dict(color='#264653'),
-    ),
-    yaxis=dict(
-        title='Average Grade',
-        gridcolor='#e0e0e0',
-        linecolor='#264653',
-        zerolinecolor='#264653',
-        # tickfont=dict(color='#264653'),
-        # titlefont=dict(color='#264653'),
-    ),
-    legend=dict(
-        title='Employment Status',
-        bgcolor='#f9fbfc',
-        bordercolor='#ccc',
-        borderwidth=1,
-        font=dict(color='#264653')
-    )
-)
-
-fig_employment.update_traces(
-    marker=dict(line=dict(width=1, color='#264653'))  # box outlines
-)
-
-
-
-
-# Geographic Factors 
-district_avg = merged_df.groupby("District")["Average Grade"].mean().reset_index()
-
-my_colors = {
-    'Fort Portal': '#e3dde5',  # blue
-    'Gulu': '#55c3c7',  # orange
-    'Kampala': '#744674',  # green
-    'Mukono': '#a181a1',  # red
-    'Wakiso': '#55c3c7',  # purple
-}
-
-fig_district = px.bar(
-    district_avg,
-    x='District',
-    y='Average Grade',
-    title='Average Grade by District',
-    color='District',
-    color_discrete_map=my_colors  # Use your custom colors here
-)
-
-fig_district.update_layout(
-    paper_bgcolor='#f9fafb',
-    plot_bgcolor='#ffffff',
-    title_font_color='#264653',
-    font=dict(color='#264653', size=14),
-    xaxis=dict(
-        title='District',
-        gridcolor='#e0e0e0',
-        linecolor='#264653',
-        zerolinecolor='#264653',
-        # tickfont=dict(color='#264653'),
-        # titlefont=dict(color='#264653'),
-    ),
-    yaxis=dict(
-        title='Average Grade',
-        gridcolor='#e0e0e0',
-        linecolor='#264653',
-        zerolinecolor='#264653',
-        # tickfont=dict(color='#264653'),
-        # titlefont=dict(color='#264653'),
-    ),
-    legend=dict(
-        title='District',
-        bgcolor='#f9fafb',
-        bordercolor='#ccc',
-        borderwidth=1,
-        font=dict(color='#264653')
-    )
-)
-
-fig_district.update_traces(marker=dict(line=dict(width=1, color='#264653')))
-
-
-
-
-# Family Responsibility (Number of Children)
-fig_kids = px.scatter(
-    merged_df,
-    x='Number Of Children',
-    y='Average Grade',
-    trendline='ols',
-    title='Family Responsibility vs Academic Performance',
-    color_discrete_sequence=['#55c3c7']  # Customize marker color (orange sandy)
-)
-
-fig_kids.update_layout(
-    paper_bgcolor='#fbfbfb',   # Figure background
-    plot_bgcolor='#ffffff',    # Plot area background
-    title_font_color='#264653',
-    font=dict(color='#264653', size=14),
-    xaxis=dict(
-        title='Number Of Children',
-        gridcolor='#e0e0e0',
-        linecolor='#264653',
-        zerolinecolor='#264653',
-        # tickfont=dict(color='#264653'),
-        # titlefont=dict(color='#264653')
-    ),
-    yaxis=dict(
-        title='Average Grade',
-        gridcolor='#e0e0e0',
-        linecolor='#264653',
-        zerolinecolor='#264653',
-        # tickfont=dict(color='#264653'),
-        # titlefont=dict(color='#264653')
-    )
-)
-
-fig_kids.update_traces(marker=dict(size=10, line=dict(width=1, color='#264653')))
-
-
-
-
-
-#  Marital Status Impact 
-fig_marital = px.box(
-    merged_df,
-    x='Marital Status',
-    y='Average Grade',
-    title='Marital Status vs Academic Performance',
-    # color='Marital Status',
-    color_discrete_map={
-        'Single': '#2a9d8f',
-        'Married': '#e76f51',
-        'Divorced': '#264653',
-        'Widowed': '#f4a261',
-        # Add more categories if needed
-    }
-)
-
-fig_marital.update_layout(
-    paper_bgcolor='#f9fafb',    # Figure background
-    plot_bgcolor='#ffffff',     # Plot area background
-    title_font_color='#264653',
-    font=dict(color='#264653', size=14),
-    xaxis=dict(
-        title='Marital Status',
-        gridcolor='#e0e0e0',
-        linecolor='#264653',
-        zerolinecolor='#264653',
-        # tickfont=dict(color='#264653'),
-        # titlefont=dict(color='#264653'),
-    ),
-    yaxis=dict(
-        title='Average Grade',
-        gridcolor='#e0e0e0',
-        linecolor='#264653',
-        zerolinecolor='#264653',
-        # tickfont=dict(color='#264653'),
-        # titlefont=dict(color='#264653'),
-    ),
-    legend=dict(
-        title='Marital Status',
-        bgcolor='#f9fafb',
-        bordercolor='#ccc',
-        borderwidth=1,
-        font=dict(color='#264653')
-    )
-)
-
-fig_marital.update_traces(
-    marker=dict(line=dict(width=1, color='#264653'))  # box outlines
-)
-
-
-
-
-
-# Education Level vs Performance 
-edu_avg = merged_df.groupby("Education Level")["Average Grade"].mean().reset_index()
-
-# Define your custom colors per education level
-edu_colors = {
-    'High School': '#744674',
-    'Undergraduate': '#2a9d8f',
-    'Postgraduate': '#e3dde5',
-    'Doctorate': '#684c64',
-    # Add more levels/colors as needed
-}
-# 
-fig_edu = px.bar(
-    edu_avg,
-    x='Education Level',
-    y='Average Grade',
-    title='Education Level vs Academic Performance',
-    color='Education Level',
-    color_discrete_map=edu_colors
-)
-
-fig_edu.update_layout(
-    paper_bgcolor='#f9fafb',   # Figure background
-    plot_bgcolor='#ffffff',    # Plot area background
-    title_font_color='#264653',
-    font=dict(color='#264653', size=14),
-    xaxis=dict(
-        title='Education Level',
-        gridcolor='#e0e0e0',
-        linecolor='#264653',
-        zerolinecolor='#264653',
-        # tickfont=dict(color='#264653'),
-        # titlefont=dict(color='#264653'),
-    ),
-    yaxis=dict(
-        title='Average Grade',
-        gridcolor='#e0e0e0',
-        linecolor='#264653',
-        zerolinecolor='#264653',
-        # tickfont=dict(color='#264653'),
-        # titlefont=dict(color='#264653'),
-    ),
-    legend=dict(
-        title='Education Level',
-        bgcolor='#f9fafb',
-        bordercolor='#ccc',
-        borderwidth=1,
-        font=dict(color='#264653')
-    )
-)
-
-fig_edu.update_traces(marker=dict(line=dict(width=1, color='#264653')))
-
-
-
-
-
-#  Location-Based Resource Access 
-location_colors = {
-    'Urban': '#2a9d8f',
-    'Suburban': '#744674',
-    'Rural': '#bca4bc',
-}
-
-fig_location_study = px.box(
-    merged_df,
-    x='Location',
-    y='Time Spent On Materials (Hours)',
-    title='Location vs Study Time',
-    color='Location',
-    color_discrete_map=location_colors
-)
-
-fig_location_study.update_layout(
-    paper_bgcolor='#f9fafb',   # Figure background
-    plot_bgcolor='#ffffff',    # Plot area background
-    title_font_color='#264653',
-    font=dict(color='#264653', size=14),
-    xaxis=dict(
-        title='Location',
-        gridcolor='#e0e0e0',
-        linecolor='#264653',
-        zerolinecolor='#264653',
-        # tickfont=dict(color='#264653'),
-        # titlefont=dict(color='#264653'),
-    ),
-    yaxis=dict(
-        title='Time Spent On Materials (Hours)',
-        gridcolor='#e0e0e0',
-        linecolor='#264653',
-        zerolinecolor='#264653',
-        # tickfont=dict(color='#264653'),
-        # titlefont=dict(color='#264653'),
-    ),
-    legend=dict(
-        title='Location',
-        bgcolor='#f9fafb',
-        bordercolor='#ccc',
-        borderwidth=1,
-        font=dict(color='#264653')
-    )
-)
-
-fig_location_study.update_traces(
-    marker=dict(line=dict(width=1, color='#264653'))
-)
-
-
-
-# Extracurricular Activity Insights
-
-
-
-# Pie of participation
-participation_colors = {
-    'Active': '#2a9d8f',
-    'Inactive': '#744674',
-    # Add more categories/colors as needed
-}
-
-fig_participation_pie = px.pie(
-    merged_df,
-    names='Participation Status',
-    title='Participation in Extracurricular Activities',
-    color='Participation Status',
-    color_discrete_map=participation_colors
-)
-
-fig_participation_pie.update_traces(
-    textposition='inside',
-    textinfo='percent+label',
-    marker=dict(line=dict(color='#264653', width=1))
-)
-
-fig_participation_pie.update_layout(
-    paper_bgcolor='#f9fafb',
-    title_font_color='#264653',
-    font=dict(color='#264653', size=14),
-    legend=dict(
-        bgcolor='#f9fafb',
-        bordercolor='#ccc',
-        borderwidth=1,
-        font=dict(color='#264653')
-    )
-)
-
-
-# Bar of average performance
-participation_perf = merged_df.groupby("Participation Status")["Average Grade"].mean().reset_index()
-
-fig_participation_perf = px.bar(
-    participation_perf,
-    x='Participation Status',
-    y='Average Grade',
-    title='Academic Performance by Participation',
-    color='Participation Status',
-    color_discrete_map=participation_colors
-)
-
-fig_participation_perf.update_layout(
-    paper_bgcolor='#f9fafb',
-    plot_bgcolor='#ffffff',
-    title_font_color='#264653',
-    font=dict(color='#264653', size=14),
-    xaxis=dict(
-        title='Participation Status',
-        gridcolor='#e0e0e0',
-        linecolor='#264653',
-        zerolinecolor='#264653',
-        # tickfont=dict(color='#264653'),
-        # titlefont=dict(color='#264653'),
-    ),
-    yaxis=dict(
-        title='Average Grade',
-        gridcolor='#e0e0e0',
-        linecolor='#264653',
-        zerolinecolor='#264653',
-        # tickfont=dict(color='#264653'),
-        # titlefont=dict(color='#264653'),
-    ),
-    legend=dict(
-        title='Participation Status',
-        bgcolor='#f9fafb',
-        bordercolor='#ccc',
-        borderwidth=1,
-        font=dict(color='#264653')
-    )
-)
-
-fig_participation_perf.update_traces(marker=dict(line=dict(width=1, color='#264653')))
-
-
-
-
-
-# Leadership Roles Correlation 
-fig_leadership = px.bar(
-    merged_df.groupby("Role")["Average Grade"].mean().reset_index(),
-    x="Role", y="Average Grade",
-    title="Academic Performance by Leadership Role",
-    color="Average Grade",
-    color_continuous_scale="teal"
-)
-
-
-# Melt for radar
-radar_data = merged_df.groupby("Role")[["Average Grade", "Forum Posts", "Completed Assignments", "Time Spent On Materials (Hours)"]].mean().reset_index()
-
-# Melt it into long format for radar
-radar_df = radar_data.melt(id_vars="Role", var_name="Metric", value_name="Value")
-
-# Plot radar chart
-fig_radar = px.line_polar(
-    radar_df,
-    r="Value",
-    theta="Metric",
-    color="Role",
-    line_close=True,
-    title="Academic & Engagement Radar by Role",
-
-)
-
-fig_radar.update_traces(fill='toself')  # Optional for filled radar look
-
-
-
-
-# Time Management (Hours in Activities vs. Performance) 
-
-fig_violin = px.violin(
-    merged_df,
-    y='Average Grade',
-    x='Hours Per Week',  
-    box=True,
-    points='all',
-    title='Performance by Activity Involvement Level',
-    color_discrete_sequence=['#2a9d8f', '#683464' ]  # deep teal
-)
-
-fig_violin.update_layout(
-    paper_bgcolor='#f9fafb',
-    plot_bgcolor='#ffffff',
-    title_font_color='#264653',
-    font=dict(color='#264653', size=14),
-    xaxis=dict(
-        title='Hours Per Week',
-        gridcolor='#e0e0e0',
-        linecolor='#264653',
-        zerolinecolor='#264653',
-        # tickfont=dict(color='#264653'),
-        # titlefont=dict(color='#264653')
-    ),
-    yaxis=dict(
-        title='Average Grade',
-        gridcolor='#e0e0e0',
-        linecolor='#264653',
-        zerolinecolor='#264653',
-        # tickfont=dict(color='#264653'),
-        # titlefont=dict(color='#264653')
-    ),
-    legend=dict(
-        bgcolor='#f9fafb',
-        bordercolor='#ccc',
-        borderwidth=1,
-        font=dict(color='#264653')
-    )
-)
-
-fig_violin.update_traces(meanline_visible=True,
-                         marker=dict(color='rgba(42, 157, 143, 0.3)', line=dict(width=1, color='#264653')))
-
-
-
-
-
-# Sunburst for nested breakdown (if multiple levels like Activity Type → Role)
-custom_colors = {
-    'Student Government': '#2a9d8f',
-    'Drama Club': '#643464',
-    'Debate Club': '#643464',
-    'Chess Club': '#4ca4c8',
-    'Drama': '#a8dadc',
-    'Volunteering': '#4ca4c8',
-    'Music Band': '#4c5c64',
-    'Art Club': '#264653',
-    'Football': '#643464',
-}
-
-fig_sunburst = px.sunburst(
-    merged_df,
-    path=['Activity', 'Role'],
-    values='Average Grade',
-    color='Activity',
-    color_discrete_map=custom_colors,
-    title='Activity Type & Leadership Breakdown'
-)
-
-fig_sunburst.update_layout(
-    paper_bgcolor='#f9fafb',
-    plot_bgcolor='#ffffff',
-    title_font_color='#264653',
-    font=dict(color='#264653', size=14),
-    margin=dict(t=50, l=10, r=10, b=10)
-)
-
-
-
-
-
-# Activity vs Engagement Heatmap 
-heat_df = merged_df.groupby("Activity")[
-    ["Average Grade", "Forum Posts", "Time Spent On Materials (Hours)"]
-].mean().reset_index()
-
-# Create the heatmap
-fig_heat = px.imshow(
-    heat_df.set_index("Activity"),
-    text_auto=True,
-    aspect="auto",
-    title='Engagement Metrics by Activity Type',
-    color_continuous_scale='teal'  # Use your own palette, or try 'Viridis', 'Plasma', etc.
-)
-
-# Customize layout and styling
-fig_heat.update_layout(
-    paper_bgcolor='#f9fafb',
-    plot_bgcolor='#ffffff',
-    title_font_color='#264653',
-    font=dict(color='#264653', size=13),
-    margin=dict(t=50, l=20, r=20, b=20),
-    coloraxis_colorbar=dict(title='Metric Scale')
-)
-
-
-
-
-
-print(merged_df.columns.tolist())
-
-
 custom_color_map = {
     "Engaged High Achievers": "#2a9d8f",
     "Struggling Engagers": "#643464",
@@ -1174,338 +191,38 @@ custom_color_map = {
 
 
 
-# Scatter plot for Success Predictors
-fig_success = px.scatter(
-    merged_df,
-    x="Attendance %",
-    y="Completed Assignments",
-    color="Participation Status",
-    size="Income Level",
-    hover_name="StudentID",
-    title="Success Predictors: Attendance vs. Assignments with Participation and Income",
-    color_discrete_map={
-        "Active": "#704270",
-        "Moderate": "#e2dce4",
-        "Low": "#55c3c7"
-    }
-)
-
-
-
-# Course Design Insights
-
-
-
-# Count N/As
-subjects = ["Javascript", "Python", "HCD", "Communication"]
-na_counts = merged_df[subjects].isna().sum().reset_index()
-na_counts.columns = ['Subject', 'NA Count']
-
-# Bar chart with custom colors
-fig_na = px.bar(
-    na_counts,
-    x="Subject",
-    y="NA Count",
-    title="Subjects with Highest N/A (Missing) Grades",
-    color="Subject",
-    color_discrete_sequence=["#704270", "#e2dce4", "#55c3c7", "#b494b4"]
-)
-
-# Set background and font
-fig_na.update_layout(
-    plot_bgcolor="#f0f0f0",
-    paper_bgcolor="#ffffff",
-    font=dict(color="#333333", family="Arial", size=14),
-    title_font=dict(size=18),
-    legend=dict(bgcolor="#ffffff", bordercolor="#cccccc", borderwidth=1)
-)
-
-
-
-
-
-subjects = ["Javascript", "Python", "HCD", "Communication"]
-
-# Convert grades to GPA values
-merged_df['Average Grade'] = merged_df[subjects].apply(lambda row: pd.to_numeric(row.map({
-    'A': 4, 'B+': 3.5, 'B': 3, 'B-': 2.7, 'C+': 2.5, 'C': 2, 'D': 1, 'N/A': None
-}), errors='coerce').mean(), axis=1)
-
-# Create scatter plot
-fig_corr = px.scatter(
-    merged_df,
-    x="Completed Assignments",
-    y="Average Grade",
-    color="Course Completion",
-    size="Time Spent On Materials (Hours)",
-    title="Assessment Completion vs Final Grade",
-    color_discrete_map={
-        "Completed": "#704270",
-        "Incomplete": "#55c3c7"
-    }
-)
-
-# Add custom background colors and fonts
-fig_corr.update_layout(
-    plot_bgcolor="#f0f0f0",      # Inner plot area
-    paper_bgcolor="#ffffff",     # Outer figure area (canvas)
-    font=dict(color="#222222", family="Arial", size=14),
-    title_font=dict(size=18, color="#333333"),
-    legend=dict(
-        bgcolor="#ffffff",
-        bordercolor="#cccccc",
-        borderwidth=1
-    )
-)
-
-
-
-
-fig_util = px.scatter(
-    merged_df,
-    x="Time Spent On Materials (Hours)",
-    y="Average Grade",
-    color="Socioeconomic Status",
-    title="Study Time vs Grade Performance",
-    hover_name="StudentID",
-    size="Completed Assignments",
-    color_discrete_map={
-        "Low": "#704270",
-        "Middle": "#e2dce4",
-        "High": "#55c3c7"
-    }
-)
-
-# Add background, font, legend styling
-fig_util.update_layout(
-    plot_bgcolor="#f0f0f0",       # Inside axes
-    paper_bgcolor="#ffffff",      # Outer canvas
-    font=dict(color="#222", family="Arial", size=14),
-    title_font=dict(size=18, color="#333333"),
-    legend=dict(
-        bgcolor="#ffffff",
-        bordercolor="#cccccc",
-        borderwidth=1
-    )
-)
-
-
-
-
-fig_support = px.box(
-    merged_df,
-    x="Number Of Children",
-    y="Average Grade",
-    color="Course Completion",
-    title="Performance Distribution by Number of Children",
-    color_discrete_map={
-        "Completed": "#704270",
-        "Incomplete": "#55c3c7"
-    }
-)
-
-# Add background and layout styling
-fig_support.update_layout(
-    plot_bgcolor="#f0f0f0",       # Plot background
-    paper_bgcolor="#ffffff",      # Canvas background
-    font=dict(color="#222222", family="Arial", size=14),
-    title_font=dict(size=18, color="#333333"),
-    legend=dict(
-        bgcolor="#ffffff",
-        bordercolor="#cccccc",
-        borderwidth=1
-    )
-)
-
-
-
-
-fig_access = px.box(
-    merged_df,
-    x="Location",
-    y="Time Spent On Materials (Hours)",
-    color="Location",
-    title="Study Time by Location (Urban vs Rural)",
-    color_discrete_sequence=["#55c3c7", "#744674", "#684c64"]
-)
-
-fig_access.update_layout(
-    plot_bgcolor="#f0f0f0",       # Inside the plot area
-    paper_bgcolor="#ffffff",      # Around the entire figure
-    font=dict(color="#222222", family="Arial", size=14),
-    title_font=dict(size=18, color="#333333"),
-    legend=dict(
-        bgcolor="#ffffff",
-        bordercolor="#cccccc",
-        borderwidth=1
-    )
-)
-
-
-
-
-# Ensure 'Date' column is in datetime format
-merged_df['Date'] = pd.to_datetime(merged_df['Date'])
-
-# Group forum posts by date
-forum_by_date = merged_df.groupby("Date")["Forum Posts"].sum().reset_index()
-
-# Create the line chart
-fig_forum_2 = px.line(
-    forum_by_date,
-    x="Date",
-    y="Forum Posts",
-    title="Forum Engagement Over Time",
-    markers=True  # Optional: shows dots on line
-)
-
-# Add background and layout styling
-fig_forum_2.update_layout(
-    plot_bgcolor="#f0f0f0",       # Plot area background
-    paper_bgcolor="#ffffff",      # Full figure background
-    font=dict(color="#222222", family="Arial", size=14),
-    title_font=dict(size=18, color="#333333"),
-    legend=dict(
-        bgcolor="#ffffff",
-        bordercolor="#cccccc",
-        borderwidth=1
-    )
-)
-
-
-
-
-# How engagement and grades vary across the academic calendar 
-merged_df['Date'] = pd.to_datetime(merged_df['Date'])
-merged_df['Month'] = merged_df['Date'].dt.to_period('M').astype(str)
-
-monthly_avg = merged_df.groupby('Month').agg({
-    'Time Spent On Materials (Hours)': 'mean',
-    'Average Grade': 'mean'
-}).reset_index()
-
-fig_seasonal = px.line(
-    monthly_avg,
-    x="Month",
-    y=["Time Spent On Materials (Hours)", "Average Grade"],
-    title="Seasonal Trends: Study Time and Grade Averages",
-    markers=True
-)
-
-fig_seasonal.update_layout(
-    plot_bgcolor="#f0f0f0",
-    paper_bgcolor="#ffffff",
-    font=dict(color="#222222", family="Arial", size=14),
-    title_font=dict(size=18, color="#333333"),
-    legend=dict(
-        bgcolor="#ffffff",
-        bordercolor="#cccccc",
-        borderwidth=1
-    )
-)
-
-
-
-
-
-merged_df["Weekday"] = merged_df["Date"].dt.day_name()
-
-weekday_engagement = merged_df.groupby("Weekday")["Forum Posts"].sum().reindex([
-    "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"
-]).reset_index()
-
-fig_weekly = px.bar(
-    weekday_engagement,
-    x="Weekday",
-    y="Forum Posts",
-    title="Forum Engagement by Day of the Week",
-    color="Weekday",
-    color_discrete_sequence=px.colors.qualitative.Pastel
-)
-
-fig_weekly.update_layout(
-    plot_bgcolor="#f0f0f0",
-    paper_bgcolor="#ffffff",
-    font=dict(color="#222222", family="Arial", size=14),
-    title_font=dict(size=18, color="#333333"),
-    legend=dict(
-        bgcolor="#ffffff",
-        bordercolor="#cccccc",
-        borderwidth=1
-    )
-)
-
-
-
-
-
-performance_over_time = merged_df.groupby("Date")["Average Grade"].mean().reset_index()
-
-fig_progress = px.line(
-    performance_over_time,
-    x="Date",
-    y="Average Grade",
-    title="Student Performance Progression Over Time",
-    markers=True
-)
+# Co-moments of the engagement and grade features, accumulated incrementally
+# per data partition and kept in COMOMENTS_PATH between runs
+comoments = correlation_state(merged_df)
+# Running count/mean/variance/min/max of the KPI and engagement card metrics
+card_stats = card_state(merged_df)
+# Day/week/month buckets of the temporal metrics, read by the temporal charts
+# instead of grouping merged_df by Date for every date window
+time_pyramid = TimePyramid.from_frame(merged_df)
 
-fig_progress.update_layout(
-    plot_bgcolor="#f0f0f0",
-    paper_bgcolor="#ffffff",
-    font=dict(color="#222222", family="Arial", size=14),
-    title_font=dict(size=18, color="#333333")
-)
 
 
+# Build every fig_* chart from its spec in figureRegistry, fanned out over a
+# process pool; figure_build_seconds holds the per-figure build times
+figures, figure_build_seconds = warm_up(merged_df=merged_df, grade_sketches=grade_sketches, backend=backend,
+                                       comoments=comoments, time_pyramid=time_pyramid)
 
 
 
-dropouts = merged_df[merged_df["Course Completion"] == "Incomplete"]
-dropouts_by_date = dropouts.groupby("Date")["StudentID"].count().reset_index()
-
-fig_dropout = px.bar(
-    dropouts_by_date,
-    x="Date",
-    y="StudentID",
-    title="Dropout Frequency Over Time",
-    labels={"StudentID": "Dropout Count"},
-    color_discrete_sequence=["#d62728"]
-)
-
-fig_dropout.update_layout(
-    plot_bgcolor="#f0f0f0",
-    paper_bgcolor="#ffffff",
-    font=dict(color="#222222", family="Arial", size=14),
-    title_font=dict(size=18, color="#333333")
-)
-
-
-def create_kpi_cards(merged_df):
-    # Mapping all known grades
-    grade_map = {
-        "A": 4, "A-": 3.7,
-        "B+": 3.5, "B": 3, "B-": 2.7,
-        "C+": 2.5, "C": 2, "C-": 1.7,
-        "D": 1, "F": 0
-    }
-
-    # Replace grades with numeric values, unrecognized become NaN
-    df_num = merged_df.copy()
-    for col in ["Javascript", "Python", "HCD", "Communication"]:
-        df_num[col] = df_num[col].map(grade_map).astype(float)
-
-    # Calculate averages safely
-    avg_js = round(df_num["Javascript"].mean(skipna=True), 1)
-    avg_py = round(df_num["Python"].mean(skipna=True), 1)
-    avg_hcd = round(df_num["HCD"].mean(skipna=True), 1)
-    avg_comm = round(df_num["Communication"].mean(skipna=True), 1)
+def create_kpi_cards(card_stats):
+    # Running means of the grades on the card scale (streamingStats.CARD_GRADE_MAP);
+    # unrecognized grades count as missing
+    avg_js = round(card_stats.mean("Javascript"), 1)
+    avg_py = round(card_stats.mean("Python"), 1)
+    avg_hcd = round(card_stats.mean("HCD"), 1)
+    avg_comm = round(card_stats.mean("Communication"), 1)
 
     return dbc.Row([
         dbc.Col(dbc.Card( 
             dbc.CardBody([
                 html.H6("Avg JavaScript", className="card-title"),
                 html.Div([
-                    html.Img(src='assets/speed.png', style={'height': '30px', 'marginRight': '10px'}),
+                    html.Img(src=asset_src('speed.png'), style={'height': '30px', 'marginRight': '10px'}),
                     html.H2(avg_js, className="card-value", style={'margin': 0})
                     ], style={'display': 'flex', 'alignItems': 'center'}), 
                 html.Small("average grade", className="card-desc"),
@@ -1516,7 +233,7 @@ def create_kpi_cards(merged_df):
             dbc.CardBody([
                 html.H6("Avg Python", className="card-title"),
                 html.Div([
-                    html.Img(src='assets/speed.png', style={'height': '30px', 'marginRight': '10px'}),
+                    html.Img(src=asset_src('speed.png'), style={'height': '30px', 'marginRight': '10px'}),
                     html.H2(avg_py, className="card-value", style={'margin': 0})
                     ], style={'display': 'flex', 'alignItems': 'center'}), 
                 html.Small("average grade", className="card-desc"),
@@ -1527,7 +244,7 @@ def create_kpi_cards(merged_df):
             dbc.CardBody([
                 html.H6("Avg HCD", className="card-title"),
                 html.Div([
-                    html.Img(src='assets/speed.png', style={'height': '30px', 'marginRight': '10px'}),
+                    html.Img(src=asset_src('speed.png'), style={'height': '30px', 'marginRight': '10px'}),
                     html.H2(avg_hcd, className="card-value", style={'margin': 0})
                     ], style={'display': 'flex', 'alignItems': 'center'}), 
                 html.Small("average grade", className="card-desc"),
@@ -1538,7 +255,7 @@ def create_kpi_cards(merged_df):
             dbc.CardBody([
                 html.H6("Avg Communication", className="card-title"),
                 html.Div([
-                    html.Img(src='assets/speed.png', style={'height': '30px', 'marginRight': '10px'}),
+                    html.Img(src=asset_src('speed.png'), style={'height': '30px', 'marginRight': '10px'}),
                     html.H2(avg_comm, className="card-value", style={'margin': 0})
                     ], style={'display': 'flex', 'alignItems': 'center'}), 
                 html.Small("average grade", className="card-desc"),
@@ -1592,7 +309,7 @@ def GradePieChart(merged_df):
     )
 
 
-def create_engagement_cards(merged_df):
+def create_engagement_cards(card_stats):
     metrics = [
         ("Avg Time on Materials (hrs)", "Time Spent On Materials (Hours)", "assets/materials.png"),
         ("Average Forum Posts", "Forum Posts", "assets/forum.png"),
@@ -1602,14 +319,14 @@ def create_engagement_cards(merged_df):
 
     cards = []
     for title, col, icon in metrics:
-        avg_value = round(merged_df[col].mean(skipna=True), 1)
+        avg_value = round(card_stats.mean(col), 1)
         cards.append(
             dbc.Col(
                 dbc.Card(
                     dbc.CardBody([
                         html.H6(title, className="card-title"),
                         html.Div([
-                            html.Img(src='assets/speed.png', style={'height': '30px', 'marginRight': '10px'}),
+                            html.Img(src=asset_src('speed.png'), style={'height': '30px', 'marginRight': '10px'}),
                             html.H2(avg_value, className="card-value", style={'margin': 0})
                         ], style={'display': 'flex', 'alignItems': 'center'}),
                         html.Small("average engagement metric", className="card-desc"),
@@ -1748,32 +465,82 @@ def DemographyForm():
 model = joblib.load("student_performance_model.pkl")
 label_encoders = joblib.load("label_encoders.pkl")
 
+# Drift of the loaded data against the training distributions, also exposed on /metrics
+drift_report = None
+if os.path.exists(REFERENCE_PATH):
+    with timed("drift_seconds"):
+        drift_report = DriftReference.load(REFERENCE_PATH).report(merged_df)
+    record_drift(drift_report)
 
-def PerformanceImpactChart(df: pd.DataFrame, label_encoders: dict):
-    # Encode categorical columns
-    categorical_cols = [
-        "StudentID","Marital Status","Employment Status","Gender","Socioeconomic Status",
-        "Location","District","Education Level","Javascript","Python","HCD","Communication",
-        "Course Completion","Activity","Participation Status","Role","Start Date","End Date","Date"
-    ]
-    df_enc = df.copy()
-    for col in categorical_cols:
-        if col in df_enc.columns and col in label_encoders:
-            df_enc[col] = label_encoders[col].transform(df_enc[col].astype(str))
 
-    # Select features used during training
+def encode_features(df: pd.DataFrame, label_encoders: dict, caller: str = ""):
+    """
+    Returns the model input matrix for df, encoded exactly as in training
+    (trainModel.encode_features over the model's features), timed per caller.
+    """
+    with timed("encode_seconds", caller=caller):
+        return train_encode_features(df, label_encoders, model.feature_names_in_)
+
+
+# Predictions and SHAP vectors per encoded row, shared by the charts and callbacks below
+prediction_cache = PredictionCache()
+model_hash = model_version()
+
+
+def predict_and_explain(X: pd.DataFrame, chart: str):
+    """
+    Returns (predictions, shap_values) for the rows of X. Only rows the
+    prediction cache has not seen for this model touch the model.
+    """
+    def compute(rows):
+        import shap
+
+        with timed("model_predict_seconds"):
+            predicted = model.predict(rows)
+        # SHAP explainer (without check_additivity)
+        with timed("shap_seconds", chart=chart):
+            explainer = shap.TreeExplainer(model, feature_perturbation="interventional")
+            return predicted, explainer.shap_values(rows)
+
+    return prediction_cache.score(X, compute, model_hash)
+
+
+# Pairwise SHAP interactions, precomputed by the gunicorn master or batchJobs.py shap;
+# None when the stored ones are for another model or cohort (never computed per worker)
+shap_interactions = stored_interactions(encode_features(merged_df, label_encoders, caller="interactions"),
+                                        model_hash)
+
+
+def PerformanceImpactChart(df: pd.DataFrame, label_encoders: dict):
+    # Encode categorical columns and select features used during training
     feature_cols = model.feature_names_in_
-    X = df_enc[feature_cols].fillna(0)
+    X = encode_features(df, label_encoders, caller="impact_chart")
+
+    if use_approximation(len(X)):
+        # Stratified row sample; bars carry the confidence interval of the estimate
+        with timed("shap_seconds", chart="impact_approximate"):
+            estimate = estimate_importance(model, X)
+        importance_df = estimate.frame()
+        importance_df["Above"] = importance_df["High"] - importance_df["Impact"]
+        importance_df["Below"] = importance_df["Impact"] - importance_df["Low"]
+        fig = px.bar(
+            importance_df,
+            x="Impact",
+            y="Feature",
+            orientation="h",
+            error_x="Above",
+            error_x_minus="Below",
+            title=f"Impact of Features on Student Performance (estimated from {estimate.sample_rows:,} of "
+                  f"{estimate.rows:,} rows, {CONFIDENCE:.0%} intervals)",
+            color="Impact",
+            color_continuous_scale="Viridis"
+        )
+        fig.update_layout(yaxis=dict(autorange="reversed"))
+        return fig
 
-    # SHAP explainer (without check_additivity)
-    explainer = shap.TreeExplainer(model, feature_perturbation="interventional")
-    shap_values = explainer.shap_values(X)
+    _, shap_values = predict_and_explain(X, chart="impact")
 
     # Aggregate impact
-    import numpy as np
-    import pandas as pd
-    import plotly.express as px
-
     importance = np.abs(shap_values).mean(axis=0)
     importance_df = pd.DataFrame({"Feature": feature_cols, "Impact": importance}).sort_values("Impact", ascending=False)
 
@@ -1792,6 +559,90 @@ def PerformanceImpactChart(df: pd.DataFrame, label_encoders: dict):
     return fig
 
 
+# Graphs rendered by a callback on page load instead of at import: graph id -> figure builder.
+# snapshotExport builds them itself, since a static page has no callbacks.
+DEFERRED_FIGURES = {}
+
+
+def PerformanceImpactGraph(df: pd.DataFrame, label_encoders: dict, component_id: str = "performance-impact"):
+    """
+    Returns the dcc.Graph for PerformanceImpactChart, filled in when the page
+    loads. Keeps SHAP out of the import (and out of every worker's startup):
+    the first page load scores the cohort, later ones read the prediction cache.
+    """
+    graph_id = f"{component_id}-graph"
+    DEFERRED_FIGURES[graph_id] = lambda: PerformanceImpactChart(df, label_encoders)
+
+    @app.callback(
+        Output(graph_id, "figure"),
+        Input(graph_id, "id"),
+    )
+    @timed("callback_seconds", callback="performance_impact")
+    def render_performance_impact(_):
+        return DEFERRED_FIGURES[graph_id]()
+
+    return dcc.Graph(id=graph_id, className="chart-card", style={"height": "600px"})
+
+
+def ShapInteractionComponent(interactions: ShapInteractions, label_encoders: dict,
+                             component_id: str = "shap-interactions"):
+    """
+    Returns a Dash dbc.Row with a heatmap of how strongly feature pairs interact
+    and a dependence plot of a chosen pair, e.g. how the effect of attendance
+    differs by employment status. Both render from the stored interaction
+    values; no SHAP pass runs per request. Without stored values (interactions
+    None) the row only says how to compute them.
+    """
+    if interactions is None:
+        return dbc.Row(dbc.Col(html.P(
+            "SHAP interactions have not been computed for this model and cohort yet; "
+            "run `python batchJobs.py shap` (or restart gunicorn).",
+            className="text-muted"), width=12))
+
+    heatmap = px.imshow(
+        interactions.strength_frame(),
+        aspect="auto",
+        color_continuous_scale="Viridis",
+        title="SHAP Interaction Strength Between Features"
+    )
+    heatmap.update_layout(coloraxis_colorbar=dict(title="Mean |interaction|"))
+
+    options = [{"label": f"{feature_i} × {feature_j}", "value": pair}
+               for pair, (feature_i, feature_j, _) in enumerate(interactions.top_pairs())]
+
+    layout = dbc.Row([
+        dbc.Col(dcc.Graph(figure=heatmap, className="chart-card", style={"height": "700px"}), width=12),
+        dbc.Col([
+            html.H5("Feature Interaction Dependence"),
+            dcc.Dropdown(id=f"{component_id}-pair", options=options, value=0 if options else None,
+                         clearable=False),
+            dcc.Graph(id=f"{component_id}-dependence", style={"height": "600px"}),
+        ], width=12),
+    ])
+
+    @app.callback(
+        Output(f"{component_id}-dependence", "figure"),
+        Input(f"{component_id}-pair", "value"),
+    )
+    @timed("callback_seconds", callback="shap_dependence")
+    def show_dependence(pair):
+        if pair is None:
+            return {}
+        frame = interactions.pair_frame(pair, label_encoders)
+        x, color = frame.columns[:2]
+        fig = px.scatter(
+            frame,
+            x=x,
+            y="Interaction",
+            color=color,
+            title=f"Effect of {x} by {color}"
+        )
+        fig.update_layout(yaxis_title=f"SHAP interaction of {x} and {color}")
+        return fig
+
+    return layout
+
+
 def WhatIfPerformanceComponent(df: pd.DataFrame, label_encoders: dict, height: int = 600):
     """
     Returns a Dash dbc.Col containing sliders for what-if analysis and a SHAP bar chart.
@@ -1824,6 +675,9 @@ def WhatIfPerformanceComponent(df: pd.DataFrame, label_encoders: dict, height: i
             marks={i: str(i) for i in range(0, 21, 2)}
         ),
 
+        # Background job progress
+        html.Small(id=f"{component_id}-progress", className="text-muted"),
+
         # SHAP graph
         dcc.Graph(
             id=f"{component_id}-shap-graph",
@@ -1831,37 +685,30 @@ def WhatIfPerformanceComponent(df: pd.DataFrame, label_encoders: dict, height: i
         )
     ], width=6)
 
-    # Create the callback for interactivity
+    # Create the callback for interactivity. It runs as a background job; moving
+    # a slider again cancels the job that is still running.
     @app.callback(
         Output(f"{component_id}-shap-graph", "figure"),
         Input(f"{component_id}-attendance-slider", "value"),
-        Input(f"{component_id}-hours-slider", "value")
+        Input(f"{component_id}-hours-slider", "value"),
+        background=True,
+        progress=[Output(f"{component_id}-progress", "children")],
+        progress_default=[""],
     )
-    def update_shap(attendance_val, hours_val):
-        # Copy the dataframe
-        df_copy = df.copy()
-        # Apply sliders to first student for simplicity
-        df_copy.loc[0, "Attendance %"] = attendance_val
-        df_copy.loc[0, "Hours Per Week"] = hours_val
-
-        # Encode categorical columns
-        categorical_cols = [
-            "StudentID","Marital Status","Employment Status","Gender","Socioeconomic Status",
-            "Location","District","Education Level","Javascript","Python","HCD","Communication",
-            "Course Completion","Activity","Participation Status","Role","Start Date","End Date","Date"
-        ]
-        df_enc = df_copy.copy()
-        for col in categorical_cols:
-            if col in df_enc.columns and col in label_encoders:
-                df_enc[col] = label_encoders[col].transform(df_enc[col].astype(str))
-
-        # Select features used in training
+    @timed("callback_seconds", callback="update_shap")
+    def update_shap(set_progress, attendance_val, hours_val):
+        # Encode categorical columns and select features used in training
+        set_progress(["Encoding features..."])
         feature_cols = model.feature_names_in_
-        X = df_enc[feature_cols].fillna(0)
+        X = encode_features(df, label_encoders, caller="update_shap")
+        # Apply sliders to first student for simplicity (both are plain numeric inputs)
+        X.loc[0, "Attendance %"] = attendance_val
+        X.loc[0, "Hours Per Week"] = hours_val
 
-        # SHAP explainer
-        explainer = shap.TreeExplainer(model, feature_perturbation="interventional")
-        shap_values = explainer.shap_values(X)
+        # Only the slider-modified row is new to the prediction cache
+        set_progress(["Computing SHAP values..."])
+        predictions, shap_values = predict_and_explain(X, chart="whatif")
+        predicted = predictions[0]
 
         # Aggregate impact
         importance = np.abs(shap_values).mean(axis=0)
@@ -1873,7 +720,7 @@ def WhatIfPerformanceComponent(df: pd.DataFrame, label_encoders: dict, height: i
             x="Impact",
             y="Feature",
             orientation="h",
-            title=f"Predicted Performance Score: {model.predict(X)[0]:.2f}",
+            title=f"Predicted Performance Score: {predicted:.2f}",
             color="Impact",
             color_continuous_scale="Viridis"
         )
@@ -1883,12 +730,193 @@ def WhatIfPerformanceComponent(df: pd.DataFrame, label_encoders: dict, height: i
 
     return layout
 
-# Configure Gemini API
-from dotenv import load_dotenv
 
-load_dotenv()
+def StudentDetailComponent(index: StudentIndex, label_encoders: dict, component_id: str = "student-detail"):
+    """
+    Returns a Dash dbc.Col to look up one student: demographics, grades, activity
+    history, behaviour over time, predicted score and its SHAP explanation.
+    Rows come from the StudentID index, so a lookup costs the same at any cohort size.
+    """
+    layout = dbc.Col([
+        html.H5("Student Drill-down"),
+        dcc.Input(
+            id=f"{component_id}-input",
+            type="text",
+            placeholder="Student ID, e.g. S001",
+            debounce=True,
+        ),
+        html.Div(id=f"{component_id}-output", style={"marginTop": "20px"})
+    ], width=12)
+
+    @app.callback(
+        Output(f"{component_id}-output", "children"),
+        Input(f"{component_id}-input", "value"),
+        prevent_initial_call=True,
+    )
+    @timed("callback_seconds", callback="student_detail")
+    def show_student(student_id):
+        student_id = (student_id or "").strip()
+        if not student_id:
+            return ""
+        if student_id not in index:
+            return f"No student with ID {student_id}."
+
+        demographics = index.rows("demographic", student_id)
+        grades = index.rows("academic", student_id)
+        activities = index.rows("activities", student_id)
+        behavior = index.rows("behavior", student_id)
+
+        def table(df):
+            return dbc.Table.from_dataframe(df.drop(columns="StudentID"), striped=True, bordered=True,
+                                            size="sm", className="chart-card")
+
+        children = [
+            html.H6("Demographics"), table(demographics),
+            html.H6("Grades"), table(grades),
+            html.H6("Activity History"), table(activities),
+        ]
+
+        if not behavior.empty:
+            fig_behavior = px.line(
+                behavior,
+                x="Date",
+                y=["Time Spent On Materials (Hours)", "Forum Posts", "Instructor Messages",
+                   "Completed Assignments", "Time Spent On Forum (Hours)"],
+                markers=True,
+                title=f"Behaviour Over Time: {student_id}"
+            )
+            fig_behavior.update_layout(legend_title="Metric", yaxis_title="Value")
+            children.append(dcc.Graph(figure=fig_behavior, className="chart-card"))
+
+        rows = index.merged(student_id)
+        if not rows.empty:
+            # One row per activity x behaviour record; the score is their mean
+            X = encode_features(rows, label_encoders, caller="student_detail")
+            predictions, shap_values = predict_and_explain(X, chart="student")
+            predicted = predictions.mean()
+
+            impact_df = pd.DataFrame({"Feature": model.feature_names_in_, "Impact": shap_values.mean(axis=0)})
+            impact_df = impact_df.reindex(impact_df["Impact"].abs().sort_values(ascending=False).index)
+            fig_shap = px.bar(
+                impact_df,
+                x="Impact",
+                y="Feature",
+                orientation="h",
+                title=f"Predicted Performance Score: {predicted:.2f}",
+                color="Impact",
+                color_continuous_scale="RdBu"
+            )
+            fig_shap.update_layout(yaxis=dict(autorange="reversed"))
+            children.append(dcc.Graph(figure=fig_shap, className="chart-card", style={"height": "600px"}))
+
+        return children
+
+    return layout
+
+
+def FeatureDriftPanel(report: pd.DataFrame):
+    """
+    Returns a Dash dbc.Col with the PSI of every model feature against its
+    training distribution and a table of the features that drifted.
+    """
+    if report is None:
+        return dbc.Col(html.P("No drift reference found; run python driftMonitor.py reference."), width=12)
+
+    fig = px.bar(
+        report,
+        x="psi",
+        y="feature",
+        orientation="h",
+        color="status",
+        color_discrete_map=STATUS_COLORS,
+        hover_data=["kind", "ks", "rows"],
+        title="Feature Drift Against Training Data (PSI)"
+    )
+    fig.add_vline(x=PSI_MODERATE, line_dash="dot", line_color="#e9c46a")
+    fig.add_vline(x=PSI_SIGNIFICANT, line_dash="dash", line_color="#e76f51")
+    fig.update_layout(yaxis=dict(autorange="reversed"), xaxis_title="PSI", yaxis_title="Feature",
+                      legend_title="Status")
+
+    drifted = report[report["status"] != "stable"]
+    if drifted.empty:
+        details = html.P("All features are stable.", className="text-success")
+    else:
+        details = dbc.Table.from_dataframe(drifted.round(3), striped=True, bordered=True, size="sm",
+                                           className="chart-card")
+
+    return dbc.Col([
+        dcc.Graph(figure=fig, className="chart-card", style={"height": "700px"}),
+        details,
+    ], width=12)
+
+# Temporal charts in page order; the first three have a date x axis to zoom
+TEMPORAL_FIGURES = ["fig_forum_2", "fig_progress", "fig_dropout", "fig_seasonal", "fig_weekly"]
+ZOOMABLE_FIGURES = TEMPORAL_FIGURES[:3]
+RESOLUTION_LABELS = {"day": "Daily", "week": "Weekly", "month": "Monthly"}
+
+
+def TemporalTrendsComponent(pyramid: TimePyramid, component_id: str = "temporal"):
+    """
+    Returns a Dash dbc.Row with a date-range selector and the temporal charts.
+    Picking dates, or zooming into the time axis of a chart, re-renders every
+    chart from the pyramid at the finest resolution that fits the window.
+    """
+    first, last = (date and date.strftime("%Y-%m-%d") for date in pyramid.date_range)
+    graph_ids = {name: f"{component_id}-{name.replace('_', '-')}" for name in TEMPORAL_FIGURES}
+
+    def resolution_note(start=None, end=None):
+        return f"{RESOLUTION_LABELS[pyramid.resolution(start, end)]} buckets"
+
+    layout = dbc.Row([
+        dbc.Col([
+            dcc.DatePickerRange(
+                id=f"{component_id}-range",
+                min_date_allowed=first,
+                max_date_allowed=last,
+                start_date=first,
+                end_date=last,
+                display_format="YYYY-MM-DD",
+            ),
+            html.Small(resolution_note(), id=f"{component_id}-resolution", className="text-muted ms-3"),
+        ], width=12),
+        *[dbc.Col(dcc.Graph(id=graph_id, figure=figures[name], className="chart-card"), width=12)
+          for name, graph_id in graph_ids.items()],
+    ])
+
+    @app.callback(
+        Output(f"{component_id}-range", "start_date"),
+        Output(f"{component_id}-range", "end_date"),
+        *[Input(graph_ids[name], "relayoutData") for name in ZOOMABLE_FIGURES],
+        prevent_initial_call=True,
+    )
+    def zoom_window(*relayouts):
+        relayout = relayouts[[graph_ids[name] for name in ZOOMABLE_FIGURES].index(ctx.triggered_id)] or {}
+        if relayout.get("xaxis.autorange"):
+            return first, last
+        if "xaxis.range[0]" not in relayout:
+            raise PreventUpdate
+        return (pd.Timestamp(relayout["xaxis.range[0]"]).strftime("%Y-%m-%d"),
+                pd.Timestamp(relayout["xaxis.range[1]"]).strftime("%Y-%m-%d"))
+
+    @app.callback(
+        *[Output(graph_id, "figure") for graph_id in graph_ids.values()],
+        Output(f"{component_id}-resolution", "children"),
+        Input(f"{component_id}-range", "start_date"),
+        Input(f"{component_id}-range", "end_date"),
+        prevent_initial_call=True,
+    )
+    @timed("callback_seconds", callback="temporal_window")
+    def show_window(start, end):
+        # Reads at most TIMELINE_MAX_POINTS buckets per chart, whatever the window
+        context = {"time_pyramid": pyramid, "date_range": (start, end)}
+        return *[build_figure(FIGURE_SPECS[name], context) for name in graph_ids], resolution_note(start, end)
+
+    return layout
+
+
+# LLM behind Ask AI (LLM_BACKEND); Gemini is imported and configured on the first question
+llm = make_llm()
 
-genai.configure(api_key=os.getenv("API"))
 
 def GeminiQnA(df: pd.DataFrame, component_id: str = "gemini-qna"):
     """
@@ -1910,6 +938,8 @@ def GeminiQnA(df: pd.DataFrame, component_id: str = "gemini-qna"):
             style={"width": "100%", "height": "100px"}
         ),
         html.Button("ASK AI", id=f"{component_id}-btn", n_clicks=0),
+        html.Button("Cancel", id=f"{component_id}-cancel-btn", n_clicks=0, disabled=True),
+        html.Small(id=f"{component_id}-progress", className="text-muted"),
         
         html.Div(id=f"{component_id}-output", 
                  style={"marginTop": "20px", "whiteSpace": "pre-wrap"})
@@ -1924,92 +954,96 @@ def register_callbacks(app, df: pd.DataFrame, component_id: str = "gemini-qna"):
         Output(f"{component_id}-output", "children"),
         Input(f"{component_id}-btn", "n_clicks"),
         State(f"{component_id}-input", "value"),
-        prevent_initial_call=True
+        prevent_initial_call=True,
+        # Runs as a background job; the same question asked twice shares one job
+        background=True,
+        cache_args_to_ignore=[0],
+        running=[
+            (Output(f"{component_id}-btn", "disabled"), True, False),
+            (Output(f"{component_id}-cancel-btn", "disabled"), False, True),
+        ],
+        cancel=[Input(f"{component_id}-cancel-btn", "n_clicks")],
+        # The answer so far is streamed into the output while it is generated
+        progress=[Output(f"{component_id}-progress", "children"),
+                  Output(f"{component_id}-output", "children", allow_duplicate=True)],
+        progress_default=["", ""],
+        interval=250,
     )
-    def ask_gemini(n, question):
+    @timed("callback_seconds", callback="ask_gemini")
+    def ask_gemini(set_progress, n, question):
         if not question:
             return "Please enter a question."
         
         try:
-            # Build prompt
-            prompt = f"""
-            You are a data assistant. 
-            Answer the question using the pandas dataframe provided below.
-
-            DataFrame (sample):
-            {df.head(10).to_string()}
-
-            Question: {question}
-
-            Provide a clear answer.
-            """
-
-            model = genai.GenerativeModel("gemini-1.5-flash")
-            response = model.generate_content(prompt)
-
-            return response.text
+            # The model plans a query that runs here over every row (queryPlan)
+            return answer_question(llm, df, question,
+                                   on_progress=lambda status, text: set_progress([status, text]))
         
         except Exception as e:
             return f"Error: {str(e)}"
 
-app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+# Disk-backed job queue for the SHAP and Gemini background callbacks
+job_manager = make_job_manager()
+
+app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP],
+           background_callback_manager=job_manager)
 
 app.layout = dbc.Container([
     html.Div([
-        html.Img(src='assets/refactory_logo.png', style={'height': '50px'}),
+        html.Img(src=asset_src('refactory_logo.png'), style={'height': '50px'}),
         html.H4("Refactory Student Analysis Dashboard", className="my-3"),
     ], className="d-flex align-items-center gap-3"),
 
       #  CARDS
-    create_kpi_cards(merged_df),
+    create_kpi_cards(card_stats),
     dbc.Row([
         dbc.Col(GradePieChart(merged_df), width=6),
-        dbc.Col(GradeBoxplot(melted), width=6),
+        dbc.Col(GradeBoxplot(grade_sketches), width=6),
     ]),
 
-    dcc.Graph(figure=fig_std, className="chart-card"),
+    dcc.Graph(figure=figures["fig_std"], className="chart-card"),
     dbc.Row([
-        dbc.Col(dcc.Graph(figure=fig_missing, style={"height": "600px"}, className="chart-card")),
-        dbc.Col(dcc.Graph(figure=fig_violin, style={"height": "600px"},  className="chart-card")),
+        dbc.Col(dcc.Graph(figure=figures["fig_missing"], style={"height": "600px"}, className="chart-card")),
+        dbc.Col(dcc.Graph(figure=figures["fig_violin"], style={"height": "600px"},  className="chart-card")),
     ]),
 
     html.H4("Behavioral", className="my-3"),
-    create_engagement_cards(merged_df),
+    create_engagement_cards(card_stats),
     dbc.Row([
-        dbc.Col(dcc.Graph(figure=fig_time, style={"height": "600px"}, className="chart-card")),
-        dbc.Col(dcc.Graph(figure=fig_msgs, style={"height": "600px"}, className="chart-card")),
+        dbc.Col(dcc.Graph(id="fig-time", figure=figures["fig_time"], style={"height": "600px"}, className="chart-card")),
+        dbc.Col(dcc.Graph(id="fig-msgs", figure=figures["fig_msgs"], style={"height": "600px"}, className="chart-card")),
     ]),
-    dcc.Graph(figure=fig_forum, className="chart-card"),
-    dcc.Graph(figure=fig_assign, className="chart-card"),
+    dcc.Graph(id="fig-forum", figure=figures["fig_forum"], className="chart-card"),
+    dcc.Graph(id="fig-assign", figure=figures["fig_assign"], className="chart-card"),
 
     html.H4("Demography", className="my-3"),
-    dcc.Graph(figure=fig_gender, className="chart-card"),
-    dcc.Graph(figure=fig_income, className="chart-card"),
-    dcc.Graph(figure=fig_employment, className="chart-card"),
-    dcc.Graph(figure=fig_district, className="chart-card"),
-    dcc.Graph(figure=fig_edu, className="chart-card"), 
-    dcc.Graph(figure=fig_location_study, className="chart-card"), 
+    dcc.Graph(figure=figures["fig_gender"], className="chart-card"),
+    dcc.Graph(id="fig-income", figure=figures["fig_income"], className="chart-card"),
+    dcc.Graph(figure=figures["fig_employment"], className="chart-card"),
+    dcc.Graph(figure=figures["fig_district"], className="chart-card"),
+    dcc.Graph(figure=figures["fig_edu"], className="chart-card"), 
+    dcc.Graph(figure=figures["fig_location_study"], className="chart-card"), 
 
 
     html.H4("Extracurricular Activity", className="my-3"),
-    dcc.Graph(figure=fig_leadership, className="chart-card"), 
-    dcc.Graph(figure=fig_radar, className="chart-card"), 
-    dcc.Graph(figure=fig_sunburst, className="chart-card"), 
-    dcc.Graph(figure=fig_heat, className="chart-card"),
+    dcc.Graph(figure=figures["fig_leadership"], className="chart-card"), 
+    dcc.Graph(figure=figures["fig_radar"], className="chart-card"), 
+    dcc.Graph(figure=figures["fig_sunburst"], className="chart-card"), 
+    dcc.Graph(figure=figures["fig_heat"], className="chart-card"),
     # dcc.Graph(figure=fig_archetype_pie),
-    dcc.Graph(figure=fig_success),
+    dcc.Graph(id="fig-success", figure=figures["fig_success"]),
 
 
     html.H4("Course Design Insights", className="my-3"),
-    dcc.Graph(figure=fig_na, className="chart-card"),
-    dcc.Graph(figure=fig_corr, className="chart-card"),
-    dcc.Graph(figure=fig_util, className="chart-card"),
-    dcc.Graph(figure=fig_support, className="chart-card"),
-    dcc.Graph(figure=fig_access, className="chart-card"),
-    dcc.Graph(figure=fig_forum_2, className="chart-card"),
+    dcc.Graph(figure=figures["fig_na"], className="chart-card"),
+    dcc.Graph(id="fig-corr", figure=figures["fig_corr"], className="chart-card"),
+    dcc.Graph(figure=figures["fig_corr_matrix"], className="chart-card", style={"height": "600px"}),
+    dcc.Graph(id="fig-util", figure=figures["fig_util"], className="chart-card"),
+    dcc.Graph(figure=figures["fig_support"], className="chart-card"),
+    dcc.Graph(figure=figures["fig_access"], className="chart-card"),
 
     html.H4("Temporal Trend Analysis", className="my-3"),
-    dcc.Graph(figure=fig_forum_2, className="chart-card"),
+    TemporalTrendsComponent(time_pyramid),
 
     dbc.Col(DemographyForm(), width=12),
 
@@ -2020,18 +1054,28 @@ app.layout = dbc.Container([
     dbc.Col(register_callbacks(app, merged_df, "student-qna")),
 
     dbc.Row([
-        dbc.Col(
-            dcc.Graph(
-                figure=PerformanceImpactChart(merged_df, label_encoders),
-                className="chart-card",
-                style={"height": "600px"}
-            ), width=6
-        ),
+        dbc.Col(PerformanceImpactGraph(merged_df, label_encoders), width=6),
 
     ]),
-    dbc.Col(WhatIfPerformanceComponent(merged_df, label_encoders))
+    ShapInteractionComponent(shap_interactions, label_encoders),
+    dbc.Col(WhatIfPerformanceComponent(merged_df, label_encoders)),
+
+    dbc.Col(StudentDetailComponent(student_index, label_encoders)),
+
+    html.H4("Model Monitoring", className="my-3"),
+    FeatureDriftPanel(drift_report)
 
 ])
+
+# Compression, ETags and asset cache headers on the Flask server
+install_response_caching(app)
+# Prometheus-format latency/counter metrics on /metrics
+install_metrics_route(app)
+
+# Zoom callbacks for the row-count aware scatter plots
+for graph_id in SCATTER_SPECS:
+    register_scatter_zoom(app, graph_id)
+
 if __name__ == "__main__":
     app.run(debug=True)
 
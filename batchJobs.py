@@ -0,0 +1,318 @@
+#!/usr/bin/env python
+"""
+Offline jobs that otherwise only run inside the Dash workers.
+
+    python batchJobs.py caches [--full] [--sqlite]         streaming states, SQLite database
+    python batchJobs.py score cohort.csv --output scores.csv --workers 4
+    python batchJobs.py score --data /srv/cohort --output scores.csv
+    python batchJobs.py aggregates --output reports/       one CSV per dashboard aggregate
+    python batchJobs.py shap [--top-k 20] [--max-rows 2000]
+
+Every command takes --data DIR (default DATA_DIR) and reports the wall time,
+rows and rows per second of each stage on stderr; --report FILE also writes
+them as JSON. Run them from cron so the serving workers find warm caches and
+only read what these jobs wrote:
+
+    0 2 * * *   cd /srv/studentRefactory && python batchJobs.py caches && python batchJobs.py shap
+
+score reads a CSV holding the model's feature columns (any merged_df export)
+in chunks of --chunk-rows rows and scores them over a pool of --workers
+processes, each loading the model once. At most two chunks per worker are in
+flight, so memory stays bounded whatever the file size. The output keeps the
+--keep columns and adds the predicted score, in input order; it is written to
+a temporary file and renamed into place.
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from queryBackend import AGGREGATES, DATA_BACKEND, SQLITE_PATH, SqliteBackend, build_database, make_backend
+from streamingStats import CARD_STATS_PATH, COMOMENTS_PATH, SKETCH_PATH, card_state, correlation_state, \
+    sketch_state
+from studentData import TARGET_COL, add_derived_columns, add_grade_columns, data_dir, load_sources, merge_sources
+
+
+CHUNK_ROWS = 50_000
+PREDICTION_COL = f"Predicted {TARGET_COL}"
+KEEP_COLUMNS = ["StudentID"]
+
+# Model and encoders of a scoring process, loaded once by _load_scorer
+_scorer = {}
+
+
+class StageLog:
+    """Wall time, rows and throughput per named stage of a job."""
+
+    def __init__(self):
+        self.stages = []
+
+    @contextlib.contextmanager
+    def stage(self, name, rows=None):
+        """Times the block; set record["rows"] (or rename record["stage"]) inside it as needed."""
+        record = {"stage": name, "rows": rows}
+        start = time.perf_counter()
+        yield record
+        self.add(record["stage"], time.perf_counter() - start, record["rows"])
+
+    def add(self, name, seconds, rows=None):
+        throughput = rows / seconds if rows and seconds > 0 else None
+        self.stages.append({"stage": name, "rows": rows, "seconds": round(seconds, 4),
+                            "rows_per_second": round(throughput, 1) if throughput else None})
+        rate = f"{throughput:12.0f} rows/s" if throughput else ""
+        print(f"{name:<36} {rows if rows is not None else '':>10} {seconds:10.3f}s {rate}", file=sys.stderr)
+
+    def write(self, path, **meta):
+        with open(path, "w") as f:
+            json.dump({**meta, "stages": self.stages}, f, indent=2)
+
+
+def cache_paths(cleanup, directory=None):
+    """
+    {state: path} of the streaming states and the SQLite database for the data
+    in directory. For the dashboard's DATA_DIR these are the files it serves;
+    for any other directory they go to a temporary directory (removed by the
+    cleanup ExitStack), so another cohort never replaces the dashboard's caches.
+    """
+    paths = {"comoments": COMOMENTS_PATH, "card_stats": CARD_STATS_PATH, "sketches": SKETCH_PATH,
+             "sqlite": SQLITE_PATH}
+    if directory is None or os.path.abspath(directory) == os.path.abspath(data_dir()):
+        return paths
+    scratch = cleanup.enter_context(tempfile.TemporaryDirectory(prefix="caches-"))
+    return {name: os.path.join(scratch, os.path.basename(path)) for name, path in paths.items()}
+
+
+def rebuild_caches(log, directory=None, full=False, sqlite=False):
+    """
+    Brings the streaming states (see streamingStats) up to date with the data,
+    from scratch with full, and rebuilds the SQLite database with sqlite.
+    Only the dashboard's DATA_DIR updates its caches; another directory is
+    timed against temporary files (see cache_paths).
+    """
+    with contextlib.ExitStack() as cleanup:
+        paths = cache_paths(cleanup, directory)
+        merged_df = None
+        if full:
+            for name in ("comoments", "card_stats", "sketches"):
+                if os.path.exists(paths[name]):
+                    os.remove(paths[name])
+            # One load for all three states instead of one per state and data unit
+            with log.stage("load") as record:
+                merged_df = add_grade_columns(merge_sources(*load_sources(directory)))
+                record["rows"] = len(merged_df)
+        for name, build in (("comoments", correlation_state), ("card_stats", card_state),
+                            ("sketches", sketch_state)):
+            with log.stage(name, len(merged_df) if merged_df is not None else None):
+                build(merged_df, path=paths[name], directory=directory)
+        if sqlite:
+            with log.stage("sqlite"):
+                build_database(paths["sqlite"], directory)
+
+
+def _load_scorer(model_path=None, encoders_path=None):
+    import joblib
+    from trainModel import ENCODERS_FILE, MODEL_FILE
+
+    _scorer["model"] = joblib.load(model_path or MODEL_FILE)
+    _scorer["encoders"] = joblib.load(encoders_path or ENCODERS_FILE)
+
+
+def _score_chunk(item):
+    """(scored chunk, seconds) for one (chunk, keep) item, in a scoring process."""
+    from trainModel import encode_features
+
+    chunk, keep = item
+    start = time.perf_counter()
+    model = _scorer["model"]
+    X = encode_features(chunk, _scorer["encoders"], model.feature_names_in_)
+    scored = chunk[[col for col in keep if col in chunk.columns]].copy()
+    scored[PREDICTION_COL] = model.predict(X)
+    return scored, time.perf_counter() - start
+
+
+def _pipelined(pool, func, items, window):
+    """pool.submit(func, item) for every item, results in order, at most window in flight."""
+    pending = deque()
+    for item in items:
+        pending.append(pool.submit(func, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def score(log, chunks, output, workers=1, keep=KEEP_COLUMNS, model_path=None, encoders_path=None):
+    """
+    Scores an iterable of merged_df-like chunks over workers processes and
+    writes the kept columns plus PREDICTION_COL to the CSV output. Returns
+    the number of rows scored.
+    """
+    # Forked workers inherit the loaded model (and sklearn); others load their own
+    with log.stage("load_model"):
+        _load_scorer(model_path, encoders_path)
+    items = ((chunk, keep) for chunk in chunks)
+    tmp_path = f"{output}.{os.getpid()}.tmp"
+    rows = 0
+    predict_seconds = write_seconds = 0.0
+    start = time.perf_counter()
+    with contextlib.ExitStack() as stack:
+        if workers > 1:
+            if "fork" in multiprocessing.get_all_start_methods():
+                pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("fork"))
+            else:
+                pool = ProcessPoolExecutor(workers, initializer=_load_scorer, initargs=(model_path, encoders_path))
+            results = _pipelined(stack.enter_context(pool), _score_chunk, items, 2 * workers)
+        else:
+            results = map(_score_chunk, items)
+        try:
+            with open(tmp_path, "w", newline="") as f:
+                for scored, seconds in results:
+                    predict_seconds += seconds
+                    write_start = time.perf_counter()
+                    scored.to_csv(f, header=rows == 0, index=False)
+                    write_seconds += time.perf_counter() - write_start
+                    rows += len(scored)
+            os.replace(tmp_path, output)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    # Predict time is summed over the workers, so it exceeds the wall time when they overlap
+    log.add("score:predict", predict_seconds, rows)
+    log.add("score:write", write_seconds, rows)
+    log.add("score", time.perf_counter() - start, rows)
+    return rows
+
+
+def timed_chunks(log, chunks):
+    """Yields chunks, logging the time spent producing them (CSV parsing) as score:read."""
+    seconds, rows = 0.0, 0
+    chunks = iter(chunks)
+    while True:
+        start = time.perf_counter()
+        chunk = next(chunks, None)
+        seconds += time.perf_counter() - start
+        if chunk is None:
+            break
+        rows += len(chunk)
+        yield chunk
+    log.add("score:read", seconds, rows)
+
+
+def frame_chunks(df, chunk_rows=CHUNK_ROWS):
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def export_aggregates(log, output_dir, directory=None, backend_kind=DATA_BACKEND):
+    """
+    Writes every dashboard aggregate (queryBackend.AGGREGATES), the feature
+    correlations and the KPI card summary as CSV files into output_dir. For a
+    directory other than DATA_DIR, the SQLite database and the streaming states
+    are built in a temporary directory (see cache_paths); the dashboard's stay as they are.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    with contextlib.ExitStack() as cleanup:
+        state_paths = cache_paths(cleanup, directory)
+        if backend_kind == "pandas":
+            with log.stage("load") as record:
+                merged_df = add_derived_columns(merge_sources(*load_sources(directory)))
+                record["rows"] = len(merged_df)
+            backend = make_backend(merged_df, backend_kind)
+        elif state_paths["sqlite"] != SQLITE_PATH:
+            with log.stage("sqlite"):
+                backend = SqliteBackend(build_database(state_paths["sqlite"], directory))
+        else:
+            backend = make_backend(None, backend_kind)
+
+        exports = {name: (lambda name=name: backend.aggregate(name)) for name in AGGREGATES}
+        exports["correlation"] = lambda: correlation_state(path=state_paths["comoments"], directory=directory) \
+            .corr().rename_axis("Feature")
+        exports["card_stats"] = lambda: card_state(path=state_paths["card_stats"], directory=directory).summary()
+        for name, compute in exports.items():
+            with log.stage(f"aggregate:{name}") as record:
+                result = compute()
+                record["rows"] = len(result)
+                path = os.path.join(output_dir, f"{name}.csv")
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                result.to_csv(tmp_path, index=not isinstance(result.index, pd.RangeIndex))
+                os.replace(tmp_path, path)
+            paths.append(path)
+    return paths
+
+
+def precompute_shap(log, directory=None, top_k=None, max_rows=None):
+    """SHAP interactions of the published model over the data (see shapInteractions)."""
+    from shapInteractions import INTERACTIONS_PATH, MAX_ROWS, TOP_K, precompute
+
+    previous = os.path.getmtime(INTERACTIONS_PATH) if os.path.exists(INTERACTIONS_PATH) else None
+    with log.stage("shap_interactions") as record:
+        interactions = precompute(directory, INTERACTIONS_PATH, top_k or TOP_K, max_rows or MAX_ROWS)
+        if os.path.getmtime(INTERACTIONS_PATH) == previous:
+            record["stage"] = "shap_interactions:stored"
+        else:
+            record["rows"] = len(interactions.X)
+    return INTERACTIONS_PATH
+
+
+def main(argv=None):
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--data", help="data directory (default DATA_DIR)")
+    common.add_argument("--report", help="also write the stage timings as JSON here")
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    caches = commands.add_parser("caches", parents=[common], help="update the streaming states and the SQLite database")
+    caches.add_argument("--full", action="store_true", help="rebuild the states from scratch")
+    caches.add_argument("--sqlite", action="store_true", default=DATA_BACKEND == "sqlite",
+                        help="rebuild the SQLite database (default with DATA_BACKEND=sqlite)")
+
+    scoring = commands.add_parser("score", parents=[common], help="predict the performance score of a cohort")
+    scoring.add_argument("input", nargs="?", help="CSV with the model features (default: merged --data)")
+    scoring.add_argument("--output", required=True)
+    scoring.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    scoring.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    scoring.add_argument("--keep", nargs="*", default=KEEP_COLUMNS, help="input columns copied to the output")
+
+    aggregates = commands.add_parser("aggregates", parents=[common], help="export the dashboard aggregates as CSV")
+    aggregates.add_argument("--output", required=True, help="directory for the CSV files")
+    aggregates.add_argument("--backend", choices=["pandas", "sqlite"], default=DATA_BACKEND)
+
+    shap = commands.add_parser("shap", parents=[common], help="precompute the SHAP interactions")
+    shap.add_argument("--top-k", type=int)
+    shap.add_argument("--max-rows", type=int)
+    args = parser.parse_args(argv)
+
+    log = StageLog()
+    start = time.perf_counter()
+    if args.command == "caches":
+        rebuild_caches(log, args.data, full=args.full, sqlite=args.sqlite)
+    elif args.command == "score":
+        if args.input:
+            chunks = pd.read_csv(args.input, chunksize=args.chunk_rows)
+        else:
+            with log.stage("load") as record:
+                merged_df = merge_sources(*load_sources(args.data))
+                record["rows"] = len(merged_df)
+            chunks = frame_chunks(merged_df, args.chunk_rows)
+        score(log, timed_chunks(log, chunks), args.output, args.workers, args.keep)
+    elif args.command == "aggregates":
+        export_aggregates(log, args.output, args.data, args.backend)
+    elif args.command == "shap":
+        precompute_shap(log, args.data, args.top_k, args.max_rows)
+    log.add("total", time.perf_counter() - start)
+
+    if args.report:
+        log.write(args.report, command=args.command, argv=sys.argv[1:] if argv is None else list(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
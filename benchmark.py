@@ -0,0 +1,413 @@
+#!/usr/bin/env python
+"""
+Benchmark suite for data loading, figure builds, SHAP and callback latency.
+
+    python benchmark.py --rows 1000 10000 100000 --output bench.json
+    python benchmark.py --rows 1000 --compare bench.json
+
+Import time of the headless data modules is timed first, in a fresh
+interpreter per run:
+
+  import:pandas                       the floor every data module pays
+  import:data_modules                 LIGHT_MODULES together; fails if any of
+                                      HEAVY_MODULES got imported along the way
+
+For every size a synthetic cohort (see syntheticData) is written to a temporary
+directory, next to another one for the caches the dashboard builds over it
+(the .cache files of the real dashboard are left alone), and the following
+stages are timed:
+
+  csv_load, merge, grade_conversion   the studentData functions
+  dashboard:<label>                   every top-level statement of analyseData run
+                                      against the cohort, grouped into imports,
+                                      figure_warm_up, app_layout and the rest
+  dashboard:figure:<name>             build time of each figureRegistry spec, as
+                                      recorded by the warm-up (--figure-workers)
+  performance_impact_chart            PerformanceImpactChart over the whole cohort, from an
+                                      empty prediction cache
+  model_predict                       encode_features + model.predict
+  shap_approximate                    shapSampling.estimate_importance with the default
+                                      sample and background (see shapSampling for accuracy)
+  update_shap, ask_gemini             real callback round-trips through the Flask test
+                                      client, polling background jobs to completion;
+                                      the LLM is llmBackend.StubBackend (--llm-latency,
+                                      --llm-token-delay), which plans the question
+                                      as ASK_PLAN (see queryPlan)
+  ask_gemini:first_chunk              until the first streamed words reach the output
+
+Dashboard stages run the SHAP passes over every row, so they are skipped above
+--max-dashboard-rows. Results are written as JSON (one record per stage and
+size, with the git commit) so runs can be compared across commits.
+"""
+import argparse
+import ast
+import contextlib
+import functools
+import io
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import studentData
+from llmBackend import StubBackend
+from queryPlan import PLAN_PROMPT
+from shapSampling import estimate_importance
+from syntheticData import write_sources
+
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DASHBOARD_SOURCE = os.path.join(ROOT, "analyseData.py")
+
+# Flag regressions in --compare output above this slowdown
+REGRESSION_RATIO = 1.2
+# Seconds between result polls of a background callback
+POLL_INTERVAL = 0.02
+# analyseData functions that keep state on disk -> (path argument, file in the run's cache dir)
+CACHE_FILES = {
+    "make_backend": ("path", "student.db"),
+    "correlation_state": ("path", "comoments.npz"),
+    "card_state": ("path", "card_stats.npz"),
+    "sketch_state": ("path", "sketches.npz"),
+    "stored_interactions": ("path", "shap_interactions.npz"),
+    "make_job_manager": ("directory", "jobs"),
+}
+# Loading, cleaning and aggregation, importable by batch jobs without the dashboard
+LIGHT_MODULES = ("studentData", "queryBackend", "streamingStats", "studentIndex", "driftMonitor",
+                 "predictionCache", "sharedDataset", "llmBackend", "queryPlan", "timePyramid")
+# Imported lazily where they are used, never by LIGHT_MODULES
+HEAVY_MODULES = ("dash", "plotly", "shap", "sklearn", "joblib", "google.generativeai", "dotenv")
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+for name in sys.argv[1:]:
+    __import__(name)
+seconds = time.perf_counter() - start
+print(json.dumps({"seconds": seconds, "modules": sorted(sys.modules)}))
+"""
+
+
+# The query plan the stub LLM answers the ask_gemini question with
+ASK_PLAN = {"group_by": ["District"], "metrics": [{"column": "Average Grade", "agg": "mean"}],
+            "sort": {"column": "mean(Average Grade)", "descending": True}, "limit": 1}
+
+
+def stub_answer(prompt):
+    if prompt.startswith(PLAN_PROMPT[:PLAN_PROMPT.index("\n")]):
+        return json.dumps(ASK_PLAN)
+    return None
+
+
+# Stands in for the dashboard's LLM; --llm-latency and --llm-token-delay set its timing
+STUB_LLM = StubBackend(answer=stub_answer)
+
+
+def time_call(func, repeat):
+    runs, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        runs.append(time.perf_counter() - start)
+    return runs, result
+
+
+def run_dashboard(directory, cache_dir):
+    """
+    Executes analyseData statement by statement against the cohort in directory.
+    Returns the module namespace and seconds per statement label.
+    The streaming states, SQLite file, SHAP interactions and job cache it
+    builds go to cache_dir (see CACHE_FILES), not to the dashboard's .cache.
+    """
+    with open(DASHBOARD_SOURCE) as f:
+        tree = ast.parse(f.read(), DASHBOARD_SOURCE)
+
+    namespace = {"__name__": "analyseData", "__file__": DASHBOARD_SOURCE}
+    timings = defaultdict(float)
+    previous_dir = os.environ.get("DATA_DIR")
+    os.environ["DATA_DIR"] = directory
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            for stmt in tree.body:
+                code = compile(ast.Module(body=[stmt], type_ignores=[]), DASHBOARD_SOURCE, "exec")
+                start = time.perf_counter()
+                exec(code, namespace)
+                timings[statement_label(stmt)] += time.perf_counter() - start
+                _redirect_caches(namespace, cache_dir)
+        for name, seconds in namespace.get("figure_build_seconds", {}).items():
+            timings[f"figure:{name}"] = seconds
+    finally:
+        if previous_dir is None:
+            os.environ.pop("DATA_DIR", None)
+        else:
+            os.environ["DATA_DIR"] = previous_dir
+
+    namespace["llm"] = STUB_LLM
+    return namespace, timings
+
+
+def _redirect_caches(namespace, cache_dir):
+    # The cache paths are read when their modules are first imported, so setting
+    # COMOMENTS_PATH & co. here would not reach them; bind them into the calls instead
+    for name, (argument, filename) in CACHE_FILES.items():
+        func = namespace.get(name)
+        if func is not None and not isinstance(func, functools.partial):
+            namespace[name] = functools.partial(func, **{argument: os.path.join(cache_dir, filename)})
+
+
+def statement_label(stmt):
+    """Attributes a top-level statement to the figure it builds or styles."""
+    if isinstance(stmt, (ast.Import, ast.ImportFrom)):
+        return "imports"
+    if isinstance(stmt, (ast.FunctionDef, ast.ClassDef)):
+        return "definitions"
+    if isinstance(stmt, ast.Assign):
+        for target in stmt.targets:
+            if any(isinstance(node, ast.Name) and node.id == "figures" for node in ast.walk(target)):
+                return "figure_warm_up"
+            if isinstance(target, ast.Name) and target.id.startswith("fig_"):
+                return target.id
+            if isinstance(target, ast.Attribute) and target.attr == "layout":
+                return "app_layout"
+    if isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Call):
+        func = stmt.value.func
+        if isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name) \
+                and func.value.id.startswith("fig_"):
+            return func.value.id
+    return "other"
+
+
+def post_callback(client, output, inputs, state=(), progress=None):
+    """
+    Runs a callback like the browser does and returns the final response.
+    Progress updates of a background callback are appended to progress as
+    (seconds since the request, {output: value}).
+    """
+    payload = {
+        "output": output,
+        "outputs": dict(zip(("id", "property"), output.rsplit(".", 1))),
+        "inputs": [dict(zip(("id", "property", "value"), item)) for item in inputs],
+        "state": [dict(zip(("id", "property", "value"), item)) for item in state],
+        "changedPropIds": [f"{inputs[0][0]}.{inputs[0][1]}"],
+    }
+    start = time.perf_counter()
+    response = client.post("/_dash-update-component", json=payload)
+    body = response.get_json(silent=True) or {}
+    # Background callbacks answer with a job id first; poll like the browser does
+    while response.status_code == 200 and "job" in body and "response" not in body:
+        time.sleep(POLL_INTERVAL)
+        response = client.post(
+            f"/_dash-update-component?cacheKey={body['cacheKey']}&job={body['job']}", json=payload)
+        update = response.get_json(silent=True) or {}
+        if progress is not None and update.get("progress"):
+            progress.append((time.perf_counter() - start, update["progress"]))
+        body = {**body, **update}
+    if response.status_code != 200:
+        raise RuntimeError(f"{output} callback failed with HTTP {response.status_code}")
+    return response
+
+
+def stage_result(stage, rows, runs):
+    print(f"{rows:>10} {stage:<40} {min(runs):10.4f}s", file=sys.stderr)
+    return {
+        "stage": stage,
+        "rows": rows,
+        "min_seconds": min(runs),
+        "median_seconds": statistics.median(runs),
+        "runs": runs,
+    }
+
+
+def import_seconds(modules):
+    """Seconds to import modules in a fresh interpreter, and every module that got loaded."""
+    output = subprocess.run([sys.executable, "-c", IMPORT_PROBE, *modules], cwd=ROOT,
+                            capture_output=True, text=True, check=True).stdout
+    probe = json.loads(output.splitlines()[-1])
+    return probe["seconds"], probe["modules"]
+
+
+def benchmark_imports(repeat):
+    results = []
+    for stage, modules in (("import:pandas", ["pandas"]), ("import:data_modules", LIGHT_MODULES)):
+        runs = []
+        for _ in range(repeat):
+            seconds, loaded = import_seconds(modules)
+            runs.append(seconds)
+        heavy = [name for name in HEAVY_MODULES if name in loaded]
+        if heavy:
+            raise RuntimeError(f"importing {', '.join(modules)} pulls in {', '.join(heavy)}")
+        results.append(stage_result(stage, 0, runs))
+    return results
+
+
+def benchmark_size(rows, repeat, max_dashboard_rows, seed):
+    results = []
+
+    def record(stage, runs):
+        results.append(stage_result(stage, rows, runs))
+
+    with tempfile.TemporaryDirectory(prefix="student-bench-") as directory, \
+            tempfile.TemporaryDirectory(prefix="student-bench-cache-") as cache_dir:
+        write_sources(directory, rows, seed=seed)
+
+        runs, sources = time_call(lambda: studentData.load_sources(directory), repeat)
+        record("csv_load", runs)
+        runs, merged = time_call(lambda: studentData.merge_sources(*sources), repeat)
+        record("merge", runs)
+        runs, _ = time_call(lambda: studentData.melt_grades(studentData.add_grade_columns(merged)), repeat)
+        record("grade_conversion", runs)
+
+        if rows > max_dashboard_rows:
+            return results
+
+        dashboard_runs = defaultdict(list)
+        for _ in range(repeat):
+            namespace, timings = run_dashboard(directory, cache_dir)
+            for label, seconds in timings.items():
+                dashboard_runs[label].append(seconds)
+        for label, runs in sorted(dashboard_runs.items()):
+            record(f"dashboard:{label}", runs)
+
+        merged_df = namespace["merged_df"]
+        label_encoders = namespace["label_encoders"]
+        prediction_cache = namespace["prediction_cache"]
+
+        def impact_chart():
+            # Time the SHAP pass itself, not prediction cache hits
+            prediction_cache.clear()
+            return namespace["PerformanceImpactChart"](merged_df, label_encoders)
+
+        runs, _ = time_call(impact_chart, repeat)
+        record("performance_impact_chart", runs)
+
+        model = namespace["model"]
+        encode = namespace["encode_features"]
+        runs, _ = time_call(lambda: model.predict(encode(merged_df, label_encoders)), repeat)
+        record("model_predict", runs)
+        X = encode(merged_df, label_encoders)
+        runs, _ = time_call(lambda: estimate_importance(model, X), repeat)
+        record("shap_approximate", runs)
+
+        client = namespace["app"].server.test_client()
+        runs, _ = time_call(lambda: post_callback(
+            client,
+            "whatif-performance-shap-graph.figure",
+            [("whatif-performance-attendance-slider", "value", 80),
+             ("whatif-performance-hours-slider", "value", 5)],
+        ), repeat)
+        record("update_shap", runs)
+        first_chunk = []
+        questions = itertools.count(1)
+
+        def ask():
+            # A new question per run, so none is served from the job result cache
+            question = f"Which district has the highest average grade? (run {os.getpid()}-{next(questions)})"
+            updates = []
+            response = post_callback(
+                client,
+                "student-qna-output.children",
+                [("student-qna-btn", "n_clicks", 1)],
+                [("student-qna-input", "value", question)],
+                progress=updates,
+            )
+            streamed = [seconds for seconds, update in updates if update.get("student-qna-output.children")]
+            if streamed:
+                first_chunk.append(streamed[0])
+            return response
+
+        runs, _ = time_call(ask, repeat)
+        record("ask_gemini", runs)
+        if first_chunk:
+            record("ask_gemini:first_chunk", first_chunk)
+
+    return results
+
+
+def environment():
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+        except OSError:
+            return ""
+
+    packages = {}
+    for name in ("pandas", "numpy", "plotly", "dash", "shap", "sklearn"):
+        try:
+            packages[name] = __import__(name).__version__
+        except ImportError:
+            packages[name] = None
+
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "packages": packages,
+    }
+
+
+def compare(baseline, results):
+    """Prints median timings side by side with a baseline run."""
+    base = {(r["stage"], r["rows"]): r["median_seconds"] for r in baseline["results"]}
+    print(f"baseline commit {baseline.get('commit', '?')[:10]}")
+    print(f"{'stage':<40} {'rows':>10} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for r in results:
+        key = (r["stage"], r["rows"])
+        if key not in base:
+            continue
+        ratio = r["median_seconds"] / base[key] if base[key] else float("inf")
+        flag = "  SLOWER" if ratio > REGRESSION_RATIO else ""
+        print(f"{r['stage']:<40} {r['rows']:>10} {base[key]:>10.4f} {r['median_seconds']:>10.4f} {ratio:>7.2f}{flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000],
+                        help="merged row counts to benchmark (10^3 to 10^7)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage; min and median are kept")
+    parser.add_argument("--max-dashboard-rows", type=int, default=100_000,
+                        help="skip dashboard, SHAP and callback stages above this size")
+    parser.add_argument("--figure-workers", type=int,
+                        help="processes for the figure warm-up (default: one per core)")
+    parser.add_argument("--llm-latency", type=float, default=0.0,
+                        help="seconds before the stub LLM's first word")
+    parser.add_argument("--llm-token-delay", type=float, default=0.0,
+                        help="seconds between the stub LLM's words")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--compare", help="results JSON of an earlier run to compare against")
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT)  # the dashboard loads its model files by relative path
+    if args.figure_workers:
+        os.environ["FIGURE_WORKERS"] = str(args.figure_workers)
+    STUB_LLM.latency = args.llm_latency
+    STUB_LLM.token_delay = args.llm_token_delay
+    warnings.simplefilter("ignore")
+
+    results = benchmark_imports(args.repeat)
+    for rows in args.rows:
+        results.extend(benchmark_size(rows, args.repeat, args.max_dashboard_rows, args.seed))
+
+    report = {**environment(), "repeat": args.repeat, "figure_workers": args.figure_workers,
+              "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+"""
+Feature drift between the data the model was trained on and the data it scores.
+
+    reference = DriftReference.from_frame(training_df, model.feature_names_in_)
+    reference.save()                           # drift_reference.json, next to the model
+    report = DriftReference.load().report(merged_df)
+
+    python driftMonitor.py reference           # rebuild the reference from DATA_DIR
+    python driftMonitor.py check [--data DIR]  # drift of every cohort/month of DIR
+
+At training time each feature is binned once: numeric features into
+reference deciles plus a missing-value bin, categorical ones into the labels
+seen in training plus one bin for unseen labels and one for missing values.
+Only the bin edges or labels and the reference counts are kept. New data is
+binned with one searchsorted or category lookup per feature, so a report over
+a whole cohort costs a few vectorised passes and can run on every ingest.
+
+Per feature the report gives the population stability index (PSI) and, for
+numeric features, the Kolmogorov-Smirnov distance between the binned CDFs (a
+lower bound of the exact KS statistic). PSI below 0.1 is read as stable, up to
+0.25 as moderate drift and above as significant.
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from metrics import gauge
+from studentData import CATEGORICAL_COLS, merge_sources, source_units
+
+
+REFERENCE_FILE = "drift_reference.json"
+REFERENCE_PATH = os.getenv("DRIFT_REFERENCE", REFERENCE_FILE)
+BINS = 10
+# Calendar labels; every new cohort brings dates training never saw
+EXCLUDE = ("Start Date", "End Date", "Date")
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+# Floor for empty bins, so PSI stays finite
+EPSILON = 1e-4
+STATUS_COLORS = {"stable": "#2a9d8f", "moderate": "#e9c46a", "significant": "#e76f51"}
+
+
+class DriftReference:
+    """Binned reference distribution of each model feature."""
+
+    def __init__(self, features):
+        # {feature: {"kind": "numeric", "edges": [...], "counts": [...]}
+        #  or {"kind": "categorical", "labels": [...], "counts": [...]}}
+        self.features = features
+
+    @classmethod
+    def from_frame(cls, df, features, categorical=CATEGORICAL_COLS, bins=BINS):
+        categorical = set(categorical)
+        specs = {}
+        for feature in features:
+            if feature in EXCLUDE:
+                continue
+            values = df[feature]
+            if feature in categorical:
+                spec = {"kind": "categorical", "labels": sorted(values.dropna().astype(str).unique())}
+            else:
+                values = values.to_numpy(dtype=float)
+                finite = values[~np.isnan(values)]
+                edges = np.quantile(finite, np.linspace(0, 1, bins + 1)[1:-1]) if finite.size else []
+                spec = {"kind": "numeric", "edges": np.unique(edges).tolist()}
+            spec["counts"] = _bin_counts(spec, values).tolist()
+            specs[feature] = spec
+        return cls(specs)
+
+    @classmethod
+    def load(cls, path=REFERENCE_PATH):
+        with open(path) as f:
+            return cls(json.load(f)["features"])
+
+    def save(self, path=REFERENCE_PATH):
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, "w") as f:
+            json.dump({"bins": BINS, "features": self.features}, f, indent=1)
+        os.replace(tmp_path, path)
+        return path
+
+    def report(self, df):
+        """
+        One row per reference feature present in df: feature, kind, rows, psi,
+        ks (NaN for categorical features) and status, most drifted first.
+        """
+        rows = []
+        for feature, spec in self.features.items():
+            if feature not in df.columns:
+                continue
+            counts = _bin_counts(spec, df[feature])
+            reference = np.asarray(spec["counts"], dtype=float)
+            psi = population_stability(reference, counts)
+            rows.append({
+                "feature": feature,
+                "kind": spec["kind"],
+                "rows": int(counts.sum()),
+                "psi": psi,
+                "ks": binned_ks(reference, counts) if spec["kind"] == "numeric" else np.nan,
+                "status": drift_status(psi),
+            })
+        report = pd.DataFrame(rows, columns=["feature", "kind", "rows", "psi", "ks", "status"])
+        return report.sort_values("psi", ascending=False, kind="mergesort").reset_index(drop=True)
+
+
+def _bin_counts(spec, values):
+    """Counts of values per bin of spec; the missing-value bin comes last."""
+    if spec["kind"] == "numeric":
+        values = np.asarray(values, dtype=float)
+        missing = np.isnan(values)
+        codes = np.searchsorted(spec["edges"], values, side="right")
+        n_bins = len(spec["edges"]) + 1
+    else:
+        # Factorise first so only the distinct values are converted and looked up
+        values, uniques = pd.factorize(values)
+        missing = values < 0
+        n_bins = len(spec["labels"]) + 1
+        label_codes = pd.Index(spec["labels"]).get_indexer(uniques.astype(str))
+        label_codes[label_codes < 0] = n_bins - 1  # unseen labels
+        codes = label_codes[values] if len(label_codes) else np.zeros(len(values), dtype=np.int64)
+    codes[missing] = n_bins
+    return np.bincount(codes, minlength=n_bins + 1)
+
+
+def population_stability(reference, counts):
+    """PSI of the binned distribution counts against reference."""
+    if counts.sum() == 0 or reference.sum() == 0:
+        return np.nan
+    p = np.maximum(reference / reference.sum(), EPSILON)
+    q = np.maximum(counts / counts.sum(), EPSILON)
+    return float(np.sum((q - p) * np.log(q / p)))
+
+
+def binned_ks(reference, counts):
+    """Largest gap between the two CDFs, evaluated at the bin edges."""
+    if counts.sum() == 0 or reference.sum() == 0:
+        return np.nan
+    return float(np.abs(np.cumsum(reference) / reference.sum() - np.cumsum(counts) / counts.sum()).max())
+
+
+def drift_status(psi):
+    if np.isnan(psi) or psi < PSI_MODERATE:
+        return "stable"
+    return "moderate" if psi < PSI_SIGNIFICANT else "significant"
+
+
+def record_drift(report, **labels):
+    """Exposes a report as feature_drift_psi / feature_drift_ks gauges on /metrics."""
+    for row in report.itertuples(index=False):
+        gauge("feature_drift_psi", row.psi, feature=row.feature, **labels)
+        if not np.isnan(row.ks):
+            gauge("feature_drift_ks", row.ks, feature=row.feature, **labels)
+    gauge("feature_drift_significant", int((report["status"] == "significant").sum()), **labels)
+
+
+def drift_by_unit(reference, directory=None):
+    """Reports for every cohort/month unit of directory (see studentData.source_units), stacked."""
+    reports = []
+    for key, _, load in source_units(directory):
+        report = reference.report(merge_sources(*load()))
+        report.insert(0, "unit", key)
+        reports.append(report)
+    return pd.concat(reports, ignore_index=True) if reports else pd.DataFrame()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("command", choices=["reference", "check"])
+    parser.add_argument("--data", help="data directory (default DATA_DIR)")
+    parser.add_argument("--reference", default=REFERENCE_PATH)
+    args = parser.parse_args(argv)
+
+    if args.command == "reference":
+        import joblib
+        from trainModel import MODEL_FILE, training_frame
+
+        features = joblib.load(MODEL_FILE).feature_names_in_
+        print(DriftReference.from_frame(training_frame(args.data), features).save(args.reference))
+        return
+
+    report = drift_by_unit(DriftReference.load(args.reference), args.data)
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(report.round(4).to_string(index=False))
+    significant = report[report["status"] == "significant"]
+    print(f"\n{len(significant)} significant drifts in {report['unit'].nunique()} units")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
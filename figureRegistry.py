@@ -0,0 +1,599 @@
+"""
+Declarative registry of the dashboard figures.
+
+Every fig_* chart is a FigureSpec: the dataset it plots, the chart builder,
+the builder arguments, a styling theme plus per-figure layout overrides, and
+trace updates. build_figure() renders one spec independently of the others,
+so warm_up() can fan all of them out over a process pool (FIGURE_WORKERS,
+default one per core) and record how long each figure took to build. Every
+gunicorn worker warms up on its own, so gunicorn.conf.py splits the cores
+between them instead.
+
+    figures, build_seconds = warm_up(merged_df=merged_df, grade_sketches=grade_sketches, backend=backend,
+                                     comoments=comoments, time_pyramid=time_pyramid)
+
+The temporal figures read timeline:<view> datasets from the timePyramid in
+the context, over its date_range (default: every date), so build_figure()
+re-renders them for another window without touching merged_df.
+"""
+import multiprocessing
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import plotly.express as px
+
+from figureScaling import adaptive_scatter, register_scatter_spec
+from metrics import observe
+from queryBackend import AGGREGATES
+from summaryStats import summary_box_figure, summary_violin_figure
+from timePyramid import VIEWS
+
+
+FIGURE_WORKERS = int(os.getenv("FIGURE_WORKERS", os.cpu_count() or 1))
+
+FigureSpec = namedtuple("FigureSpec", "data chart args theme layout traces")
+FigureSpec.__new__.__defaults__ = (None, None, None)
+
+CHARTS = {
+    "scatter": adaptive_scatter,
+    "box": summary_box_figure,
+    "violin": summary_violin_figure,
+    "bar": px.bar,
+    "line": px.line,
+    "pie": px.pie,
+    "histogram": px.histogram,
+    "line_polar": px.line_polar,
+    "sunburst": px.sunburst,
+    "imshow": px.imshow,
+}
+
+
+# Themes
+
+REPORT_AXIS = dict(gridcolor='#e0e0e0', linecolor='#2c3e50', zerolinecolor='#cccccc')
+TEAL_AXIS = dict(gridcolor='#e0e0e0', linecolor='#264653', zerolinecolor='#264653')
+
+THEMES = {
+    "report": dict(
+        plot_bgcolor='#f7f7f7',
+        paper_bgcolor='#ffffff',
+        font=dict(family="Arial", size=14, color="#333333"),
+        title_font=dict(size=20, color="#2c3e50"),
+        xaxis=REPORT_AXIS,
+        yaxis=REPORT_AXIS,
+    ),
+    "teal": dict(
+        paper_bgcolor='#f9fafb',
+        plot_bgcolor='#ffffff',
+        title_font_color='#264653',
+        font=dict(color='#264653', size=14),
+        xaxis=TEAL_AXIS,
+        yaxis=TEAL_AXIS,
+    ),
+    "gray": dict(
+        plot_bgcolor="#f0f0f0",
+        paper_bgcolor="#ffffff",
+        font=dict(color="#222222", family="Arial", size=14),
+        title_font=dict(size=18, color="#333333"),
+    ),
+}
+THEMES["teal_legend"] = dict(
+    THEMES["teal"],
+    legend=dict(bgcolor='#f9fafb', bordercolor='#ccc', borderwidth=1, font=dict(color='#264653')),
+)
+THEMES["gray_legend"] = dict(
+    THEMES["gray"],
+    legend=dict(bgcolor="#ffffff", bordercolor="#cccccc", borderwidth=1),
+)
+
+BOX_OUTLINE = dict(marker=dict(line=dict(width=1, color='#264653')))
+
+
+def axes(x, y, **axis):
+    """Layout override titling both axes, with extra axis properties for both."""
+    return dict(xaxis=dict(title=x, **axis), yaxis=dict(title=y, **axis))
+
+
+# Colours
+
+district_colors = {
+    'Fort Portal': '#e3dde5',
+    'Gulu': '#55c3c7',
+    'Kampala': '#744674',
+    'Mukono': '#a181a1',
+    'Wakiso': '#55c3c7',
+}
+
+edu_colors = {
+    'High School': '#744674',
+    'Undergraduate': '#2a9d8f',
+    'Postgraduate': '#e3dde5',
+    'Doctorate': '#684c64',
+}
+
+location_colors = {
+    'Urban': '#2a9d8f',
+    'Suburban': '#744674',
+    'Rural': '#bca4bc',
+}
+
+participation_colors = {
+    'Active': '#2a9d8f',
+    'Inactive': '#744674',
+}
+
+activity_colors = {
+    'Student Government': '#2a9d8f',
+    'Drama Club': '#643464',
+    'Debate Club': '#643464',
+    'Chess Club': '#4ca4c8',
+    'Drama': '#a8dadc',
+    'Volunteering': '#4ca4c8',
+    'Music Band': '#4c5c64',
+    'Art Club': '#264653',
+    'Football': '#643464',
+}
+
+completion_colors = {
+    "Completed": "#704270",
+    "Incomplete": "#55c3c7"
+}
+
+
+# Datasets: name -> function of the warm-up context. Every aggregate in
+# queryBackend.AGGREGATES is a dataset as well.
+
+def merged_gpa(context):
+    """merged_df with 'Average Grade' on the GPA scale, as the first half of the page plots it."""
+    df = context["merged_df"].copy(deep=False)
+    df["Average Grade"] = df["Average Grade (gpa)"]
+    return df
+
+
+def radar(context):
+    radar_data = context["backend"].aggregate("radar_data")
+    return radar_data.melt(id_vars="Role", var_name="Metric", value_name="Value")
+
+
+def heat(context):
+    return context["backend"].aggregate("heat_df").set_index("Activity")
+
+
+def na_counts(context):
+    subjects = ["Javascript", "Python", "HCD", "Communication"]
+    counts = context["merged_df"][subjects].isna().sum().reset_index()
+    counts.columns = ['Subject', 'NA Count']
+    return counts
+
+
+def correlation_matrix(context):
+    """Correlation matrix of the streamed co-moments, grade columns named after their course."""
+    corr = context["comoments"].corr()
+    labels = [col.replace("_num", " Grade") for col in corr.columns]
+    corr.index, corr.columns = labels, labels
+    return corr
+
+
+def timeline(view):
+    """Dataset of a timePyramid view over the context's date_range."""
+    def load(context):
+        start, end = context.get("date_range") or (None, None)
+        return context["time_pyramid"].view(view, start, end)
+    return load
+
+
+DATASETS = {
+    "merged": lambda context: context["merged_df"],
+    "merged_gpa": merged_gpa,
+    "grade_sketches": lambda context: context["grade_sketches"],
+    "radar": radar,
+    "heat": heat,
+    "na_counts": na_counts,
+    "correlation_matrix": correlation_matrix,
+    **{f"timeline:{view}": timeline(view) for view in VIEWS},
+}
+
+
+# Figures, in page order
+
+FIGURE_SPECS = {
+    # Academic performance
+    "fig_std": FigureSpec(
+        "merged", "histogram",
+        dict(x='Grade Std Dev', nbins=10, title='Grade Consistency (Std Dev) per Student',
+             color_discrete_sequence=['#744674']),
+        theme="report",
+        layout=dict(paper_bgcolor='#f9f9f9', bargap=0.1,
+                    **axes('Standard Deviation of Grades', 'Number of Students')),
+    ),
+    "fig_missing": FigureSpec(
+        "merged", "histogram",
+        dict(x='Missing Grades', title='Number of Missing Grades per Student',
+             color_discrete_sequence=['#55c3c7']),
+        theme="report",
+        layout=dict(bargap=0.1, **axes('Missing Grade Count', 'Number of Students')),
+    ),
+    "fig_violin_completion": FigureSpec(
+        "grade_sketches", "violin",
+        dict(x='Course', y='Grade', color='Course Completion', box=True,
+             title='Grade Comparison by Course Completion Status',
+             color_discrete_sequence=['#744674', '#55c3c7']),
+        theme="report",
+        layout=axes('Course', 'Grade'),
+    ),
+
+    # Behavioral
+    "fig_time": FigureSpec(
+        "merged_gpa", "scatter",
+        dict(x='Time Spent On Materials (Hours)', y='Average Grade', trendline='ols',
+             title='Study Time vs Academic Performance', hover_data=['StudentID'],
+             color_discrete_sequence=['#1f77b4'], marker=dict(size=10, color='#55c3c7'),
+             graph_id='fig-time'),
+        layout=dict(
+            paper_bgcolor='#f8f9fa',
+            plot_bgcolor='#ffffff',
+            title_font_color='black',
+            font=dict(color='black'),
+            **axes('Time Spent On Materials (Hours)', 'Average Grade',
+                   gridcolor='#e0e0e0', linecolor='black', zerolinecolor='black'),
+        ),
+    ),
+    "fig_forum": FigureSpec(
+        "merged_gpa", "scatter",
+        dict(x='Forum Posts', y='Average Grade', size='Time Spent On Forum (Hours)',
+             color='Course Completion', title='Forum Engagement vs Academic Performance',
+             hover_data=['StudentID'], color_discrete_sequence=['#55c3c7', '#744674'],
+             marker=dict(line=dict(width=1, color='black')), graph_id='fig-forum'),
+        layout=dict(
+            paper_bgcolor='#f0f0f0',
+            plot_bgcolor='#ffffff',
+            title_font_color='black',
+            font=dict(color='black', size=14),
+            legend=dict(bgcolor='#f0f0f0', bordercolor='gray', borderwidth=1, font=dict(color='black')),
+            **axes('Forum Posts', 'Average Grade',
+                   gridcolor='#dcdcdc', linecolor='black', zerolinecolor='black'),
+        ),
+    ),
+    "fig_msgs": FigureSpec(
+        "merged_gpa", "scatter",
+        dict(x='Instructor Messages', y='Average Grade',
+             title='Instructor Messages vs Academic Performance', hover_data=['StudentID'],
+             color_discrete_sequence=['#744674'],
+             marker=dict(size=10, line=dict(width=1, color='#264653')), graph_id='fig-msgs'),
+        theme="teal",
+        layout=dict(paper_bgcolor='#fafafa', **axes('Instructor Messages', 'Average Grade')),
+    ),
+    "fig_assign": FigureSpec(
+        "merged_gpa", "scatter",
+        dict(x='Completed Assignments', y='Average Grade',
+             title='Assignment Completion vs Academic Performance', hover_data=['StudentID'],
+             color_discrete_sequence=['#2a9d8f'],
+             marker=dict(size=9, line=dict(width=1, color='#264653')), graph_id='fig-assign'),
+        theme="teal",
+        layout=dict(paper_bgcolor='#f7f9f9',
+                    **axes('Completed Assignments', 'Average Grade', gridcolor='#d3d3d3')),
+    ),
+
+    # Performance gap identification
+    "fig_gender": FigureSpec(
+        "merged_gpa", "box",
+        dict(x='Gender', y='Average Grade', title='Gender vs Academic Performance', color='Gender',
+             color_discrete_map={'Male': '#55c3c7', 'Female': '#643464'}),
+        theme="teal_legend",
+        layout=dict(legend=dict(title='Gender'), **axes('Gender', 'Average Grade')),
+        traces=BOX_OUTLINE,
+    ),
+    "fig_income": FigureSpec(
+        "merged_gpa", "scatter",
+        dict(x='Income Level', y='Average Grade', trendline='ols',
+             title='Income vs Academic Performance', color_discrete_sequence=['#643464'],
+             marker=dict(size=10, line=dict(width=1, color='#2c3e50')), graph_id='fig-income'),
+        layout=dict(
+            paper_bgcolor='#f5f7fa',
+            plot_bgcolor='#ffffff',
+            title_font_color='#2c3e50',
+            font=dict(color='#2c3e50', size=14),
+            **axes('Income Level', 'Average Grade',
+                   gridcolor='#dcdcdc', linecolor='#2c3e50', zerolinecolor='#2c3e50'),
+        ),
+    ),
+    "fig_employment": FigureSpec(
+        "merged_gpa", "box",
+        dict(x='Employment Status', y='Average Grade',
+             title='Employment Status vs Academic Performance', color='Employment Status',
+             color_discrete_map={'Full-time': '#2a9d8f', 'Part-time': '#643464', 'Unemployed': '#e3dde5'}),
+        theme="teal_legend",
+        layout=dict(paper_bgcolor='#f9fbfc', legend=dict(title='Employment Status', bgcolor='#f9fbfc'),
+                    **axes('Employment Status', 'Average Grade')),
+        traces=BOX_OUTLINE,
+    ),
+    "fig_district": FigureSpec(
+        "district_avg", "bar",
+        dict(x='District', y='Average Grade', title='Average Grade by District', color='District',
+             color_discrete_map=district_colors),
+        theme="teal_legend",
+        layout=dict(legend=dict(title='District'), **axes('District', 'Average Grade')),
+        traces=BOX_OUTLINE,
+    ),
+    "fig_kids": FigureSpec(
+        "merged_gpa", "scatter",
+        dict(x='Number Of Children', y='Average Grade', trendline='ols',
+             title='Family Responsibility vs Academic Performance', color_discrete_sequence=['#55c3c7'],
+             marker=dict(size=10, line=dict(width=1, color='#264653'))),
+        theme="teal",
+        layout=dict(paper_bgcolor='#fbfbfb', **axes('Number Of Children', 'Average Grade')),
+    ),
+    "fig_marital": FigureSpec(
+        "merged_gpa", "box",
+        dict(x='Marital Status', y='Average Grade', title='Marital Status vs Academic Performance',
+             color_discrete_map={'Single': '#2a9d8f', 'Married': '#e76f51', 'Divorced': '#264653',
+                                 'Widowed': '#f4a261'}),
+        theme="teal_legend",
+        layout=dict(legend=dict(title='Marital Status'), **axes('Marital Status', 'Average Grade')),
+        traces=BOX_OUTLINE,
+    ),
+    "fig_edu": FigureSpec(
+        "edu_avg", "bar",
+        dict(x='Education Level', y='Average Grade', title='Education Level vs Academic Performance',
+             color='Education Level', color_discrete_map=edu_colors),
+        theme="teal_legend",
+        layout=dict(legend=dict(title='Education Level'), **axes('Education Level', 'Average Grade')),
+        traces=BOX_OUTLINE,
+    ),
+    "fig_location_study": FigureSpec(
+        "merged", "box",
+        dict(x='Location', y='Time Spent On Materials (Hours)', title='Location vs Study Time',
+             color='Location', color_discrete_map=location_colors),
+        theme="teal_legend",
+        layout=dict(legend=dict(title='Location'), **axes('Location', 'Time Spent On Materials (Hours)')),
+        traces=BOX_OUTLINE,
+    ),
+
+    # Extracurricular activity
+    "fig_participation_pie": FigureSpec(
+        "merged", "pie",
+        dict(names='Participation Status', title='Participation in Extracurricular Activities',
+             color='Participation Status', color_discrete_map=participation_colors),
+        layout=dict(
+            paper_bgcolor='#f9fafb',
+            title_font_color='#264653',
+            font=dict(color='#264653', size=14),
+            legend=THEMES["teal_legend"]["legend"],
+        ),
+        traces=dict(textposition='inside', textinfo='percent+label',
+                    marker=dict(line=dict(color='#264653', width=1))),
+    ),
+    "fig_participation_perf": FigureSpec(
+        "participation_perf", "bar",
+        dict(x='Participation Status', y='Average Grade', title='Academic Performance by Participation',
+             color='Participation Status', color_discrete_map=participation_colors),
+        theme="teal_legend",
+        layout=dict(legend=dict(title='Participation Status'),
+                    **axes('Participation Status', 'Average Grade')),
+        traces=BOX_OUTLINE,
+    ),
+    "fig_leadership": FigureSpec(
+        "role_avg", "bar",
+        dict(x="Role", y="Average Grade", title="Academic Performance by Leadership Role",
+             color="Average Grade", color_continuous_scale="teal"),
+    ),
+    "fig_radar": FigureSpec(
+        "radar", "line_polar",
+        dict(r="Value", theta="Metric", color="Role", line_close=True,
+             title="Academic & Engagement Radar by Role"),
+        traces=dict(fill='toself'),
+    ),
+    "fig_violin": FigureSpec(
+        "merged_gpa", "violin",
+        dict(y='Average Grade', x='Hours Per Week', box=True, meanline=True,
+             points_marker=dict(color='rgba(42, 157, 143, 0.3)', line=dict(width=1, color='#264653')),
+             title='Performance by Activity Involvement Level',
+             color_discrete_sequence=['#2a9d8f', '#683464']),
+        theme="teal_legend",
+        layout=axes('Hours Per Week', 'Average Grade'),
+    ),
+    "fig_sunburst": FigureSpec(
+        "merged_gpa", "sunburst",
+        dict(path=['Activity', 'Role'], values='Average Grade', color='Activity',
+             color_discrete_map=activity_colors, title='Activity Type & Leadership Breakdown'),
+        layout=dict(
+            paper_bgcolor='#f9fafb',
+            plot_bgcolor='#ffffff',
+            title_font_color='#264653',
+            font=dict(color='#264653', size=14),
+            margin=dict(t=50, l=10, r=10, b=10),
+        ),
+    ),
+    "fig_heat": FigureSpec(
+        "heat", "imshow",
+        dict(text_auto=True, aspect="auto", title='Engagement Metrics by Activity Type',
+             color_continuous_scale='teal'),
+        layout=dict(
+            paper_bgcolor='#f9fafb',
+            plot_bgcolor='#ffffff',
+            title_font_color='#264653',
+            font=dict(color='#264653', size=13),
+            margin=dict(t=50, l=20, r=20, b=20),
+            coloraxis_colorbar=dict(title='Metric Scale'),
+        ),
+    ),
+    "fig_success": FigureSpec(
+        "merged", "scatter",
+        dict(x="Attendance %", y="Completed Assignments", color="Participation Status",
+             size="Income Level", hover_name="StudentID",
+             title="Success Predictors: Attendance vs. Assignments with Participation and Income",
+             color_discrete_map={"Active": "#704270", "Moderate": "#e2dce4", "Low": "#55c3c7"},
+             graph_id="fig-success"),
+    ),
+
+    # Course design insights
+    "fig_na": FigureSpec(
+        "na_counts", "bar",
+        dict(x="Subject", y="NA Count", title="Subjects with Highest N/A (Missing) Grades",
+             color="Subject", color_discrete_sequence=["#704270", "#e2dce4", "#55c3c7", "#b494b4"]),
+        layout=dict(
+            plot_bgcolor="#f0f0f0",
+            paper_bgcolor="#ffffff",
+            font=dict(color="#333333", family="Arial", size=14),
+            title_font=dict(size=18),
+            legend=THEMES["gray_legend"]["legend"],
+        ),
+    ),
+    "fig_corr": FigureSpec(
+        "merged", "scatter",
+        dict(x="Completed Assignments", y="Average Grade", color="Course Completion",
+             size="Time Spent On Materials (Hours)", title="Assessment Completion vs Final Grade",
+             color_discrete_map=completion_colors, graph_id="fig-corr"),
+        theme="gray_legend",
+    ),
+    "fig_corr_matrix": FigureSpec(
+        "correlation_matrix", "imshow",
+        dict(text_auto=".2f", aspect="auto", zmin=-1, zmax=1, color_continuous_scale="RdBu_r",
+             title="Correlation of Engagement and Grade Features"),
+        theme="gray",
+        layout=dict(margin=dict(t=50, l=20, r=20, b=20), coloraxis_colorbar=dict(title='Pearson r')),
+    ),
+    "fig_util": FigureSpec(
+        "merged", "scatter",
+        dict(x="Time Spent On Materials (Hours)", y="Average Grade", color="Socioeconomic Status",
+             title="Study Time vs Grade Performance", hover_name="StudentID",
+             size="Completed Assignments",
+             color_discrete_map={"Low": "#704270", "Middle": "#e2dce4", "High": "#55c3c7"},
+             graph_id="fig-util"),
+        theme="gray_legend",
+        layout=dict(font=dict(color="#222")),
+    ),
+    "fig_support": FigureSpec(
+        "merged", "box",
+        dict(x="Number Of Children", y="Average Grade", color="Course Completion",
+             title="Performance Distribution by Number of Children",
+             color_discrete_map=completion_colors),
+        theme="gray_legend",
+    ),
+    "fig_access": FigureSpec(
+        "merged", "box",
+        dict(x="Location", y="Time Spent On Materials (Hours)", color="Location",
+             title="Study Time by Location (Urban vs Rural)",
+             color_discrete_sequence=["#55c3c7", "#744674", "#684c64"]),
+        theme="gray_legend",
+    ),
+
+    # Temporal trends
+    "fig_forum_2": FigureSpec(
+        "timeline:forum_posts", "line",
+        dict(x="Date", y="Forum Posts", title="Forum Engagement Over Time", markers=True),
+        theme="gray_legend",
+    ),
+    "fig_seasonal": FigureSpec(
+        "timeline:seasonal", "line",
+        dict(x="Month", y=["Time Spent On Materials (Hours)", "Average Grade"],
+             title="Seasonal Trends: Study Time and Grade Averages", markers=True),
+        theme="gray_legend",
+    ),
+    "fig_weekly": FigureSpec(
+        "timeline:weekday", "bar",
+        dict(x="Weekday", y="Forum Posts", title="Forum Engagement by Day of the Week",
+             color="Weekday", color_discrete_sequence=px.colors.qualitative.Pastel),
+        theme="gray_legend",
+    ),
+    "fig_progress": FigureSpec(
+        "timeline:average_grade", "line",
+        dict(x="Date", y="Average Grade", title="Student Performance Progression Over Time",
+             markers=True),
+        theme="gray",
+    ),
+    "fig_dropout": FigureSpec(
+        "timeline:dropouts", "bar",
+        dict(x="Date", y="StudentID", title="Dropout Frequency Over Time",
+             labels={"StudentID": "Dropout Count"}, color_discrete_sequence=["#d62728"]),
+        theme="gray",
+    ),
+}
+
+
+# Building
+
+# Context of the current warm-up; pool workers inherit it when they fork
+_context = {}
+_datasets = {}
+
+
+def dataset(name, context=None):
+    """Resolves a dataset by name, once per process and warm-up."""
+    context = _context if context is None else context
+    if context is not _context:
+        return _load_dataset(name, context)
+    if name not in _datasets:
+        _datasets[name] = _load_dataset(name, context)
+    return _datasets[name]
+
+
+def build_figure(spec, context=None):
+    """Renders one FigureSpec: chart builder, then theme + layout overrides, then traces."""
+    fig = CHARTS[spec.chart](dataset(spec.data, context), **spec.args)
+    layout = _merge(THEMES[spec.theme] if spec.theme else {}, spec.layout or {})
+    if layout:
+        fig.update_layout(**layout)
+    if spec.traces:
+        fig.update_traces(**spec.traces)
+    return fig
+
+
+def warm_up(specs=None, workers=FIGURE_WORKERS, **context):
+    """
+    Builds every spec, over a process pool when workers > 1, and returns
+    ({name: figure}, {name: build seconds}) in registry order. Build times
+    are also observed as figure_build_seconds{figure=...}.
+    """
+    specs = FIGURE_SPECS if specs is None else specs
+    _context.clear()
+    _context.update(context)
+    _datasets.clear()
+
+    pooled = workers > 1 and len(specs) > 1 and "fork" in multiprocessing.get_all_start_methods()
+    if pooled:
+        # Forked workers share the parent's frames copy-on-write; only names and
+        # finished figures cross the process boundary
+        pool = ProcessPoolExecutor(min(workers, len(specs)), mp_context=multiprocessing.get_context("fork"))
+        with pool:
+            built = dict(pool.map(_timed_build, specs.items()))
+        # Zoom callbacks run in this process; register what adaptive_scatter recorded in the workers
+        for spec in specs.values():
+            if spec.chart == "scatter" and "graph_id" in spec.args:
+                args = dict(spec.args)
+                register_scatter_spec(args.pop("graph_id"), dataset(spec.data), **args)
+    else:
+        built = dict(map(_timed_build, specs.items()))
+
+    figures = {name: fig for name, (fig, _) in built.items()}
+    build_seconds = {name: seconds for name, (_, seconds) in built.items()}
+    for name, seconds in build_seconds.items():
+        observe("figure_build_seconds", seconds, (("figure", name),))
+    return figures, build_seconds
+
+
+def _timed_build(item):
+    name, spec = item
+    start = time.perf_counter()
+    fig = build_figure(spec)
+    return name, (fig, time.perf_counter() - start)
+
+
+def _load_dataset(name, context):
+    if name in DATASETS:
+        return DATASETS[name](context)
+    if name in AGGREGATES:
+        return context["backend"].aggregate(name)
+    raise KeyError(f"Unknown dataset {name!r}")
+
+
+def _merge(base, override):
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
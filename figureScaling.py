@@ -0,0 +1,229 @@
+"""
+Row-count aware scatter figures for the dashboard.
+
+Small frames are plotted exactly as before. Above SCATTER_WEBGL_THRESHOLD rows
+the markers are drawn with WebGL, and above SCATTER_BIN_THRESHOLD rows the
+points are binned server side into a density heatmap, so the figure payload
+stops growing with the number of students. Graphs registered with an id get a
+zoom callback that re-fetches detail for the visible range only.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+from dash import Input, Output, State
+from dash.exceptions import PreventUpdate
+
+
+SCATTER_WEBGL_THRESHOLD = int(os.getenv("SCATTER_WEBGL_THRESHOLD", 5000))
+SCATTER_BIN_THRESHOLD = int(os.getenv("SCATTER_BIN_THRESHOLD", 50000))
+SCATTER_BINS = 60
+
+# graph id -> everything needed to rebuild the figure for a zoomed window
+SCATTER_SPECS = {}
+
+
+def adaptive_scatter(df, x, y, marker=None, graph_id=None, **px_kwargs):
+    """
+    Drop-in replacement for px.scatter that picks SVG, WebGL or binned density
+    rendering from the number of rows.
+    marker: marker style for the point traces, skipped when the rows are binned
+    graph_id: id of the dcc.Graph showing the figure, needed for zoom callbacks
+    """
+    if graph_id is not None:
+        register_scatter_spec(graph_id, df, x, y, marker=marker, **px_kwargs)
+    return build_scatter(df, x, y, marker=marker, **px_kwargs)
+
+
+def register_scatter_spec(graph_id, df, x, y, marker=None, **px_kwargs):
+    """
+    Stores what the zoom callback of graph_id needs to rebuild its figure.
+    Also used when the figure itself was built in another process.
+    df is kept by reference, not copied: it is merged_df or a shallow view of
+    it, whose columns every gunicorn worker shares (see sharedDataset).
+    """
+    SCATTER_SPECS[graph_id] = dict(
+        df=df,
+        columns=[c for c in dict.fromkeys([x, y, *_column_args(px_kwargs)]) if c in df.columns],
+        x=x,
+        y=y,
+        marker=marker,
+        px_kwargs=px_kwargs,
+    )
+
+
+def build_scatter(df, x, y, marker=None, x_range=None, y_range=None, **px_kwargs):
+    """
+    Builds the scatter for df using the rendering mode that suits its size.
+    x_range / y_range: optional (min, max) window to bin over
+    """
+    n_rows = len(df)
+    numeric = all(np.issubdtype(df[c].dtype, np.number) for c in (x, y))
+
+    if n_rows > SCATTER_BIN_THRESHOLD and numeric:
+        return binned_density_figure(
+            df, x, y,
+            x_range=x_range,
+            y_range=y_range,
+            trendline=px_kwargs.get("trendline"),
+            title=px_kwargs.get("title"),
+        )
+
+    if n_rows > SCATTER_WEBGL_THRESHOLD:
+        px_kwargs = dict(px_kwargs, render_mode="webgl")
+
+    fig = px.scatter(df, x=x, y=y, **px_kwargs)
+    if marker:
+        fig.update_traces(marker=marker)
+    return fig
+
+
+def binned_density_figure(df, x, y, nbins=SCATTER_BINS, x_range=None, y_range=None,
+                          trendline=None, title=None):
+    """
+    Aggregates df into an nbins x nbins grid of counts and returns a heatmap.
+    Payload is O(nbins^2) whatever the row count.
+    """
+    data = df[[x, y]].dropna()
+    xs = data[x].to_numpy(dtype=float)
+    ys = data[y].to_numpy(dtype=float)
+
+    fig = go.Figure()
+    fig.update_layout(title=title, xaxis_title=x, yaxis_title=y)
+    if len(xs) == 0:
+        return fig
+
+    hist_range = [
+        x_range if x_range is not None else (xs.min(), xs.max()),
+        y_range if y_range is not None else (ys.min(), ys.max()),
+    ]
+    counts, x_edges, y_edges = np.histogram2d(xs, ys, bins=nbins, range=_widen(hist_range))
+    # Empty cells stay transparent instead of painting the lowest colour
+    z = np.where(counts.T > 0, counts.T, np.nan)
+
+    fig.add_trace(go.Heatmap(
+        x=(x_edges[:-1] + x_edges[1:]) / 2,
+        y=(y_edges[:-1] + y_edges[1:]) / 2,
+        z=z,
+        colorscale="teal",
+        colorbar=dict(title="Students"),
+        hovertemplate=f"{x}: %{{x:.2f}}<br>{y}: %{{y:.2f}}<br>Students: %{{z}}<extra></extra>",
+    ))
+
+    if trendline == "ols" and len(xs) > 1 and np.ptp(xs) > 0:
+        slope, intercept = np.polyfit(xs, ys, 1)
+        line_x = np.array([x_edges[0], x_edges[-1]])
+        fig.add_trace(go.Scatter(
+            x=line_x,
+            y=slope * line_x + intercept,
+            mode="lines",
+            name="OLS trendline",
+            line=dict(color="#264653"),
+        ))
+
+    return fig
+
+
+def register_scatter_zoom(app, graph_id):
+    """
+    Registers a relayout callback that rebuilds graph_id from the rows inside the
+    visible window, so zooming into a binned plot eventually shows the raw points.
+    """
+    spec = SCATTER_SPECS[graph_id]
+
+    @app.callback(
+        Output(graph_id, "figure"),
+        Input(graph_id, "relayoutData"),
+        State(graph_id, "figure"),
+        prevent_initial_call=True
+    )
+    def zoom_scatter(relayout, current_fig):
+        df = spec["df"]
+        # Small frames already ship every point, nothing to fetch
+        if not relayout or len(df) <= SCATTER_WEBGL_THRESHOLD:
+            raise PreventUpdate
+
+        x, y = spec["x"], spec["y"]
+        x_window = _axis_range(relayout, "xaxis")
+        y_window = _axis_range(relayout, "yaxis")
+        reset = relayout.get("xaxis.autorange") or relayout.get("yaxis.autorange")
+        if x_window is None and y_window is None and not reset:
+            raise PreventUpdate
+
+        # Windows in the column's own type; None on categorical axes, which are not filtered
+        x_range = _coerce_range(df[x], x_window)
+        y_range = _coerce_range(df[y], y_window)
+        mask = np.ones(len(df), dtype=bool)
+        if x_range is not None:
+            mask &= df[x].between(*x_range).to_numpy()
+        if y_range is not None:
+            mask &= df[y].between(*y_range).to_numpy()
+
+        fig = build_scatter(
+            df.loc[mask, spec["columns"]], x, y,
+            marker=spec["marker"],
+            x_range=x_range,
+            y_range=y_range,
+            **spec["px_kwargs"]
+        )
+        # Keep the titles of the figure that is currently shown; the rest of its
+        # layout belongs to the old window and rendering mode
+        fig.update_layout(_titles(current_fig.get("layout", {})))
+        if reset:
+            fig.update_xaxes(autorange=True)
+            fig.update_yaxes(autorange=True)
+        if x_window is not None:
+            fig.update_xaxes(range=list(x_window), autorange=False)
+        if y_window is not None:
+            fig.update_yaxes(range=list(y_window), autorange=False)
+        return fig
+
+    return zoom_scatter
+
+
+def _column_args(px_kwargs):
+    for key in ("color", "size", "hover_name", "symbol", "text"):
+        if isinstance(px_kwargs.get(key), str):
+            yield px_kwargs[key]
+    for col in px_kwargs.get("hover_data") or []:
+        yield col
+
+
+def _axis_range(relayout, axis):
+    if f"{axis}.range[0]" in relayout:
+        return relayout[f"{axis}.range[0]"], relayout[f"{axis}.range[1]"]
+    if f"{axis}.range" in relayout:
+        low, high = relayout[f"{axis}.range"]
+        return low, high
+    return None
+
+
+def _coerce_range(series, window):
+    """
+    The relayout window as bounds comparable with series: floats for numeric
+    columns, timestamps for dates. None for other columns, whose plotly range
+    is in category positions rather than values.
+    """
+    if window is None:
+        return None
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return pd.Timestamp(window[0]), pd.Timestamp(window[1])
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return float(window[0]), float(window[1])
+    return None
+
+
+def _titles(layout):
+    """The figure and axis titles of a figure's layout JSON, as update_layout arguments."""
+    titles = {"title": layout["title"]} if "title" in layout else {}
+    for axis in ("xaxis", "yaxis"):
+        if "title" in layout.get(axis, {}):
+            titles[axis] = {"title": layout[axis]["title"]}
+    return titles
+
+
+def _widen(hist_range):
+    # histogram2d rejects zero-width ranges, e.g. every student has 0 children
+    return [(low, high) if high > low else (low - 0.5, high + 0.5) for low, high in hist_range]
@@ -0,0 +1,57 @@
+"""
+gunicorn settings, read from the working directory by the Procfile command
+`gunicorn analyseData:app.server`.
+
+With SHARE_DATASET (default on) the master loads the dataset once into
+shared memory before forking the workers, which attach it instead of each
+loading their own copy (see sharedDataset). `kill -HUP <master>` reloads the
+data: the master publishes a new segment, the replacement workers attach it
+and the old one is unlinked.
+
+Each worker builds the figures at import (figureRegistry.warm_up). Unless
+FIGURE_WORKERS is set, the master gives every worker an equal share of the
+cores for that, at least one, rather than a pool per core each: 4 workers
+on 1 CPU took 8.67s to start with a pool each and 3.08s building serially.
+
+The master also brings the stored SHAP interactions (shapInteractions) up to
+date before forking, so a retrained model or new data costs one interaction
+pass instead of one per worker; the workers only load them.
+"""
+import os
+
+from sharedDataset import SHARE_DATASET, attach_dataset, publish_dataset, release_dataset
+
+
+def _publish(server):
+    name = publish_dataset()
+    # Attached in the master, so forked workers inherit the frames ready to use
+    attach_dataset()
+    server.log.info("Shared dataset in segment %s", name)
+
+
+def _precompute_interactions(server):
+    from shapInteractions import precompute
+
+    try:
+        precompute()
+    except Exception:
+        # The dashboard still starts; its interaction section says how to compute them
+        server.log.exception("Could not precompute the SHAP interactions")
+
+
+def on_starting(server):
+    # Read by figureRegistry when the forked workers import the app
+    os.environ.setdefault("FIGURE_WORKERS", str(max(1, (os.cpu_count() or 1) // server.cfg.workers)))
+    if SHARE_DATASET:
+        _publish(server)
+    _precompute_interactions(server)
+
+
+def on_reload(server):
+    if SHARE_DATASET:
+        _publish(server)
+    _precompute_interactions(server)
+
+
+def on_exit(server):
+    release_dataset()
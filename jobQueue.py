@@ -0,0 +1,151 @@
+"""
+Local disk-backed job queue for the slow Dash callbacks (SHAP, Gemini).
+
+Background callbacks run in a separate process and the browser polls for the
+result, so a slow SHAP pass or LLM call no longer holds a gunicorn worker.
+Results live in a diskcache directory shared by all workers on the host.
+
+On top of Dash's DiskcacheManager:
+- identical in-flight jobs (same callback, inputs and model version) are
+  de-duplicated: later requests attach to the running process instead of
+  spawning another one. The first request reserves the job key before it
+  spawns, so simultaneous identical requests wait for its process instead of
+  racing to start their own. While several requests share a job, progress
+  updates are left in the cache for all of them instead of going to whichever
+  polls first
+- a job shared by several requests is only killed when the last of them
+  cancels it (Dash cancels the previous job whenever the slider moves again)
+- finished results are kept for JOB_RESULT_TTL seconds, so repeats are served
+  from the cache
+- metrics the job records (callback, SHAP, model and LLM timings, cache
+  counters) are pushed to the cache when it finishes and merged into the
+  /metrics of the worker that started it
+"""
+import functools
+import hashlib
+import os
+import time
+
+import diskcache
+from dash import DiskcacheManager
+
+from metrics import add_collector, reset, snapshot
+
+
+JOB_CACHE_DIR = os.getenv("JOB_CACHE_DIR", os.path.join(".cache", "jobs"))
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", 600))
+# Seconds identical requests wait for the first one to spawn the job before spawning their own
+JOB_SPAWN_WAIT = 10
+MODEL_FILES = ("student_performance_model.pkl", "label_encoders.pkl")
+
+
+def model_version(paths=MODEL_FILES):
+    """Content hash of the model artifacts; part of every job cache key."""
+    digest = hashlib.sha1()
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+class DedupDiskcacheManager(DiskcacheManager):
+    """DiskcacheManager that shares one process between identical in-flight jobs."""
+
+    def make_job_fn(self, fn, progress, key=None):
+        return super().make_job_fn(self._recording_metrics(fn), progress, key)
+
+    def _recording_metrics(self, fn):
+        handle = self.handle
+
+        @functools.wraps(fn)
+        def job(*args, **kwargs):
+            # The job is forked from a worker; start from an empty registry
+            reset()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                handle.push(snapshot(), prefix=_metrics_prefix(os.getppid()), expire=JOB_RESULT_TTL)
+
+        return job
+
+    def collect_metrics(self):
+        """Snapshots pushed by the jobs this process started, removed from the cache."""
+        snapshots = []
+        while True:
+            _, recorded = self.handle.pull(prefix=_metrics_prefix(os.getpid()))
+            if recorded is None:
+                return snapshots
+            snapshots.append(recorded)
+
+    def call_job_fn(self, key, job_fn, args, context):
+        deadline = time.monotonic() + JOB_SPAWN_WAIT
+        while True:
+            with self.handle.transact():
+                pid = self.handle.get(_inflight_key(key))
+                if pid == _SPAWNING and time.monotonic() < deadline:
+                    pass  # another request is starting this job; wait for its pid
+                elif pid not in (None, _SPAWNING) and self.job_running(pid) and not self.result_ready(key):
+                    self.handle.incr(_refs_key(pid))
+                    return pid
+                else:
+                    # Reserve the key; the sentinel expires if this worker dies before spawning
+                    self.handle.set(_inflight_key(key), _SPAWNING, expire=JOB_SPAWN_WAIT)
+                    break
+            time.sleep(0.01)
+
+        try:
+            pid = super().call_job_fn(key, job_fn, args, context)
+        except BaseException:
+            self.handle.delete(_inflight_key(key))
+            raise
+        with self.handle.transact():
+            self.handle.set(_inflight_key(key), pid, expire=JOB_RESULT_TTL)
+            self.handle.set(_refs_key(pid), 1, expire=JOB_RESULT_TTL)
+        return pid
+
+    def get_progress(self, key):
+        pid = self.handle.get(_inflight_key(key))
+        if pid not in (None, _SPAWNING) and self.handle.get(_refs_key(pid), 0) > 1:
+            # Attached requests poll the same progress key; Dash deletes it on read
+            return self.handle.get(self._make_progress_key(key))
+        return super().get_progress(key)
+
+    def terminate_job(self, job):
+        if job is None:
+            return
+        with self.handle.transact():
+            refs = self.handle.get(_refs_key(job), 0)
+            if refs > 1:
+                # Another request is still waiting on this process
+                self.handle.decr(_refs_key(job))
+                return
+            self.handle.delete(_refs_key(job))
+        super().terminate_job(job)
+
+
+def make_job_manager(directory=JOB_CACHE_DIR):
+    """Background callback manager for the dashboard, keyed on the model version."""
+    version = model_version()
+    manager = DedupDiskcacheManager(
+        diskcache.Cache(directory),
+        cache_by=[lambda: version],
+        expire=JOB_RESULT_TTL,
+    )
+    add_collector(manager.collect_metrics)
+    return manager
+
+
+# In-flight value while the first request for a key is spawning its process
+_SPAWNING = "spawning"
+
+
+def _inflight_key(key):
+    return f"inflight-{key}"
+
+
+def _refs_key(pid):
+    return f"job-refs-{int(pid)}"
+
+
+def _metrics_prefix(pid):
+    return f"job-metrics-{int(pid)}"
@@ -0,0 +1,115 @@
+"""
+Pluggable LLM backends for the Ask AI panel, answering as a stream of text chunks.
+
+    llm = make_llm()                          # LLM_BACKEND: gemini (default) or stub
+    answer = stream_answer(llm, prompt, on_text=show)
+
+A backend is any object with a `name` and a `stream(prompt)` generator of
+text chunks:
+
+  gemini   google.generativeai with stream=True, imported and configured with
+           the API key from .env (API) on the first question
+  stub     a deterministic local stand-in for tests and benchmarks: the same
+           prompt always gives the same answer, one word per chunk, after
+           `latency` seconds and `token_delay` seconds between words; `answer`
+           fixes the text or, as a function of the prompt, scripts it
+
+stream_answer() calls on_text with the text so far as chunks arrive, at most
+every STREAM_INTERVAL seconds (the first chunk at once), so the panel shows
+the answer while it is generated. Time to first chunk and total generation
+time are observed as llm_first_token_seconds and llm_seconds, prompt sizes
+counted as llm_prompt_characters_total. Ask AI calls it inside a background
+job, whose metrics jobQueue merges into the /metrics of the worker that
+started the job.
+"""
+import hashlib
+import os
+import time
+
+from metrics import count, observe, timed
+
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+LLM_MODEL = os.getenv("LLM_MODEL", "gemini-1.5-flash")
+# Seconds between partial updates pushed to the panel
+STREAM_INTERVAL = 0.1
+
+
+class GeminiBackend:
+    """Streams generate_content() of a Gemini model."""
+
+    def __init__(self, model_name=LLM_MODEL):
+        self.name = model_name
+        self._model = None
+
+    def stream(self, prompt):
+        if self._model is None:
+            from dotenv import load_dotenv
+            import google.generativeai as genai
+
+            load_dotenv()
+            genai.configure(api_key=os.getenv("API"))
+            self._model = genai.GenerativeModel(self.name)
+        for chunk in self._model.generate_content(prompt, stream=True):
+            if chunk.text:
+                yield chunk.text
+
+
+class StubBackend:
+    """Deterministic answer derived from the prompt, streamed word by word."""
+
+    name = "stub"
+
+    def __init__(self, latency=0.0, token_delay=0.0, answer=None):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.answer = answer
+
+    def stream(self, prompt):
+        answer = self.answer(prompt) if callable(self.answer) else self.answer
+        answer = answer or (f"Stub answer ({len(prompt)} prompt characters, "
+                                 f"digest {hashlib.sha1(prompt.encode()).hexdigest()[:8]}).")
+        time.sleep(self.latency)
+        for i, word in enumerate(answer.split(" ")):
+            if i:
+                time.sleep(self.token_delay)
+                word = " " + word
+            yield word
+
+
+BACKENDS = {"gemini": GeminiBackend, "stub": StubBackend}
+
+
+def make_llm(kind=LLM_BACKEND, **options):
+    """Backend selected by LLM_BACKEND."""
+    if kind not in BACKENDS:
+        raise ValueError(f"Unknown LLM_BACKEND {kind!r}; expected one of {', '.join(BACKENDS)}")
+    return BACKENDS[kind](**options)
+
+
+def stream_answer(llm, prompt, on_text=None, interval=STREAM_INTERVAL):
+    """
+    Full answer of llm to prompt. on_text(text so far) runs for the first
+    chunk, then at most every interval seconds, and once more for the
+    complete answer.
+    """
+    count("llm_prompt_characters_total", len(prompt), model=llm.name)
+    chunks = []
+    shown = 0
+    start = last_update = time.perf_counter()
+    with timed("llm_seconds", model=llm.name):
+        for chunk in llm.stream(prompt):
+            chunks.append(chunk)
+            now = time.perf_counter()
+            if len(chunks) == 1:
+                observe("llm_first_token_seconds", now - start, (("model", llm.name),))
+            elif now - last_update < interval:
+                continue
+            if on_text is not None:
+                on_text("".join(chunks))
+            shown, last_update = len(chunks), now
+    count("llm_chunks_total", len(chunks), model=llm.name)
+    text = "".join(chunks)
+    if on_text is not None and shown < len(chunks):
+        on_text(text)
+    return text
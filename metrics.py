@@ -0,0 +1,272 @@
+"""
+Lightweight timing and counter metrics for the dashboard hot paths.
+
+    with timed("model_predict_seconds"):
+        model.predict(X)
+
+    @timed("callback_seconds", callback="update_shap")
+    def update_shap(...): ...
+
+Latency histograms, counters, gauges, cache hit ratios and process memory are exposed
+in Prometheus text format on /metrics by install_metrics_route(). Set
+METRICS_ENABLED=0 to turn every timer and counter into a no-op.
+
+Code running in another process (the background callback jobs of jobQueue)
+records into that process: its snapshot() is handed back and merged into
+the serving process by a collector registered with add_collector().
+"""
+import functools
+import os
+import resource
+import threading
+import time
+from collections import defaultdict
+
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+
+# Prometheus default buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_lock = threading.Lock()
+# (name, labels) -> [bucket counts..., +Inf count], sum
+_histograms = {}
+# (name, labels) -> value
+_counters = defaultdict(float)
+# (name, labels) -> last value set
+_gauges = {}
+# Functions returning snapshots recorded in other processes, merged on every scrape
+_collectors = []
+
+
+def timed(name, **labels):
+    """
+    Records the wall time of a block or function call into histogram `name`.
+    Works as a context manager and as a decorator.
+    """
+    if not METRICS_ENABLED:
+        return _NULL_TIMER
+    return _Timer(name, tuple(sorted(labels.items())))
+
+
+class _Timer:
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe(self.name, time.perf_counter() - self.start, self.labels)
+        if exc_type is not None:
+            count(self.name.replace("_seconds", "") + "_errors_total", **dict(self.labels))
+        return False
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # A fresh timer per call keeps concurrent calls apart
+            with _Timer(self.name, self.labels):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def __call__(self, func):
+        return func
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def observe(name, seconds, labels=()):
+    """Adds one observation to histogram `name`."""
+    if not METRICS_ENABLED:
+        return
+    key = (name, labels)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = [[0] * (len(BUCKETS) + 1), 0.0]
+        counts = hist[0]
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+        hist[1] += seconds
+
+
+def count(name, amount=1, **labels):
+    """Increments counter `name`."""
+    if not METRICS_ENABLED:
+        return
+    with _lock:
+        _counters[(name, tuple(sorted(labels.items())))] += amount
+
+
+def gauge(name, value, **labels):
+    """Sets gauge `name` to value."""
+    if not METRICS_ENABLED:
+        return
+    with _lock:
+        _gauges[(name, tuple(sorted(labels.items())))] = float(value)
+
+
+def count_cache(cache, hit):
+    """Counts one lookup of `cache`; hit ratios are derived at scrape time."""
+    count("cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+
+def snapshot():
+    """Histograms and counters recorded in this process, for merge() in another one."""
+    with _lock:
+        return {
+            "histograms": {key: (list(hist[0]), hist[1]) for key, hist in _histograms.items()},
+            "counters": dict(_counters),
+        }
+
+
+def merge(recorded):
+    """Adds the histograms and counters of a snapshot() to this process."""
+    with _lock:
+        for key, (counts, total) in recorded["histograms"].items():
+            hist = _histograms.get(key)
+            if hist is None:
+                hist = _histograms[key] = [[0] * (len(BUCKETS) + 1), 0.0]
+            hist[0] = [mine + theirs for mine, theirs in zip(hist[0], counts)]
+            hist[1] += total
+        for key, value in recorded["counters"].items():
+            _counters[key] += value
+
+
+def reset():
+    """
+    Forgets everything recorded so far. A forked process calls it first, so
+    its snapshot() holds only its own observations (and a lock another
+    thread held at fork time cannot block it).
+    """
+    global _lock
+    _lock = threading.Lock()
+    _histograms.clear()
+    _counters.clear()
+    _gauges.clear()
+
+
+def add_collector(collect):
+    """Registers collect(), returning snapshots from other processes, to be merged before every scrape."""
+    _collectors.append(collect)
+
+
+def render_metrics():
+    """Returns all metrics in Prometheus text exposition format."""
+    for collect in _collectors:
+        for recorded in collect():
+            merge(recorded)
+    lines = []
+    with _lock:
+        histograms = {k: (list(v[0]), v[1]) for k, v in _histograms.items()}
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+
+    for name in sorted({name for name, _ in histograms}):
+        lines.append(f"# TYPE {name} histogram")
+        for (hist_name, labels), (counts, total) in sorted(histograms.items()):
+            if hist_name != name:
+                continue
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS + ("+Inf",), counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {total}")
+            lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+
+    for name in sorted({name for name, _ in counters}):
+        lines.append(f"# TYPE {name} counter")
+        for (counter_name, labels), value in sorted(counters.items()):
+            if counter_name == name:
+                lines.append(f"{name}{_labels(labels)} {value}")
+
+    for name in sorted({name for name, _ in gauges}):
+        lines.append(f"# TYPE {name} gauge")
+        for (gauge_name, labels), value in sorted(gauges.items()):
+            if gauge_name == name:
+                lines.append(f"{name}{_labels(labels)} {value}")
+
+    lines.append("# TYPE cache_hit_ratio gauge")
+    for cache, ratio in sorted(_cache_hit_ratios(counters).items()):
+        lines.append(f"cache_hit_ratio{_labels((('cache', cache),))} {ratio}")
+
+    lines.append("# TYPE process_resident_memory_bytes gauge")
+    lines.append(f"process_resident_memory_bytes {_resident_memory_bytes()}")
+    lines.append("# TYPE process_max_resident_memory_bytes gauge")
+    # ru_maxrss is reported in KiB on Linux
+    lines.append(f"process_max_resident_memory_bytes {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024}")
+    return "\n".join(lines) + "\n"
+
+
+def install_metrics_route(app):
+    """
+    Adds /metrics to app.server and times every request by path, which covers
+    layout/figure serialisation (/_dash-layout) and callback round-trips.
+    """
+    from flask import Response, g, request
+
+    server = app.server
+
+    @server.route(app.config.routes_pathname_prefix + "metrics")
+    def metrics_endpoint():
+        return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+    if METRICS_ENABLED:
+        @server.before_request
+        def start_request_timer():
+            g.metrics_start = time.perf_counter()
+
+        @server.teardown_request
+        def stop_request_timer(exc):
+            start = g.pop("metrics_start", None)
+            if start is not None and request.url_rule is not None:
+                observe("http_request_seconds", time.perf_counter() - start,
+                        (("path", request.url_rule.rule),))
+
+    return metrics_endpoint
+
+
+def _cache_hit_ratios(counters):
+    totals = defaultdict(lambda: [0.0, 0.0])
+    for (name, labels), value in counters.items():
+        if name != "cache_requests_total":
+            continue
+        labels = dict(labels)
+        totals[labels["cache"]][labels["result"] == "hit"] += value
+    return {cache: hits / (hits + misses) for cache, (misses, hits) in totals.items()}
+
+
+def _resident_memory_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _escape(value):
+    # Label values escape backslash, double quote and line feed in the text format
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
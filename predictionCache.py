@@ -0,0 +1,141 @@
+"""
+In-process LRU/TTL cache of model predictions and SHAP vectors, per feature row.
+
+    cache = PredictionCache()
+    predictions, shap_values = cache.score(X, compute, model_version())
+
+X is the encoded model input. Each row is keyed by a hash of its values and
+the model version, so retraining never serves stale entries. compute(rows)
+returns (predictions, shap_values) and only sees the distinct rows that are
+not cached yet: a what-if slider that changes one row of the cohort costs
+one row of SHAP, and a slider dragged back to an earlier value costs nothing.
+
+Entries expire PREDICTION_CACHE_TTL seconds after they were computed and the
+least recently used ones are evicted once the cache holds more than
+PREDICTION_CACHE_MB. Lookups are counted as cache_requests_total{cache=...},
+so the hit ratio shows up on /metrics next to the HTTP caches.
+
+The cache lives in the worker process. Background callbacks run in a process
+forked from it, so they read what the worker had cached when they started
+(e.g. the cohort rows the impact chart scored on the first page load) but
+what they compute is not kept.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from metrics import count, gauge
+
+
+CACHE_MAX_BYTES = int(float(os.getenv("PREDICTION_CACHE_MB", 64)) * 1024 * 1024)
+CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", 3600))
+# Rough per-entry cost of the key, tuple and array headers on top of the values
+ENTRY_OVERHEAD = 200
+
+
+def row_keys(X, version):
+    """16-byte hash of each row of X (as float64) salted with the model version."""
+    rows = np.ascontiguousarray(np.asarray(X, dtype=np.float64))
+    salt = str(version).encode()
+    return [hashlib.blake2b(row.tobytes(), digest_size=16, salt=salt[:16]).digest() for row in rows]
+
+
+class PredictionCache:
+    """Bounded LRU of (prediction, SHAP vector) per encoded feature row."""
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL, name="prediction"):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.name = name
+        # key -> (expires, prediction, shap row); oldest use first
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def score(self, X, compute, version):
+        """
+        (predictions, shap_values) for every row of X, in row order. Rows
+        missing from the cache are deduplicated and passed to compute as one
+        slice of X.
+        """
+        keys = row_keys(X, version)
+        predictions = np.empty(len(keys))
+        shap_values = np.empty((len(keys), X.shape[1]))
+        # key -> positions of X still to compute
+        missing = {}
+        now = time.monotonic()
+        with self._lock:
+            for i, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] <= now:
+                    self._discard(key)
+                    self.expirations += 1
+                    entry = None
+                if entry is None:
+                    missing.setdefault(key, []).append(i)
+                    continue
+                self._entries.move_to_end(key)
+                predictions[i] = entry[1]
+                shap_values[i] = entry[2]
+            hits = len(keys) - sum(len(positions) for positions in missing.values())
+            self.hits += hits
+            self.misses += len(keys) - hits
+        count("cache_requests_total", hits, cache=self.name, result="hit")
+        count("cache_requests_total", len(keys) - hits, cache=self.name, result="miss")
+
+        if missing:
+            first = [positions[0] for positions in missing.values()]
+            computed_predictions, computed_shap = compute(X.iloc[first])
+            computed_predictions = np.asarray(computed_predictions, dtype=float)
+            computed_shap = np.asarray(computed_shap, dtype=float)
+            for (key, positions), prediction, shap_row in zip(missing.items(), computed_predictions,
+                                                              computed_shap):
+                predictions[positions] = prediction
+                shap_values[positions] = shap_row
+            self._store(missing, computed_predictions, computed_shap, now + self.ttl)
+        return predictions, shap_values
+
+    def _store(self, keys, predictions, shap_values, expires):
+        with self._lock:
+            for key, prediction, shap_row in zip(keys, predictions, shap_values):
+                if key in self._entries:
+                    self._discard(key)
+                shap_row = shap_row.copy()
+                self._entries[key] = (expires, float(prediction), shap_row)
+                self._bytes += shap_row.nbytes + ENTRY_OVERHEAD
+            while self._bytes > self.max_bytes and self._entries:
+                self._discard(next(iter(self._entries)))
+                self.evictions += 1
+            entries, size = len(self._entries), self._bytes
+        gauge("prediction_cache_entries", entries, cache=self.name)
+        gauge("prediction_cache_bytes", size, cache=self.name)
+
+    def _discard(self, key):
+        _, _, shap_row = self._entries.pop(key)
+        self._bytes -= shap_row.nbytes + ENTRY_OVERHEAD
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
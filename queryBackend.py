@@ -0,0 +1,284 @@
+"""
+Pluggable backend for the dashboard's group-by aggregates.
+
+    backend = make_backend(merged_df)
+    district_avg = backend.aggregate("district_avg")
+
+DATA_BACKEND=pandas (default) groups the in-memory merged_df as before.
+DATA_BACKEND=sqlite pushes the same group-bys down as SQL to an embedded
+SQLite file (SQLITE_PATH) that holds the four source tables; every gunicorn
+worker reads the same file and only keeps the small results in memory. The
+file records the source files (name, mtime, size), the COHORTS and the
+DATA_START/DATA_END window it was built from, and make_backend() rebuilds it
+when any of them changed.
+
+    python queryBackend.py build    rebuild the database from DATA_DIR
+    python queryBackend.py check    compare every aggregate with the pandas path
+"""
+import json
+import os
+import sqlite3
+import sys
+from collections import namedtuple
+
+import pandas as pd
+
+from studentData import (GRADE_COLS, GRADE_MAP, LEGACY_GRADE_MAP, active_cohorts, data_dir, date_window,
+                         load_sources, merge_sources, source_units)
+
+
+DATA_BACKEND = os.getenv("DATA_BACKEND", "pandas")
+SQLITE_PATH = os.getenv("SQLITE_PATH", os.path.join(".cache", "student.db"))
+
+# Grade points behind the two 'Average Grade' definitions in the dashboard:
+# the numeric grade columns (GRADE_MAP) and the later per-subject conversion
+# (LEGACY_GRADE_MAP).
+# Both backends read them from 'Average Grade (gpa)' / 'Average Grade (legacy)'.
+GRADE_SCALES = {"gpa": GRADE_MAP, "legacy": LEGACY_GRADE_MAP}
+
+TABLES = {
+    "demographics": "demographic",
+    "academic": "academic",
+    "activities": "activities",
+    "behavior": "behavior",
+}
+
+Aggregate = namedtuple("Aggregate", "by columns how where grade_scale")
+Aggregate.__new__.__defaults__ = ("mean", None, "gpa")
+
+ENGAGEMENT = ["Average Grade", "Forum Posts", "Completed Assignments", "Time Spent On Materials (Hours)"]
+
+# name -> group-by; `where` is a (column, value) equality filter
+AGGREGATES = {
+    "district_avg": Aggregate("District", ["Average Grade"]),
+    "edu_avg": Aggregate("Education Level", ["Average Grade"]),
+    "participation_perf": Aggregate("Participation Status", ["Average Grade"]),
+    "role_avg": Aggregate("Role", ["Average Grade"]),
+    "radar_data": Aggregate("Role", ENGAGEMENT),
+    "heat_df": Aggregate("Activity", ["Average Grade", "Forum Posts", "Time Spent On Materials (Hours)"]),
+    "forum_by_date": Aggregate("Date", ["Forum Posts"], "sum"),
+    "monthly_avg": Aggregate("Month", ["Time Spent On Materials (Hours)", "Average Grade"],
+                             grade_scale="legacy"),
+    "performance_over_time": Aggregate("Date", ["Average Grade"], grade_scale="legacy"),
+    "dropouts_by_date": Aggregate("Date", ["StudentID"], "count",
+                                  where=("Course Completion", "Incomplete"), grade_scale="legacy"),
+}
+
+
+class PandasBackend:
+    """
+    Groups an in-memory merged frame; columns are read as they are at call time.
+    'Average Grade' is read from 'Average Grade (<scale>)' when the frame has it.
+    """
+
+    name = "pandas"
+
+    def __init__(self, merged_df):
+        self.merged_df = merged_df
+
+    def aggregate(self, name):
+        spec = AGGREGATES[name]
+        df = self.merged_df
+        if spec.where:
+            column, value = spec.where
+            df = df[df[column] == value]
+        grade_column = _grade_column(spec.grade_scale)
+        sources = [grade_column if column == "Average Grade" and grade_column in df.columns else column
+                   for column in spec.columns]
+        result = getattr(df.groupby(spec.by)[sources], spec.how)()
+        result.columns = spec.columns
+        return result.reset_index()
+
+
+class SqliteBackend:
+    """Runs the aggregates as SQL against the database at path."""
+
+    name = "sqlite"
+
+    def __init__(self, path=SQLITE_PATH):
+        self.path = path
+
+    def aggregate(self, name):
+        with sqlite3.connect(f"file:{self.path}?mode=ro", uri=True) as conn:
+            sql, params = aggregate_sql(AGGREGATES[name])
+            result = pd.read_sql_query(sql, conn, params=params)
+        if "Date" in result:
+            result["Date"] = pd.to_datetime(result["Date"])
+        return result
+
+
+def make_backend(merged_df, kind=DATA_BACKEND, path=SQLITE_PATH):
+    """
+    Backend selected by DATA_BACKEND; the SQLite file is built on first use
+    and rebuilt when the selected data changed since (see source_signature).
+    """
+    if kind == "pandas":
+        return PandasBackend(merged_df)
+    if kind == "sqlite":
+        if database_signature(path) != source_signature():
+            build_database(path)
+        return SqliteBackend(path)
+    raise ValueError(f"Unknown DATA_BACKEND {kind!r}; expected 'pandas' or 'sqlite'")
+
+
+def build_database(path=SQLITE_PATH, directory=None):
+    """
+    Loads the four sources into a fresh SQLite file and swaps it in atomically,
+    so workers starting at the same time never read a half-written database.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    signature = source_signature(directory)
+    sources = dict(zip(TABLES, load_sources(directory)))
+    with sqlite3.connect(tmp_path) as conn:
+        for table, df in sources.items():
+            df.to_sql(table, conn, index=False, chunksize=50_000)
+            conn.execute(f'CREATE INDEX idx_{table}_student ON {table} ("StudentID")')
+        conn.execute(f"CREATE VIEW merged AS {_merged_sql(sources)}")
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.execute("INSERT INTO meta VALUES ('source_signature', ?)", (signature,))
+    conn.close()
+    os.replace(tmp_path, path)
+    return path
+
+
+def source_signature(directory=None):
+    """
+    The data a database built now would hold, as JSON: the data directory,
+    every source file load_sources reads (name, mtime, size), the COHORTS
+    selection and the DATA_START/DATA_END window.
+    """
+    units = [[key, [[os.path.basename(file), os.stat(file).st_mtime_ns, os.stat(file).st_size] for file in files]]
+             for key, files, _ in source_units(directory)]
+    return json.dumps({
+        "directory": os.path.abspath(directory or data_dir()),
+        "cohorts": active_cohorts(),
+        "window": date_window(),
+        "units": units,
+    }, sort_keys=True)
+
+
+def database_signature(path=SQLITE_PATH):
+    """source_signature() the database at path was built from; None without one."""
+    if not os.path.exists(path):
+        return None
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'source_signature'").fetchone()
+    except sqlite3.DatabaseError:
+        # Built before the meta table existed
+        return None
+    finally:
+        conn.close()
+    return row[0] if row else None
+
+
+def aggregate_sql(spec):
+    """(SQL, parameters) of an Aggregate over the merged view."""
+    by = _quote(spec.by)
+    selects = [f"{by} AS {by}"]
+    for column in spec.columns:
+        source = _quote(_grade_column(spec.grade_scale) if column == "Average Grade" else column)
+        if spec.how == "sum":
+            expr = f"COALESCE(SUM({source}), 0)"
+        elif spec.how == "count":
+            expr = f"COUNT({source})"
+        else:
+            expr = f"AVG({source})"
+        selects.append(f"{expr} AS {_quote(column)}")
+    where = [f"{by} IS NOT NULL"]
+    params = []
+    if spec.where:
+        column, value = spec.where
+        where.append(f"{_quote(column)} = ?")
+        params.append(value)
+    return (f"SELECT {', '.join(selects)} FROM merged WHERE {' AND '.join(where)} "
+            f"GROUP BY {by} ORDER BY {by}"), params
+
+
+def check_parity(merged_df=None, backend=None, rtol=1e-9):
+    """
+    Compares every aggregate from backend (default: the SQLite file) with
+    pandas over merged_df (default: loaded from DATA_DIR). Returns a
+    {name: error message} dict, empty when all aggregates match.
+    """
+    if merged_df is None:
+        merged_df = merge_sources(*load_sources())
+    backend = backend or SqliteBackend()
+    reference = PandasBackend(reference_frame(merged_df))
+    mismatches = {}
+    for name in AGGREGATES:
+        expected = reference.aggregate(name)
+        try:
+            pd.testing.assert_frame_equal(backend.aggregate(name), expected,
+                                          check_dtype=False, rtol=rtol)
+        except AssertionError as e:
+            mismatches[name] = str(e)
+    return mismatches
+
+
+def reference_frame(merged_df):
+    """merged_df with the derived columns the aggregates use, computed in pandas."""
+    df = merged_df.copy()
+    for scale, points in GRADE_SCALES.items():
+        df[_grade_column(scale)] = pd.concat(
+            [pd.to_numeric(df[col].map(points), errors="coerce") for col in GRADE_COLS], axis=1
+        ).mean(axis=1)
+    df["Date"] = pd.to_datetime(df["Date"])
+    df["Month"] = df["Date"].dt.to_period("M").astype(str)
+    return df
+
+
+def _merged_sql(sources):
+    columns = []
+    seen = set()
+    for table, df in sources.items():
+        for column in df.columns:
+            if column not in seen:
+                seen.add(column)
+                columns.append(f"{table}.{_quote(column)}")
+    for scale in GRADE_SCALES:
+        columns.append(f"{_average_grade_sql(GRADE_SCALES[scale])} AS {_quote(_grade_column(scale))}")
+    columns.append('substr(behavior."Date", 1, 7) AS "Month"')
+    return (f"SELECT {', '.join(columns)} FROM demographics "
+            "JOIN academic USING (\"StudentID\") "
+            "JOIN activities USING (\"StudentID\") "
+            "JOIN behavior USING (\"StudentID\")")
+
+
+def _average_grade_sql(points):
+    """Row mean of the mapped course grades, skipping missing ones like DataFrame.mean."""
+    mapped = []
+    for col in GRADE_COLS:
+        cases = " ".join(f"WHEN '{grade}' THEN {value}" for grade, value in points.items()
+                         if value is not None)
+        mapped.append(f'(CASE academic.{_quote(col)} {cases} END)')
+    total = " + ".join(f"COALESCE({m}, 0)" for m in mapped)
+    present = " + ".join(f"({m} IS NOT NULL)" for m in mapped)
+    return f"(({total}) * 1.0 / NULLIF({present}, 0))"
+
+
+def _grade_column(grade_scale):
+    return f"Average Grade ({grade_scale})"
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "check"
+    if command == "build":
+        print(build_database())
+    elif command == "check":
+        if database_signature() != source_signature():
+            build_database()
+        failures = check_parity()
+        for name, message in failures.items():
+            print(f"MISMATCH {name}\n{message}\n")
+        print(f"{len(AGGREGATES) - len(failures)}/{len(AGGREGATES)} aggregates match pandas")
+        sys.exit(1 if failures else 0)
+    else:
+        sys.exit(f"unknown command {command!r}; expected 'build' or 'check'")
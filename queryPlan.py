@@ -0,0 +1,370 @@
+#!/usr/bin/env python
+"""
+Answers data questions by having the LLM write a small query plan that runs
+locally over the whole merged_df, instead of pasting sample rows into the
+prompt.
+
+    answer = answer_question(llm, merged_df, question, on_progress=show)
+
+    python queryPlan.py "Which district has the highest average grade?" [--plan JSON] [--data DIR]
+
+The model only sees the question and the column catalogue (describe_columns:
+name, type and the values of low-cardinality text columns) and replies with
+a JSON plan:
+
+    {"filters": [{"column": "Gender", "op": "==", "value": "Female"}],
+     "group_by": ["District"],
+     "metrics": [{"column": "Average Grade", "agg": "mean"}],
+     "sort": {"column": "mean(Average Grade)", "descending": true},
+     "limit": 3}
+
+parse_plan() accepts known columns, the OPERATORS and AGGREGATIONS below and
+at most MAX_RESULT_ROWS result rows; anything else raises PlanError.
+execute_plan() runs the plan in pandas over every row, and a second, streamed
+call phrases the small result table as the answer. Both prompts stay a few
+kilobytes whatever the size of the cohort, and the numbers in the answer are
+exact rather than guessed from ten rows.
+
+ASK_MODE=sample keeps the previous prompt with df.head(10). In plan mode a
+question the model marks as not about the data ({"plan": null}), that
+yields no valid plan or whose plan fails to run (e.g. < against a text
+column holding missing values) falls back to that prompt. The outcome is counted as
+ask_plan_total and the local run timed as query_plan_seconds; both are
+recorded in the Ask AI background job and merged into /metrics by jobQueue.
+"""
+import argparse
+import json
+import operator
+import os
+import sys
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from llmBackend import stream_answer
+from metrics import count, timed
+
+
+# plan (default) or sample
+ASK_MODE = os.getenv("ASK_MODE", "plan")
+MAX_RESULT_ROWS = 50
+MAX_GROUP_BY = 3
+# Text columns with at most this many distinct values list them in the catalogue
+MAX_LISTED_VALUES = 20
+
+OPERATORS = {
+    "==": operator.eq, "!=": operator.ne,
+    "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+    "in": None,
+}
+# aggregation -> column kinds it accepts
+AGGREGATIONS = {
+    "count": {"number", "boolean", "date", "text"},
+    "nunique": {"number", "boolean", "date", "text"},
+    "sum": {"number", "boolean"},
+    "mean": {"number", "boolean"},
+    "median": {"number"},
+    "min": {"number", "date"},
+    "max": {"number", "date"},
+}
+
+QueryPlan = namedtuple("QueryPlan", "filters group_by metrics sort limit")
+QueryPlan.__new__.__defaults__ = ((), (), (("", "count"),), None, MAX_RESULT_ROWS)
+
+PLAN_PROMPT = """You translate questions about a student dataset into a JSON query plan.
+The dataset has one row per student activity record (count distinct StudentID for students) and these columns:
+{columns}
+
+Reply with JSON only, in this form:
+{{"filters": [{{"column": "...", "op": "one of {operators}", "value": ...}}],
+ "group_by": ["at most {max_group_by} columns"],
+ "metrics": [{{"column": "...", "agg": "one of {aggregations}"}}],
+ "sort": {{"column": "a group_by column or a metric such as mean(Average Grade)", "descending": true}},
+ "limit": {max_rows}}}
+Leave out "column" in a metric to count rows. Dates are written YYYY-MM-DD.
+If the question is not about the data, reply {{"plan": null}}.
+
+Question: {question}"""
+
+ANSWER_PROMPT = """You are a data assistant.
+This query plan was run over all {rows} rows of the student dataset:
+{plan}
+
+Result{truncated}:
+{result}
+
+Question: {question}
+
+Answer the question from the result. Provide a clear answer."""
+
+SAMPLE_PROMPT = """You are a data assistant.
+Answer the question using the pandas dataframe provided below.
+
+DataFrame (sample):
+{sample}
+
+Question: {question}
+
+Provide a clear answer."""
+
+
+class PlanError(ValueError):
+    """The model's reply is not a valid query plan for the frame."""
+
+
+def column_kind(series):
+    if pd.api.types.is_bool_dtype(series):
+        return "boolean"
+    if pd.api.types.is_numeric_dtype(series):
+        return "number"
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return "date"
+    return "text"
+
+
+def describe_columns(df, max_values=MAX_LISTED_VALUES):
+    """One catalogue line per column: name, kind, and the values of short text columns."""
+    lines = []
+    for column in df.columns:
+        series = df[column]
+        kind = column_kind(series)
+        line = f"- {column} ({kind})"
+        if kind == "text":
+            values = series.dropna().drop_duplicates().head(max_values + 1)
+            if len(values) <= max_values:
+                line += ": " + ", ".join(json.dumps(str(value)) for value in sorted(values, key=str))
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def plan_prompt(df, question):
+    return PLAN_PROMPT.format(columns=describe_columns(df), operators=", ".join(OPERATORS),
+                              aggregations=", ".join(AGGREGATIONS), max_group_by=MAX_GROUP_BY,
+                              max_rows=MAX_RESULT_ROWS, question=question)
+
+
+def sample_prompt(df, question):
+    return SAMPLE_PROMPT.format(sample=df.head(10).to_string(), question=question)
+
+
+def metric_name(column, agg):
+    return f"{agg}({column or '*'})"
+
+
+def parse_plan(text, df):
+    """
+    QueryPlan from the model's reply, validated against the columns of df,
+    or None when the model answered {"plan": null}.
+    """
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end < start:
+        raise PlanError("reply holds no JSON object")
+    try:
+        spec = json.loads(text[start:end + 1])
+    except json.JSONDecodeError as e:
+        raise PlanError(f"reply is not valid JSON: {e}") from None
+    if not isinstance(spec, dict):
+        raise PlanError("plan must be a JSON object")
+    if "plan" in spec and spec["plan"] is None:
+        return None
+    unknown = set(spec) - set(QueryPlan._fields) - {"plan"}
+    if unknown:
+        raise PlanError(f"unknown plan keys {sorted(unknown)}")
+
+    kinds = {column: column_kind(df[column]) for column in df.columns}
+
+    def known(column):
+        if not isinstance(column, str) or column not in kinds:
+            raise PlanError(f"unknown column {column!r}")
+        return column
+
+    filters = []
+    for item in _items(spec.get("filters"), "filters"):
+        column, op, value = known(item.get("column")), item.get("op"), item.get("value")
+        if op not in OPERATORS:
+            raise PlanError(f"unsupported operator {op!r}")
+        values = value if op == "in" else [value]
+        if op == "in" and not isinstance(value, list):
+            raise PlanError(f"'in' on {column!r} needs a list of values")
+        values = [_filter_value(column, kinds[column], v) for v in values]
+        filters.append((column, op, tuple(values) if op == "in" else values[0]))
+
+    group_by = spec.get("group_by") or []
+    if not isinstance(group_by, list) or len(group_by) > MAX_GROUP_BY:
+        raise PlanError(f"group_by must be a list of at most {MAX_GROUP_BY} columns")
+    group_by = [known(column) for column in group_by]
+
+    metrics = []
+    for item in _items(spec.get("metrics"), "metrics"):
+        column, agg = item.get("column") or "", item.get("agg")
+        if agg not in AGGREGATIONS:
+            raise PlanError(f"unsupported aggregation {agg!r}")
+        if column:
+            known(column)
+            if kinds[column] not in AGGREGATIONS[agg]:
+                raise PlanError(f"cannot take {agg} of {kinds[column]} column {column!r}")
+        elif agg != "count":
+            raise PlanError(f"{agg} needs a column")
+        metrics.append((column, agg))
+    metrics = metrics or [("", "count")]
+
+    sort = spec.get("sort")
+    if sort:
+        if not isinstance(sort, dict):
+            raise PlanError("sort must be an object")
+        sort = (_sort_column(sort.get("column"), group_by, metrics), bool(sort.get("descending", False)))
+
+    limit = spec.get("limit", MAX_RESULT_ROWS)
+    if isinstance(limit, bool) or not isinstance(limit, int) or limit < 1:
+        raise PlanError("limit must be a positive integer")
+
+    return QueryPlan(tuple(filters), tuple(group_by), tuple(metrics), sort or None,
+                     min(limit, MAX_RESULT_ROWS))
+
+
+def _items(value, key):
+    value = value or []
+    if not isinstance(value, list) or not all(isinstance(item, dict) for item in value):
+        raise PlanError(f"{key} must be a list of objects")
+    return value
+
+
+def _filter_value(column, kind, value):
+    if kind == "date":
+        try:
+            timestamp = pd.Timestamp(value)
+        except (TypeError, ValueError):
+            timestamp = pd.NaT
+        # pd.Timestamp("") and pd.Timestamp(None) are NaT, which no comparison matches
+        if pd.isna(timestamp):
+            raise PlanError(f"{value!r} is not a date for {column!r}")
+        return timestamp
+    if kind == "number" and (isinstance(value, bool) or not isinstance(value, (int, float))):
+        raise PlanError(f"{column!r} needs a number, not {value!r}")
+    if kind == "boolean" and not isinstance(value, bool):
+        raise PlanError(f"{column!r} needs true or false, not {value!r}")
+    if kind == "text" and not isinstance(value, str):
+        raise PlanError(f"{column!r} needs a string, not {value!r}")
+    return value
+
+
+def _sort_column(column, group_by, metrics):
+    """A group_by column or metric name; a bare column matches its only metric."""
+    names = [metric_name(*metric) for metric in metrics]
+    if column in group_by or column in names:
+        return column
+    matches = [name for name, (metric_column, _) in zip(names, metrics) if metric_column == column]
+    if len(matches) == 1:
+        return matches[0]
+    raise PlanError(f"cannot sort by {column!r}")
+
+
+def execute_plan(plan, df):
+    """(result frame of at most plan.limit rows, number of rows before the limit)."""
+    mask = np.ones(len(df), dtype=bool)
+    for column, op, value in plan.filters:
+        series = df[column]
+        mask &= (series.isin(value) if op == "in" else OPERATORS[op](series, value)).to_numpy(dtype=bool)
+    rows = df[mask] if not mask.all() else df
+
+    if plan.group_by:
+        grouped = rows.groupby(list(plan.group_by), sort=True, observed=True)
+        result = pd.DataFrame({
+            metric_name(column, agg): grouped.size() if not column else grouped[column].agg(agg)
+            for column, agg in plan.metrics
+        }).reset_index()
+    else:
+        result = pd.DataFrame([{
+            metric_name(column, agg): len(rows) if not column else rows[column].agg(agg)
+            for column, agg in plan.metrics
+        }])
+    if plan.sort:
+        column, descending = plan.sort
+        result = result.sort_values(column, ascending=not descending, kind="stable")
+    return result.head(plan.limit).reset_index(drop=True), len(result)
+
+
+def plan_json(plan):
+    """The plan as the JSON the model wrote it in, for the answer prompt and the CLI."""
+    return json.dumps({
+        "filters": [{"column": column, "op": op, "value": value} for column, op, value in plan.filters],
+        "group_by": list(plan.group_by),
+        "metrics": [{"column": column, "agg": agg} if column else {"agg": agg} for column, agg in plan.metrics],
+        "sort": {"column": plan.sort[0], "descending": plan.sort[1]} if plan.sort else None,
+        "limit": plan.limit,
+    }, default=str)
+
+
+def answer_prompt(df, question, plan, result, total):
+    truncated = f" (first {len(result)} of {total} rows)" if total > len(result) else ""
+    return ANSWER_PROMPT.format(rows=len(df), plan=plan_json(plan), truncated=truncated,
+                                result=result.to_string(index=False), question=question)
+
+
+def answer_question(llm, df, question, on_progress=None, mode=ASK_MODE):
+    """
+    Answer of llm to a question about df. on_progress(status, text so far)
+    reports each step and the streamed answer.
+    """
+    def progress(status, text=""):
+        if on_progress is not None:
+            on_progress(status, text)
+
+    prompt = None
+    if mode == "plan":
+        progress(f"Asking {llm.name} for a query plan...")
+        try:
+            plan = parse_plan(stream_answer(llm, plan_prompt(df, question)), df)
+        except PlanError:
+            plan, outcome = None, "invalid"
+        else:
+            outcome = "executed" if plan else "not_data"
+        if plan is not None:
+            progress(f"Running the query plan over {len(df)} rows...")
+            try:
+                with timed("query_plan_seconds"):
+                    result, total = execute_plan(plan, df)
+            except (TypeError, ValueError):
+                # A plan that parses can still fail on the data, e.g. < on text with NaN
+                outcome = "invalid"
+            else:
+                prompt = answer_prompt(df, question, plan, result, total)
+        count("ask_plan_total", outcome=outcome)
+    elif mode != "sample":
+        raise ValueError(f"Unknown ASK_MODE {mode!r}; expected 'plan' or 'sample'")
+    if prompt is None:
+        prompt = sample_prompt(df, question)
+
+    progress(f"Waiting for {llm.name}...")
+    return stream_answer(llm, prompt, on_text=lambda text: progress(f"{llm.name} is answering...", text))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("question")
+    parser.add_argument("--plan", help="run this JSON plan instead of asking the LLM for one")
+    parser.add_argument("--data", help="data directory (default DATA_DIR)")
+    parser.add_argument("--llm", help="LLM backend (default LLM_BACKEND)")
+    args = parser.parse_args(argv)
+
+    from llmBackend import LLM_BACKEND, make_llm
+    from studentData import add_derived_columns, load_sources, merge_sources
+
+    df = add_derived_columns(merge_sources(*load_sources(args.data)))
+    llm = make_llm(args.llm or LLM_BACKEND)
+    prompt = plan_prompt(df, args.question)
+    plan = parse_plan(args.plan or stream_answer(llm, prompt), df)
+    if plan is None:
+        return "The model says the question is not about the data."
+    result, total = execute_plan(plan, df)
+    answer = answer_prompt(df, args.question, plan, result, total)
+    print(f"plan: {plan_json(plan)}\n")
+    print(f"{result.to_string(index=False)}\n")
+    print(f"prompt characters: plan {len(prompt)} + answer {len(answer)}, "
+          f"sample prompt {len(sample_prompt(df, args.question))}\n")
+    print(stream_answer(llm, answer))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""
+HTTP response compression and caching for the Dash server.
+
+- Layout, callback and static responses are gzip/brotli compressed when the
+  client accepts it (brotli only if the optional `brotli` package is installed).
+- GET responses for the layout and the callback graph carry a content-hash
+  ETag, so a client that already holds the same figures gets an empty 304
+  back. The static figures are part of the layout, so its ETag covers them.
+  Callback POSTs are never tagged: a browser does not revalidate a POST.
+- Fingerprinted files under assets/ (Dash's own ?m=<mtime> on CSS/JS, and
+  asset_src() for images) are cached for a year; any other asset is cached
+  for a few minutes and then revalidated against its ETag.
+"""
+import functools
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from flask import request
+
+from metrics import count_cache
+
+try:
+    import brotli
+except ImportError:  # optional, gzip is always available
+    brotli = None
+
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+ASSET_MAX_AGE = 60 * 60 * 24 * 365
+# Assets requested without a fingerprint may change under the same URL
+UNVERSIONED_ASSET_MAX_AGE = 60 * 5
+MIN_COMPRESS_BYTES = 500
+COMPRESSIBLE_TYPES = ("application/json", "text/html", "text/css", "application/javascript",
+                      "text/javascript", "image/svg+xml")
+
+# (etag, encoding) -> compressed body, so the static layout is compressed once;
+# only tagged responses are kept, and gthread workers share it between threads
+_compressed_cache = OrderedDict()
+_compressed_cache_lock = threading.Lock()
+_COMPRESSED_CACHE_SIZE = 64
+
+
+def install_response_caching(app):
+    """
+    Registers the compression/ETag after_request hook on app.server.
+    """
+    prefix = app.config.routes_pathname_prefix
+    etag_paths = {prefix + "_dash-layout", prefix + "_dash-dependencies"}
+    asset_prefix = prefix + "assets/"
+
+    @app.server.after_request
+    def cache_and_compress(response):
+        is_asset = request.path.startswith(asset_prefix)
+        if is_asset and response.status_code in (200, 304):
+            # Flask's send_file marks everything no-cache by default
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            if "m" in request.args:
+                response.cache_control.max_age = ASSET_MAX_AGE
+            else:
+                response.cache_control.max_age = UNVERSIONED_ASSET_MAX_AGE
+                # send_file only matches its own ETag, not the per-encoding ones set below
+                etag, _ = response.get_etag()
+                if response.status_code == 200 and etag and _not_modified(response, etag):
+                    return response
+
+        if response.status_code != 200 or "Content-Encoding" in response.headers:
+            return response
+
+        if not is_asset and request.method == "GET" and request.path in etag_paths:
+            etag = hashlib.sha1(response.get_data()).hexdigest()
+            response.set_etag(etag)
+            # Always revalidate, the 304 makes that nearly free
+            response.cache_control.no_cache = True
+            if _not_modified(response, etag):
+                count_cache("etag", hit=True)
+                return response
+            count_cache("etag", hit=False)
+
+        return _compress(response)
+
+    return cache_and_compress
+
+
+def asset_src(name):
+    """
+    'assets/<name>?m=<content hash>', so the browser may keep the file for
+    ASSET_MAX_AGE and still fetches it again once its contents change.
+    """
+    return f"assets/{name}?m={_asset_hash(name)}"
+
+
+@functools.lru_cache(maxsize=None)
+def _asset_hash(name):
+    with open(os.path.join(ASSETS_DIR, name), "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()[:12]
+
+
+def _not_modified(response, etag):
+    """Turns response into an empty 304 if the client holds any encoding of etag."""
+    for tag in (etag, f"{etag}-br", f"{etag}-gzip"):
+        if tag in request.if_none_match:
+            response.set_etag(tag)
+            response.status_code = 304
+            response.direct_passthrough = False
+            response.set_data(b"")
+            return True
+    return False
+
+
+def _compress(response):
+    if response.mimetype not in COMPRESSIBLE_TYPES:
+        return response
+    encoding = _pick_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    # Static files are streamed by default; buffer them so they can be compressed
+    response.direct_passthrough = False
+    body = response.get_data()
+    if len(body) < MIN_COMPRESS_BYTES:
+        return response
+
+    etag, _ = response.get_etag()
+    if etag:
+        compressed = _cached_compress(body, etag, encoding)
+    else:
+        # Callback responses differ on every request; memoising them would only evict the layout
+        compressed = _compress_body(body, encoding)
+
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    if etag:
+        # Each encoding is a different representation and needs its own tag
+        response.set_etag(f"{etag}-{encoding}")
+    return response
+
+
+def _cached_compress(body, etag, encoding):
+    key = (etag, encoding)
+    with _compressed_cache_lock:
+        compressed = _compressed_cache.get(key)
+        if compressed is not None:
+            _compressed_cache.move_to_end(key)
+    count_cache("compressed_body", hit=compressed is not None)
+    if compressed is None:
+        compressed = _compress_body(body, encoding)
+        with _compressed_cache_lock:
+            _compressed_cache[key] = compressed
+            if len(_compressed_cache) > _COMPRESSED_CACHE_SIZE:
+                _compressed_cache.popitem(last=False)
+    return compressed
+
+
+def _compress_body(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+def _pick_encoding(accept_encodings):
+    if brotli is not None and accept_encodings["br"]:
+        return "br"
+    if accept_encodings["gzip"]:
+        return "gzip"
+    return None
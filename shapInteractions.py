@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+"""
+Precomputed SHAP interaction values of the performance model.
+
+    interactions = interaction_state(model, X, model_version())
+    interactions.strength_frame()           # mean |interaction| per feature pair
+    interactions.pair_frame(0, encoders)    # dependence data of the strongest pair
+
+    python shapInteractions.py [--data DIR] [--top-k 20] [--max-rows 2000]
+
+TreeSHAP interaction values cost about features^2 times a SHAP pass, far too
+much per request. They are computed once, for a seeded sample of at most
+MAX_ROWS rows of the encoded cohort, and only the following is kept, in
+float32:
+
+  strength   features x features mean |interaction| (diagonal: mean |main effect|)
+  pairs      the TOP_K feature pairs with the strongest interaction
+  values     rows x TOP_K interaction effect of each kept pair (phi_ij + phi_ji)
+  X          rows x features encoded feature values of the sampled rows
+
+The file (INTERACTIONS_PATH) records the model version and a fingerprint of
+the encoded cohort. interaction_state() loads it when both match and only
+computes (and saves) it otherwise. The dashboard workers never compute it:
+they only load a matching file (stored_interactions). The gunicorn master
+brings it up to date before forking them (gunicorn.conf.py), and this module
+or `batchJobs.py shap` does the same after retraining or a data refresh.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+
+INTERACTIONS_PATH = os.getenv("SHAP_INTERACTIONS_PATH", os.path.join(".cache", "shap_interactions.npz"))
+TOP_K = 20
+MAX_ROWS = 2000
+SEED = 0
+# Rows per shap_interaction_values call, bounding the float64 rows x features^2 block
+CHUNK_ROWS = 500
+
+
+class ShapInteractions:
+    """Top-k SHAP interaction pairs of a model over a row sample."""
+
+    def __init__(self, features, strength, pairs, values, X):
+        self.features = list(features)
+        self.strength = np.asarray(strength, dtype=np.float32)
+        self.pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+        self.values = np.asarray(values, dtype=np.float32)
+        self.X = np.asarray(X, dtype=np.float32)
+
+    @classmethod
+    def compute(cls, model, X, top_k=TOP_K, max_rows=MAX_ROWS, seed=SEED):
+        """Interaction values of model over at most max_rows rows of the encoded frame X."""
+        import shap
+
+        if len(X) > max_rows:
+            rows = np.sort(np.random.default_rng(seed).choice(len(X), max_rows, replace=False))
+            X = X.iloc[rows]
+        explainer = shap.TreeExplainer(model)
+        n_features = X.shape[1]
+        interactions = np.empty((len(X), n_features, n_features), dtype=np.float32)
+        for start in range(0, len(X), CHUNK_ROWS):
+            chunk = X.iloc[start:start + CHUNK_ROWS]
+            interactions[start:start + len(chunk)] = explainer.shap_interaction_values(chunk)
+
+        # The pair effect is split evenly between [i, j] and [j, i]
+        effects = interactions + interactions.transpose(0, 2, 1)
+        diagonal = np.arange(n_features)
+        effects[:, diagonal, diagonal] = interactions[:, diagonal, diagonal]
+        strength = np.abs(effects).mean(axis=0) if len(X) else np.zeros((n_features, n_features))
+
+        upper_i, upper_j = np.triu_indices(n_features, k=1)
+        order = np.argsort(-strength[upper_i, upper_j], kind="stable")[:top_k]
+        pairs = np.column_stack([upper_i[order], upper_j[order]])
+        return cls(X.columns, strength, pairs, effects[:, pairs[:, 0], pairs[:, 1]], X.to_numpy())
+
+    def save(self, path=INTERACTIONS_PATH, **meta):
+        """Writes the arrays (and JSON-able meta) to path atomically."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, meta=json.dumps(dict(meta, features=self.features)), strength=self.strength,
+                 pairs=self.pairs, values=self.values, X=self.X)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=INTERACTIONS_PATH):
+        """Returns (interactions, meta) from a file written by save()."""
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            state = cls(meta.pop("features"), data["strength"], data["pairs"], data["values"], data["X"])
+        return state, meta
+
+    def strength_frame(self, main_effects=False):
+        """Mean |interaction| as a labelled features x features frame; diagonal NaN unless main_effects."""
+        strength = self.strength.astype(float)
+        if not main_effects:
+            np.fill_diagonal(strength, np.nan)
+        return pd.DataFrame(strength, index=self.features, columns=self.features)
+
+    def top_pairs(self):
+        """[(feature_i, feature_j, strength)] of the kept pairs, strongest first."""
+        return [(self.features[i], self.features[j], float(self.strength[i, j])) for i, j in self.pairs]
+
+    def pair_frame(self, pair, label_encoders=None):
+        """
+        Dependence data of kept pair number `pair`: both features' values per
+        sampled row (categorical ones decoded with label_encoders) and the
+        'Interaction' effect.
+        """
+        i, j = self.pairs[pair]
+        frame = {}
+        for col in (i, j):
+            name = self.features[col]
+            values = self.X[:, col]
+            if label_encoders and name in label_encoders:
+                classes = label_encoders[name].classes_
+                values = classes[np.clip(values.astype(np.int64), 0, len(classes) - 1)]
+            frame[name] = values
+        frame["Interaction"] = self.values[:, pair]
+        return pd.DataFrame(frame)
+
+
+def stored_interactions(X, version, path=INTERACTIONS_PATH, top_k=TOP_K, max_rows=MAX_ROWS):
+    """
+    Interactions stored in path for this model version, encoded frame X and
+    settings; None when the file is missing or was computed for anything else.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        state, meta = ShapInteractions.load(path)
+    except (OSError, ValueError, KeyError):
+        return None
+    if all(meta.get(key) == value for key, value in _signature(X, version, top_k, max_rows).items()):
+        return state
+    return None
+
+
+def interaction_state(model, X, version, path=INTERACTIONS_PATH, top_k=TOP_K, max_rows=MAX_ROWS):
+    """
+    Interactions of model over the encoded frame X: loaded from path when it
+    was computed for this model version, data and settings, otherwise
+    computed and saved there.
+    """
+    state = stored_interactions(X, version, path, top_k, max_rows)
+    if state is not None:
+        return state
+
+    signature = _signature(X, version, top_k, max_rows)
+    start = time.perf_counter()
+    state = ShapInteractions.compute(model, X, top_k=top_k, max_rows=max_rows)
+    state.save(path, rows=len(state.X), seconds=round(time.perf_counter() - start, 3), **signature)
+    return state
+
+
+def precompute(directory=None, path=INTERACTIONS_PATH, top_k=TOP_K, max_rows=MAX_ROWS):
+    """interaction_state() of the published model over the cohort in directory (default DATA_DIR)."""
+    import joblib
+    from jobQueue import model_version
+    from studentData import load_sources, merge_sources
+    from trainModel import ENCODERS_FILE, MODEL_FILE, encode_features
+
+    model = joblib.load(MODEL_FILE)
+    X = encode_features(merge_sources(*load_sources(directory)), joblib.load(ENCODERS_FILE),
+                        model.feature_names_in_)
+    return interaction_state(model, X, model_version(), path, top_k, max_rows)
+
+
+def _signature(X, version, top_k, max_rows):
+    from trainModel import data_fingerprint
+
+    return {"model_version": version, "data": data_fingerprint(X), "top_k": top_k, "max_rows": max_rows}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--data", help="data directory (default DATA_DIR)")
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    parser.add_argument("--max-rows", type=int, default=MAX_ROWS)
+    parser.add_argument("--output", default=INTERACTIONS_PATH)
+    args = parser.parse_args(argv)
+
+    interactions = precompute(args.data, args.output, args.top_k, args.max_rows)
+    _, meta = ShapInteractions.load(args.output)
+    print(f"{args.output}: {meta['rows']} rows in {meta['seconds']}s")
+    for feature_i, feature_j, strength in interactions.top_pairs():
+        print(f"{strength:10.4f}  {feature_i} x {feature_j}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
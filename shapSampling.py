@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+"""
+Approximate mean |SHAP| per feature from a stratified row sample.
+
+    estimate = estimate_importance(model, X)
+    estimate.frame()        # Feature, Impact, Low, High, most important first
+
+    python shapSampling.py --sample-rows 250 500 1000 --background 0 25 [--data DIR]
+
+The exact impact chart explains every row of the fanned-out cohort. Above
+APPROXIMATE_ABOVE rows (SHAP_MODE=auto; exact or approximate force a mode)
+the dashboard estimates it instead:
+
+- rows are drawn without replacement from strata of STRATA (proportional
+  allocation, at least two rows per stratum so each has a variance), and
+- each sampled row is explained by the tree-path-dependent explainer of the
+  exact chart or, with background_rows > 0, by interventional TreeSHAP
+  against that many medoids of a k-means clustering of the cohort.
+
+Mean |SHAP| is the stratified estimator over the sample, with a normal
+CONFIDENCE interval from the within-stratum variances and the finite
+population correction. The interval covers the sampling error only.
+Interventional values answer a different question than the exact chart, so
+a background also moves the estimate itself; the CLI measures both effects.
+SHAP_SAMPLE_ROWS and SHAP_BACKGROUND_ROWS trade accuracy for time: cost grows
+linearly in the sampled rows and, with a background, roughly linearly in its
+size.
+
+The CLI times every combination and compares it with the exact result (all
+rows, tree-path-dependent) and, for a background, with all rows explained
+against the same background.
+"""
+import argparse
+import os
+import sys
+import time
+from collections import namedtuple
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+
+# exact, approximate, or auto: approximate above APPROXIMATE_ABOVE rows
+SHAP_MODE = os.getenv("SHAP_MODE", "auto")
+APPROXIMATE_ABOVE = int(os.getenv("SHAP_APPROXIMATE_ABOVE", 10_000))
+SAMPLE_ROWS = int(os.getenv("SHAP_SAMPLE_ROWS", 1000))
+# 0 keeps the tree-path-dependent explainer, so estimates target the exact chart
+BACKGROUND_ROWS = int(os.getenv("SHAP_BACKGROUND_ROWS", 0))
+# Encoded features the sample is stratified on
+STRATA = ("Course Completion", "Socioeconomic Status")
+CONFIDENCE = 0.95
+SEED = 0
+# Rows k-means sees when picking the background
+CLUSTER_ROWS = 20_000
+
+
+class ShapEstimate(namedtuple("ShapEstimate", "features mean_abs low high rows sample_rows background_rows seconds")):
+    """Estimated mean |SHAP| per feature with its confidence interval [low, high]."""
+
+    def frame(self):
+        frame = pd.DataFrame({"Feature": self.features, "Impact": self.mean_abs, "Low": self.low, "High": self.high})
+        return frame.sort_values("Impact", ascending=False).reset_index(drop=True)
+
+
+def use_approximation(n_rows, mode=SHAP_MODE):
+    """Whether a chart over n_rows rows should be estimated from a sample."""
+    return mode == "approximate" or (mode == "auto" and n_rows > APPROXIMATE_ABOVE)
+
+
+def stratified_sample(X, n_rows, strata=STRATA, seed=SEED):
+    """
+    Positions of a proportionally allocated stratified sample of X and the
+    stratum code of every row of X.
+    """
+    columns = [col for col in strata if col in X.columns]
+    if columns:
+        codes = X.groupby(columns, sort=True, dropna=False).ngroup().to_numpy()
+    else:
+        codes = np.zeros(len(X), dtype=np.int64)
+    if n_rows >= len(X):
+        return np.arange(len(X)), codes
+
+    rng = np.random.default_rng(seed)
+    sizes = np.bincount(codes)
+    allocation = np.clip(np.round(n_rows * sizes / len(X)).astype(np.int64), np.minimum(2, sizes), sizes)
+    order = np.argsort(codes, kind="stable")
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    positions = [rng.choice(order[start:start + size], take, replace=False)
+                 for start, size, take in zip(starts, sizes, allocation) if take]
+    return np.sort(np.concatenate(positions)), codes
+
+
+def clustered_background(X, n_rows, seed=SEED):
+    """
+    n_rows real rows of X closest to the centres of a k-means clustering of
+    the standardised cohort, so label-encoded values stay valid codes.
+    """
+    from sklearn.cluster import KMeans
+
+    if len(X) <= n_rows:
+        return X
+    rng = np.random.default_rng(seed)
+    candidates = np.sort(rng.choice(len(X), CLUSTER_ROWS, replace=False)) if len(X) > CLUSTER_ROWS \
+        else np.arange(len(X))
+    values = X.to_numpy(dtype=float)[candidates]
+    scale = values.std(axis=0)
+    scaled = (values - values.mean(axis=0)) / np.where(scale > 0, scale, 1)
+    kmeans = KMeans(n_clusters=n_rows, n_init=1, random_state=seed).fit(scaled)
+    medoids = np.unique(kmeans.transform(scaled).argmin(axis=0))
+    return X.iloc[candidates[medoids]]
+
+
+def explainer_for(model, X, background_rows=BACKGROUND_ROWS, seed=SEED):
+    import shap
+
+    if not background_rows:
+        return shap.TreeExplainer(model)
+    return shap.TreeExplainer(model, data=clustered_background(X, background_rows, seed),
+                              feature_perturbation="interventional")
+
+
+def estimate_importance(model, X, sample_rows=SAMPLE_ROWS, background_rows=BACKGROUND_ROWS,
+                        strata=STRATA, seed=SEED):
+    """ShapEstimate of mean |SHAP| per feature of model over the encoded frame X."""
+    start = time.perf_counter()
+    positions, codes = stratified_sample(X, sample_rows, strata, seed)
+    explainer = explainer_for(model, X, background_rows, seed)
+    shap_values = np.abs(explainer.shap_values(X.iloc[positions], check_additivity=False))
+    mean_abs, half_width = stratified_mean(shap_values, codes[positions], np.bincount(codes))
+    return ShapEstimate(list(X.columns), mean_abs, mean_abs - half_width, mean_abs + half_width,
+                        len(X), len(positions), background_rows, time.perf_counter() - start)
+
+
+def stratified_mean(values, sample_codes, population_sizes, confidence=CONFIDENCE):
+    """
+    Stratified estimate of the population mean of each column of values and
+    the half width of its confidence interval.
+    """
+    total = population_sizes.sum()
+    mean = np.zeros(values.shape[1])
+    variance = np.zeros(values.shape[1])
+    for code in np.unique(sample_codes):
+        stratum = values[sample_codes == code]
+        weight = population_sizes[code] / total
+        mean += weight * stratum.mean(axis=0)
+        taken = len(stratum)
+        if taken > 1 and taken < population_sizes[code]:
+            correction = 1 - taken / population_sizes[code]
+            variance += weight ** 2 * correction * stratum.var(axis=0, ddof=1) / taken
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    return mean, z * np.sqrt(variance)
+
+
+def compare(estimate, exact):
+    """Accuracy of estimate against exact mean |SHAP| values."""
+    exact = np.asarray(exact)
+    top = 10
+    return {
+        "max_abs_error": float(np.abs(estimate.mean_abs - exact).max()),
+        # Error relative to the largest impact, the scale of the chart
+        "max_rel_error": float(np.abs(estimate.mean_abs - exact).max() / exact.max()),
+        "top10_overlap": len(set(np.argsort(-exact)[:top]) & set(np.argsort(-estimate.mean_abs)[:top])) / top,
+        "ci_coverage": float(np.mean((exact >= estimate.low - 1e-12) & (exact <= estimate.high + 1e-12))),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--data", help="data directory (default DATA_DIR)")
+    parser.add_argument("--sample-rows", type=int, nargs="+", default=[250, 500, SAMPLE_ROWS])
+    parser.add_argument("--background", type=int, nargs="+", default=[0, 25])
+    parser.add_argument("--seed", type=int, default=SEED)
+    args = parser.parse_args(argv)
+
+    import joblib
+    import shap
+    from studentData import load_sources, merge_sources
+    from trainModel import ENCODERS_FILE, MODEL_FILE, encode_features
+
+    model = joblib.load(MODEL_FILE)
+    X = encode_features(merge_sources(*load_sources(args.data)), joblib.load(ENCODERS_FILE),
+                        model.feature_names_in_)
+
+    start = time.perf_counter()
+    exact = np.abs(shap.TreeExplainer(model).shap_values(X)).mean(axis=0)
+    print(f"exact: {len(X)} rows in {time.perf_counter() - start:.2f}s")
+
+    rows = []
+    for background_rows in args.background:
+        full_rows = None
+        if background_rows:
+            start = time.perf_counter()
+            explainer = explainer_for(model, X, background_rows, args.seed)
+            full_rows = np.abs(explainer.shap_values(X, check_additivity=False)).mean(axis=0)
+            print(f"background {background_rows}, all rows: {time.perf_counter() - start:.2f}s")
+        for sample_rows in args.sample_rows:
+            estimate = estimate_importance(model, X, sample_rows, background_rows, seed=args.seed)
+            row = {"background": background_rows, "sample": estimate.sample_rows,
+                   "seconds": round(estimate.seconds, 3),
+                   **{f"exact_{k}": v for k, v in compare(estimate, exact).items()}}
+            if full_rows is not None:
+                row.update({f"same_bg_{k}": v for k, v in compare(estimate, full_rows).items()})
+            rows.append(row)
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(pd.DataFrame(rows).round(4).to_string(index=False))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
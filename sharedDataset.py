@@ -0,0 +1,300 @@
+#!/usr/bin/env python
+"""
+The dashboard dataset, loaded once by the gunicorn master and shared with
+every worker through POSIX shared memory.
+
+    name = publish_dataset()       # master, see gunicorn.conf.py; sets SHARED_DATASET
+    merged_df, student_index = attach_dataset()    # worker; None when nothing is shared
+
+    python sharedDataset.py --workers 1 2 4 [--data DIR]
+
+Without it every worker loads, merges and derives its own merged_df and
+sorted source tables. publish_dataset() builds them once (studentData,
+studentIndex), packs their columns into a single shared memory segment and
+exports its name in SHARED_DATASET, which the workers inherit when gunicorn
+forks them. attach_frames() maps the segment and wraps each column in a
+read-only NumPy view, so numeric, boolean and datetime columns cost no
+memory per worker. String columns are stored as int32 codes plus their
+distinct values and rebuilt as object arrays (one string object per distinct
+value), keeping the dtypes every chart and callback expects. The master
+attaches as well, so the workers inherit those arrays copy-on-write and only
+the pages of the strings whose reference counts they touch become private.
+
+The frames are read-only: writing into a shared column raises, adding
+columns to merged_df works as before. Set SHARE_DATASET=0 to have every
+worker load its own copy again. The master unlinks its segments on exit;
+after a crash, stale student-dataset-* files can be removed from /dev/shm.
+
+The CLI forks a master and --workers processes that either attach what the
+master shared or each load their own copy, and prints the growth of their
+summed proportional set size (PSS), which counts a shared page only once.
+"""
+import argparse
+import itertools
+import multiprocessing
+import os
+import pickle
+import struct
+import sys
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pandas as pd
+
+from studentData import add_derived_columns, load_sources, merge_sources
+from studentIndex import StudentIndex
+
+
+SHARE_DATASET = os.getenv("SHARE_DATASET", "1") != "0"
+# Environment variable holding the segment name, inherited by forked workers
+SHARED_DATASET_ENV = "SHARED_DATASET"
+# Column offsets are aligned for vectorised reads
+ALIGN = 64
+# Segment header: offset and length of the pickled manifest
+HEADER = struct.Struct("<QQ")
+
+# Segments this process created (to unlink) or attached (kept open while their views live)
+_created = {}
+_attached = {}
+# (segment name, (merged_df, student_index)) of the last attach_dataset() in this process
+_dataset = (None, None)
+_sequence = itertools.count()
+
+
+def _encode(values):
+    """(spec, array to store) for one column or index."""
+    if isinstance(values.dtype, np.dtype) and values.dtype.kind in "biufcmM":
+        return {"kind": "array", "dtype": values.dtype.str}, np.ascontiguousarray(values.to_numpy())
+    if values.dtype == object or isinstance(values.dtype, (pd.StringDtype, pd.CategoricalDtype)):
+        codes, uniques = pd.factorize(values)
+        return {"kind": "object", "dtype": "<i4", "uniques": list(uniques)}, codes.astype(np.int32)
+    raise TypeError(f"Cannot share column {values.name!r} of dtype {values.dtype}")
+
+
+def _decode(spec, array):
+    if spec["kind"] == "array":
+        return array
+    # Code -1 (missing) picks the trailing NaN
+    uniques = np.empty(len(spec["uniques"]) + 1, dtype=object)
+    uniques[:-1] = spec["uniques"]
+    uniques[-1] = np.nan
+    return uniques[array]
+
+
+def _segment(name, create=False, size=0):
+    """
+    SharedMemory not tracked by multiprocessing's resource tracker: this
+    module unlinks what it created, and a tracker that dies (gunicorn reaps
+    stray children) must not take the workers' segment with it.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, create=create, size=size, track=False)
+    except TypeError:
+        # Python < 3.13 always registers the segment
+        segment = shared_memory.SharedMemory(name=name, create=create, size=size)
+        resource_tracker.unregister(segment._name, "shared_memory")
+        return segment
+
+
+def share_frames(frames, name=None):
+    """
+    Copies {key: DataFrame} into a new shared memory segment and returns its
+    name. The segment lives until release_frames(name) in this process.
+    """
+    manifest, arrays, offset = {}, [], ALIGN
+    for key, df in frames.items():
+        columns = []
+        for position, column in enumerate(df.columns):
+            spec, array = _encode(df.iloc[:, position])
+            spec.update(offset=offset, length=len(array))
+            columns.append((column, spec))
+            arrays.append((offset, array))
+            offset += -(-array.nbytes // ALIGN) * ALIGN
+        index = None
+        if not isinstance(df.index, pd.RangeIndex):
+            index, array = _encode(df.index.to_series())
+            index.update(offset=offset, length=len(array), name=df.index.name)
+            arrays.append((offset, array))
+            offset += -(-array.nbytes // ALIGN) * ALIGN
+        manifest[key] = {"rows": len(df), "columns": columns, "index": index}
+
+    payload = pickle.dumps(manifest, protocol=pickle.HIGHEST_PROTOCOL)
+    segment = _segment(name, create=True, size=offset + len(payload))
+    HEADER.pack_into(segment.buf, 0, offset, len(payload))
+    for start, array in arrays:
+        np.ndarray(array.shape, array.dtype, buffer=segment.buf, offset=start)[:] = array
+    segment.buf[offset:offset + len(payload)] = payload
+    _created[segment.name] = segment
+    return segment.name
+
+
+def attach_frames(name):
+    """{key: DataFrame} of read-only views into the segment written by share_frames."""
+    segment = _attached.get(name)
+    if segment is None:
+        segment = _attached[name] = _segment(name)
+    offset, length = HEADER.unpack_from(segment.buf, 0)
+    manifest = pickle.loads(segment.buf[offset:offset + length])
+
+    def view(spec):
+        array = np.ndarray(spec["length"], np.dtype(spec["dtype"]), buffer=segment.buf, offset=spec["offset"])
+        array.flags.writeable = False
+        return _decode(spec, array)
+
+    frames = {}
+    for key, frame in manifest.items():
+        # copy=False keeps one block per column instead of consolidating (copying) them
+        df = pd.DataFrame({position: view(spec) for position, (_, spec) in enumerate(frame["columns"])},
+                          copy=False)
+        df.columns = pd.Index([column for column, _ in frame["columns"]], dtype=object)
+        if frame["index"] is not None:
+            df.index = pd.Index(view(frame["index"]), name=frame["index"]["name"])
+        frames[key] = df
+    return frames
+
+
+def release_frames(name):
+    """Unlinks a segment this process created; workers that attached it keep their mapping."""
+    segment = _created.pop(name, None)
+    if segment is None:
+        return
+    segment.close()
+    if getattr(segment, "_track", True):
+        # Python < 3.13: unlink() would unregister the segment from the tracker a second time
+        from _posixshmem import shm_unlink
+
+        shm_unlink(segment._name)
+    else:
+        segment.unlink()
+
+
+def publish_dataset(directory=None):
+    """
+    Loads merged_df (with add_derived_columns) and the sorted source tables of
+    the student index into shared memory and exports the segment name in
+    SHARED_DATASET. A segment published earlier by this process is released.
+    """
+    sources = load_sources(directory)
+    index = StudentIndex.from_sources(*sources)
+    merged_df = add_derived_columns(merge_sources(*sources))
+    frames = {"merged": merged_df, **{f"table:{key}": df for key, df in index.tables.items()}}
+    name = share_frames(frames, f"student-dataset-{os.getpid()}-{next(_sequence)}")
+    previous = os.environ.get(SHARED_DATASET_ENV)
+    os.environ[SHARED_DATASET_ENV] = name
+    if previous:
+        release_frames(previous)
+    return name
+
+
+def attach_dataset():
+    """
+    (merged_df, student_index) from the segment named by SHARED_DATASET, or
+    None. Attached once per process; a worker forked after its master
+    attached inherits the frames, string columns included.
+    """
+    global _dataset
+    name = os.getenv(SHARED_DATASET_ENV)
+    if not name:
+        return None
+    if _dataset[0] != name:
+        frames = attach_frames(name)
+        merged_df = frames.pop("merged")
+        tables = {key.split(":", 1)[1]: df for key, df in frames.items()}
+        _dataset = (name, (merged_df, StudentIndex.from_sorted(tables)))
+        _detach(keep=name)
+    return _dataset[1]
+
+
+def _detach(keep):
+    """Unmaps segments attached earlier (before a reload) once nothing views them any more."""
+    for name in [name for name in _attached if name != keep]:
+        try:
+            _attached[name].close()
+        except BufferError:
+            continue
+        del _attached[name]
+
+
+def release_dataset():
+    name = os.environ.pop(SHARED_DATASET_ENV, None)
+    if name:
+        release_frames(name)
+
+
+def pss_kb():
+    """Proportional set size of this process in kB (Linux)."""
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Pss:"):
+                return int(line.split()[1])
+    return 0
+
+
+def _touch(dataset):
+    """Reads every value, as serving requests eventually would."""
+    merged_df, student_index = dataset
+    for frame in [merged_df, *student_index.tables.values()]:
+        pd.util.hash_pandas_object(frame, index=False).sum()
+
+
+def _measure_worker(directory, results, barrier):
+    before = pss_kb()
+    dataset = attach_dataset()
+    if dataset is None:
+        sources = load_sources(directory)
+        dataset = add_derived_columns(merge_sources(*sources)), StudentIndex.from_sources(*sources)
+    _touch(dataset)
+    results.put(pss_kb() - before)
+    # Stay alive until every process has measured, so shared pages are split between all of them
+    barrier.wait()
+
+
+def _measure_master(directory, workers, shared, results, barrier):
+    """Plays the gunicorn master: publishes (when shared) and forks the workers."""
+    before = pss_kb()
+    if shared:
+        publish_dataset(directory)
+        attach_dataset()
+    else:
+        os.environ.pop(SHARED_DATASET_ENV, None)
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=_measure_worker, args=(directory, results, barrier))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    results.put(pss_kb() - before)
+    barrier.wait()
+    for process in processes:
+        process.join()
+    release_dataset()
+
+
+def measure(directory=None, workers=1, shared=True):
+    """
+    Summed PSS growth in MB of a master and its workers processes, which
+    either attach the dataset the master shared or each load their own.
+    """
+    context = multiprocessing.get_context("fork")
+    results, barrier = context.Queue(), context.Barrier(workers + 1)
+    master = context.Process(target=_measure_master, args=(directory, workers, shared, results, barrier))
+    master.start()
+    total = sum(results.get() for _ in range(workers + 1))
+    master.join()
+    return total / 1024
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--data", help="data directory (default DATA_DIR)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args(argv)
+
+    print(f"{'workers':>8} {'private MB':>12} {'shared MB':>12}")
+    for workers in args.workers:
+        private = measure(args.data, workers, shared=False)
+        shared = measure(args.data, workers, shared=True)
+        print(f"{workers:>8} {private:>12.1f} {shared:>12.1f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
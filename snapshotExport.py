@@ -0,0 +1,384 @@
+#!/usr/bin/env python
+"""
+Static snapshot export of the dashboard for read-only audiences.
+
+    python snapshotExport.py --output snapshot
+    python snapshotExport.py --output /var/www/dashboard --split --plotlyjs cdn
+
+Renders app.layout (every figure, the KPI and engagement cards) to a static
+index.html that any file server can serve without a Python worker. Figures
+are rendered client side by plotly.js from their JSON, either inlined in
+index.html (default, a single self-contained file) or split into one
+sections/<section>.json per H4 section that the page fetches on load
+(--split; needs an HTTP server, browsers block fetch() from file://).
+
+Styles from assets/ and images referenced as assets/... are inlined. Columns,
+cards and forms that only work against the server (Ask AI, the what-if
+sliders, the demography form) are left out.
+Zoomable scatters are exported as their full-page figure.
+
+Each export is written to a new release directory next to the output
+(<output>.<UTC timestamp>-<pid>) and output is a symlink to it. Publishing
+swaps that symlink with a single rename, so the file server sees either the
+previous snapshot or the new one, never a missing or half-written one (it
+has to follow symlinks, as nginx and Apache do by default). Run it after
+every data refresh, e.g. from cron:
+
+    15 2 * * *  cd /srv/studentRefactory && python snapshotExport.py --output /var/www/dashboard
+"""
+import argparse
+import base64
+import contextlib
+import html
+import io
+import json
+import mimetypes
+import os
+import re
+import shutil
+import sys
+from datetime import datetime, timezone
+
+import plotly
+from plotly.offline import get_plotlyjs, get_plotlyjs_version
+from dash.development.base_component import Component
+
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+ASSETS_DIR = os.path.join(ROOT, "assets")
+PLOTLY_CDN = f"https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"
+
+# Components that need a live server; sections holding one are not exported
+FORM_CONTROLS = {"Input", "Select", "Textarea", "Slider", "RangeSlider", "Dropdown", "Button", "Form"}
+# Containers dropped as a whole when anything inside them needs the server
+SECTION_TYPES = {"Col", "Card", "Form"}
+# Bootstrap grid classes of dbc.Col
+BREAKPOINTS = ("xs", "sm", "md", "lg", "xl", "xxl")
+# Style properties React leaves unitless
+UNITLESS = {"opacity", "zIndex", "flex", "flexGrow", "flexShrink", "fontWeight", "lineHeight", "order"}
+VOID_TAGS = {"img", "br", "hr", "input"}
+
+
+def callback_ids(app):
+    """Ids of every component read or written by a callback of app."""
+    ids = set()
+    for callback in app._callback_list:
+        output = callback["output"].strip(".")
+        for part in output.split("..."):
+            ids.add(part.rsplit(".", 1)[0])
+        for dep in callback["inputs"] + callback["state"]:
+            ids.add(dep["id"])
+    return ids
+
+
+def is_static(component, live_ids):
+    """True when component renders the same without a server behind it."""
+    if not isinstance(component, Component):
+        return True
+    if component._type == "Graph" and component_props(component).get("figure") is not None:
+        # The figure itself is static; zoom callbacks are an enhancement
+        return True
+    if component._type in FORM_CONTROLS:
+        return False
+    if getattr(component, "id", None) in live_ids:
+        return False
+    return all(is_static(child, live_ids) for child in _children(component))
+
+
+def component_props(component):
+    return {k: v for k, v in component.to_plotly_json()["props"].items() if v is not None}
+
+
+class SnapshotRenderer:
+    """Turns a Dash component tree into HTML, collecting figures per H4 section."""
+
+    def __init__(self, live_ids, figures=None):
+        self.live_ids = live_ids
+        self.deferred = figures or {}  # graph id -> figure for graphs without one
+        self.section = "overview"
+        self.figures = {}  # section -> {div id: figure JSON}
+        self.graph_count = 0
+
+    def render(self, node):
+        if node is None:
+            return ""
+        if isinstance(node, (list, tuple)):
+            return "".join(self.render(child) for child in node)
+        if not isinstance(node, Component):
+            return html.escape(str(node))
+        if not self._keep(node):
+            return ""
+
+        props = component_props(node)
+        if node._namespace == "dash_html_components":
+            if node._type == "H4":
+                self.section = _slug(_text(props.get("children"))) or self.section
+            return self._element(node._type.lower(), props)
+        if node._namespace == "dash_bootstrap_components":
+            return self._bootstrap(node._type, props)
+        if node._type == "Graph":
+            return self._graph(props)
+        return self._element("div", props)
+
+    def _keep(self, node):
+        """Drops live components, and whole columns/cards/forms built around them."""
+        if node._type in SECTION_TYPES:
+            return is_static(node, self.live_ids)
+        if node._type == "Graph":
+            return True
+        return node._type not in FORM_CONTROLS and getattr(node, "id", None) not in self.live_ids
+
+    def _bootstrap(self, kind, props):
+        classes = []
+        if kind == "Container":
+            classes.append("container-fluid" if props.get("fluid") else "container")
+        elif kind == "Row":
+            classes.append("row")
+        elif kind == "Col":
+            width = props.get("width")
+            classes.append(f"col-{width}" if isinstance(width, int) else "col")
+            classes += [f"col-{bp}-{props[bp]}" for bp in BREAKPOINTS if isinstance(props.get(bp), int)]
+        elif kind == "Card":
+            classes.append("card")
+            if props.get("body"):
+                props = dict(props, children=_BodyWrapper(props.get("children")))
+        elif kind == "CardBody":
+            classes.append("card-body")
+        return self._element("div", props, classes)
+
+    def _graph(self, props):
+        self.graph_count += 1
+        div_id = props.get("id") or f"snapshot-graph-{self.graph_count}"
+        figure = props.get("figure", self.deferred.get(div_id))
+        if figure is None:
+            return ""
+        figure = figure.to_plotly_json() if hasattr(figure, "to_plotly_json") else figure
+        self.figures.setdefault(self.section, {})[div_id] = {
+            "data": figure.get("data", []),
+            "layout": figure.get("layout", {}),
+            "config": props.get("config", {}),
+        }
+        # dcc.Graph defaults to 450px tall, like the live page
+        style = dict({"height": "450px"}, **props.get("style", {}))
+        return self._element("div", dict(id=div_id, className=props.get("className"), style=style),
+                             ["snapshot-graph"])
+
+    def _element(self, tag, props, classes=()):
+        attrs = []
+        if props.get("id"):
+            attrs.append(f'id="{html.escape(str(props["id"]))}"')
+        class_names = " ".join([*classes, props.get("className") or ""]).strip()
+        if class_names:
+            attrs.append(f'class="{html.escape(class_names)}"')
+        if props.get("style"):
+            attrs.append(f'style="{html.escape(_css(props["style"]))}"')
+        for name in ("src", "href", "alt", "title"):
+            if props.get(name):
+                value = inline_asset(props[name]) if name == "src" else props[name]
+                attrs.append(f'{name}="{html.escape(str(value))}"')
+        opening = f"<{tag}{' ' if attrs else ''}{' '.join(attrs)}>"
+        if tag in VOID_TAGS:
+            return opening
+        children = props.get("children")
+        inner = children.render(self) if isinstance(children, _BodyWrapper) else self.render(children)
+        return f"{opening}{inner}</{tag}>"
+
+
+class _BodyWrapper:
+    """Children of dbc.Card(body=True), which Bootstrap wraps in a card-body."""
+
+    def __init__(self, children):
+        self.children = children
+
+    def render(self, renderer):
+        return f'<div class="card-body">{renderer.render(self.children)}</div>'
+
+
+def inline_asset(src):
+    """assets/... and /assets/... image paths as data: URIs; anything else as is."""
+    path = src.split("?")[0].lstrip("/")
+    if not path.startswith("assets/"):
+        return src
+    full_path = os.path.join(ROOT, path)
+    if not os.path.exists(full_path):
+        return src
+    mime = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+    with open(full_path, "rb") as f:
+        return f"data:{mime};base64,{base64.b64encode(f.read()).decode()}"
+
+
+def asset_styles():
+    """Contents of the stylesheets Dash serves from assets/."""
+    if not os.path.isdir(ASSETS_DIR):
+        return ""
+    styles = []
+    for name in sorted(os.listdir(ASSETS_DIR)):
+        if name.endswith(".css"):
+            with open(os.path.join(ASSETS_DIR, name)) as f:
+                styles.append(f.read())
+    return "\n".join(styles)
+
+
+def export_snapshot(app, output, split=False, plotlyjs="inline", stylesheets=(), figures=None):
+    """
+    Writes the snapshot of app.layout and points the output symlink at it.
+    plotlyjs: 'inline' embeds plotly.js, 'cdn' loads it from cdn.plot.ly.
+    figures: {graph id: figure} for graphs the page fills in by callback.
+    Returns the path of index.html.
+    """
+    figures = figures or {}
+    renderer = SnapshotRenderer(callback_ids(app) - set(figures), figures)
+    body = renderer.render(app.layout)
+    created = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
+
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    release_dir = f"{output.rstrip(os.sep)}.{stamp}-{os.getpid()}"
+    os.makedirs(release_dir)
+
+    if split:
+        os.makedirs(os.path.join(release_dir, "sections"))
+        for section, figures in renderer.figures.items():
+            with open(os.path.join(release_dir, "sections", f"{section}.json"), "w") as f:
+                json.dump(figures, f, cls=plotly.utils.PlotlyJSONEncoder)
+        figure_data = json.dumps([f"sections/{section}.json" for section in renderer.figures])
+    else:
+        all_figures = {div_id: fig for figures in renderer.figures.values() for div_id, fig in figures.items()}
+        figure_data = json.dumps(all_figures, cls=plotly.utils.PlotlyJSONEncoder)
+
+    if plotlyjs == "inline":
+        plotly_tag = f"<script>{get_plotlyjs()}</script>"
+    else:
+        plotly_tag = f'<script src="{PLOTLY_CDN}"></script>'
+
+    page = PAGE_TEMPLATE.format(
+        title=html.escape(app.title or "Dashboard"),
+        stylesheets="".join(f'<link rel="stylesheet" href="{html.escape(url)}">' for url in stylesheets),
+        styles=asset_styles(),
+        plotly=plotly_tag,
+        body=body,
+        created=created,
+        # </script> inside JSON would end the data block early
+        figure_data=figure_data.replace("</", "<\\/"),
+        split=json.dumps(split),
+    )
+    index = os.path.join(release_dir, "index.html")
+    with open(index, "w", encoding="utf-8") as f:
+        f.write(page)
+
+    _publish(release_dir, output)
+    return os.path.join(output, "index.html")
+
+
+def _publish(release_dir, target):
+    """
+    Points the target symlink at release_dir and removes the release it
+    pointed at before. The new link is made under a temporary name and
+    renamed over target, which is atomic. A target that is still a plain
+    directory (exported before releases were symlinked) has to be moved aside
+    first; that one time the path is briefly missing.
+    """
+    target = target.rstrip(os.sep)
+    previous = os.path.realpath(target) if os.path.islink(target) else None
+    if os.path.isdir(target) and not os.path.islink(target):
+        previous = f"{target}.old-{os.getpid()}"
+        os.rename(target, previous)
+
+    link = f"{target}.link-{os.getpid()}"
+    if os.path.lexists(link):
+        os.remove(link)
+    # Relative, so the output and its releases can be moved together
+    os.symlink(os.path.basename(release_dir), link)
+    os.replace(link, target)
+
+    if previous is not None and previous != os.path.realpath(release_dir):
+        shutil.rmtree(previous, ignore_errors=True)
+
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title}</title>
+{stylesheets}
+<style>{styles}</style>
+{plotly}
+</head>
+<body>
+{body}
+<p class="text-muted small container">Snapshot generated {created}</p>
+<script type="application/json" id="snapshot-figures">{figure_data}</script>
+<script>
+(function () {{
+  var data = JSON.parse(document.getElementById("snapshot-figures").textContent);
+  function draw(figures) {{
+    Object.keys(figures).forEach(function (id) {{
+      var fig = figures[id];
+      Plotly.newPlot(id, fig.data, fig.layout, fig.config);
+    }});
+  }}
+  if ({split}) {{
+    data.forEach(function (url) {{
+      fetch(url).then(function (r) {{ return r.json(); }}).then(draw);
+    }});
+  }} else {{
+    draw(data);
+  }}
+}})();
+</script>
+</body>
+</html>
+"""
+
+
+def _children(component):
+    children = getattr(component, "children", None)
+    if children is None:
+        return []
+    return children if isinstance(children, (list, tuple)) else [children]
+
+
+def _text(children):
+    if isinstance(children, (list, tuple)):
+        return " ".join(_text(child) for child in children)
+    if isinstance(children, Component):
+        return _text(getattr(children, "children", None))
+    return "" if children is None else str(children)
+
+
+def _slug(text):
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+
+def _css(style):
+    declarations = []
+    for name, value in style.items():
+        prop = re.sub(r"([A-Z])", lambda m: "-" + m.group(1).lower(), name)
+        if isinstance(value, (int, float)) and value != 0 and name not in UNITLESS:
+            value = f"{value}px"
+        declarations.append(f"{prop}: {value}")
+    return "; ".join(declarations)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--output", default="snapshot", help="directory to write index.html into")
+    parser.add_argument("--split", action="store_true",
+                        help="write figure JSON per section instead of inlining it")
+    parser.add_argument("--plotlyjs", choices=["inline", "cdn"], default="inline",
+                        help="embed plotly.js or load it from the CDN")
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT)  # the dashboard loads its data and model files by relative path
+    with contextlib.redirect_stdout(io.StringIO()):
+        import analyseData
+    stylesheets = [s if isinstance(s, str) else s.get("href")
+                   for s in analyseData.app.config.external_stylesheets]
+    figures = {graph_id: build() for graph_id, build in analyseData.DEFERRED_FIGURES.items()}
+    index = export_snapshot(analyseData.app, os.path.abspath(args.output), split=args.split,
+                            plotlyjs=args.plotlyjs, stylesheets=stylesheets, figures=figures)
+    print(index)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,641 @@
+"""
+Streaming, mergeable statistics over the merged student rows.
+
+    comoments = CoMoments(CORRELATION_COLUMNS)
+    for chunk in chunks:
+        comoments.update(chunk)
+    comoments.corr()                       # like merged_df[CORRELATION_COLUMNS].corr()
+
+    card_stats = card_state(merged_df)
+    card_stats.mean("Forum Posts")         # O(1), no scan of merged_df
+    card_stats.mean("Python", segment="Completed")
+
+CoMoments keeps, for every pair of columns, the count, means and co-moments
+over the rows where both are present (pairwise complete, as DataFrame.corr).
+RunningStats keeps count, mean, variance (Welford), min and max per column,
+and QuantileSketches a KLL quantile sketch per column (exact up to SKETCH_K
+values, ~1.65% rank error beyond), both over all rows and per value of a
+segment column. Chunks are summarised
+independently and combined with the pairwise update of Chan, Golub & LeVeque,
+so partial results from chunks, partitions or processes merge exactly and only
+a few small arrays are kept in memory.
+
+correlation_state(), card_state() and sketch_state() keep their state on disk
+(COMOMENTS_PATH, CARD_STATS_PATH, SKETCH_PATH) together with the data units
+(behaviour partitions) it covers, so after new partitions land only those are
+read and merged in:
+
+    python streamingStats.py ingest     update every state from DATA_DIR
+    python streamingStats.py check      sketch quantiles vs exact pandas ones
+"""
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from studentData import GRADE_COLS, add_grade_columns, date_window, load_sources, merge_sources, source_units
+
+
+COMOMENTS_PATH = os.getenv("COMOMENTS_PATH", os.path.join(".cache", "comoments.npz"))
+CARD_STATS_PATH = os.getenv("CARD_STATS_PATH", os.path.join(".cache", "card_stats.npz"))
+# Rows summarised per block when streaming over an in-memory frame
+CHUNK_ROWS = 100_000
+
+CORRELATION_COLUMNS = [
+    "Attendance %",
+    "Hours Per Week",
+    "Time Spent On Materials (Hours)",
+    "Time Spent On Forum (Hours)",
+    "Forum Posts",
+    "Instructor Messages",
+    "Completed Assignments",
+    "Income Level",
+] + [col + "_num" for col in GRADE_COLS]
+
+# KPI and engagement card metrics; the KPI cards grade on their own scale
+CARD_GRADE_MAP = {
+    "A": 4, "A-": 3.7,
+    "B+": 3.5, "B": 3, "B-": 2.7,
+    "C+": 2.5, "C": 2, "C-": 1.7,
+    "D": 1, "F": 0
+}
+CARD_COLUMNS = GRADE_COLS + [
+    "Time Spent On Materials (Hours)",
+    "Forum Posts",
+    "Instructor Messages",
+    "Completed Assignments",
+]
+CARD_SEGMENT = "Course Completion"
+
+SKETCH_PATH = os.getenv("SKETCH_PATH", os.path.join(".cache", "sketches.npz"))
+# KLL accuracy parameter; see QuantileSketch for the error bound
+SKETCH_K = 200
+# Distribution chart metrics kept as quantile sketches
+SKETCH_COLUMNS = [col + "_num" for col in GRADE_COLS]
+SKETCH_SEGMENT = "Course Completion"
+
+
+class _State:
+    """Persistence shared by the accumulators; subclasses define config(), _arrays() and _restore()."""
+
+    def empty(self):
+        return type(self)(**self.config())
+
+    def save(self, path, **meta):
+        """Writes the state (and JSON-able meta) to path atomically."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, meta=json.dumps(dict(meta, config=self.config())), **self._arrays())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Returns (state, meta) from a file written by save()."""
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            state = cls(**meta.pop("config"))
+            state._restore(data)
+        return state, meta
+
+    def _blocks(self, df, columns):
+        for start in range(0, len(df), CHUNK_ROWS):
+            yield df.iloc[start:start + CHUNK_ROWS][columns]
+
+
+class CoMoments(_State):
+    """Pairwise-complete counts, means and co-moments of a fixed set of columns."""
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        k = len(self.columns)
+        self.n = np.zeros((k, k))
+        # mean[i, j]: mean of column i over the rows where i and j are both present
+        self.mean = np.zeros((k, k))
+        # m2[i, j]: sum of squared deviations of column i over those rows
+        self.m2 = np.zeros((k, k))
+        # c[i, j]: sum of cross deviations of columns i and j over those rows
+        self.c = np.zeros((k, k))
+
+    def config(self):
+        return {"columns": self.columns}
+
+    def _arrays(self):
+        return {"n": self.n, "mean": self.mean, "m2": self.m2, "c": self.c}
+
+    def _restore(self, data):
+        self.n, self.mean, self.m2, self.c = data["n"], data["mean"], data["m2"], data["c"]
+
+    def update(self, df):
+        """Adds the rows of df (numeric or numeric-like columns; NaN is missing)."""
+        for block in self._blocks(df, self.columns):
+            values = block.apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+            self.merge(self._summarise(values))
+        return self
+
+    def _summarise(self, values):
+        chunk = self.empty()
+        present = ~np.isnan(values)
+        if not present.any():
+            return chunk
+        # Centre on the column means first; the moments are shift invariant and
+        # the sums of products stay small
+        shift = np.nan_to_num(np.nanmean(np.where(present, values, np.nan), axis=0))
+        x = np.where(present, values - shift, 0.0)
+        w = present.astype(float)
+        n = w.T @ w
+        sums = x.T @ w                       # sums[i, j]: sum of x_i where j present too
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(n > 0, sums / n, 0.0)
+        chunk.n = n
+        chunk.mean = mean + shift[:, None]
+        chunk.m2 = (x * x).T @ w - mean * sums
+        chunk.c = x.T @ x - mean * sums.T
+        return chunk
+
+    def merge(self, other):
+        """Folds other (same columns) into self and returns self."""
+        if other.config() != self.config():
+            raise ValueError("Cannot merge co-moments of different columns")
+        n = self.n + other.n
+        with np.errstate(invalid="ignore", divide="ignore"):
+            weight = np.where(n > 0, self.n * other.n / n, 0.0)
+            share = np.where(n > 0, other.n / n, 0.0)
+        delta = other.mean - self.mean
+        self.c = self.c + other.c + delta * delta.T * weight
+        self.m2 = self.m2 + other.m2 + delta * delta * weight
+        self.mean = self.mean + delta * share
+        self.n = n
+        return self
+
+    def cov(self):
+        """Sample covariance matrix (ddof=1) as a DataFrame."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = np.where(self.n > 1, self.c / (self.n - 1), np.nan)
+        return pd.DataFrame(cov, index=self.columns, columns=self.columns)
+
+    def corr(self):
+        """Pearson correlation matrix as a DataFrame."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = self.c / np.sqrt(self.m2 * self.m2.T)
+        corr = np.where(self.n > 1, np.clip(corr, -1.0, 1.0), np.nan)
+        np.fill_diagonal(corr, np.where(np.diag(self.m2) > 0, 1.0, np.nan))
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+
+class RunningStats(_State):
+    """
+    Count, mean, M2, min and max per column, over all rows (segment None) and
+    per value of the segment column. maps converts a column through a dict
+    first (labels missing from it count as NaN), block by block.
+    """
+
+    # Rows of each (5, k) stats block
+    N, MEAN, M2, MIN, MAX = range(5)
+
+    def __init__(self, columns, segment=None, maps=None):
+        self.columns = list(columns)
+        self.segment = segment
+        self.maps = dict(maps or {})
+        self._stats = {None: self._zeros()}
+
+    def config(self):
+        return {"columns": self.columns, "segment": self.segment, "maps": self.maps}
+
+    def _arrays(self):
+        # Segment values go in a JSON list, their stats in one stacked array
+        return {"keys": json.dumps(list(self._stats)), "stats": np.stack(list(self._stats.values()))}
+
+    def _restore(self, data):
+        self._stats = dict(zip(json.loads(str(data["keys"])), data["stats"]))
+
+    def _zeros(self):
+        k = len(self.columns)
+        return np.array([np.zeros(k), np.zeros(k), np.zeros(k), np.full(k, np.inf), np.full(k, -np.inf)])
+
+    def update(self, df):
+        """Adds the rows of df; NaN and unmapped labels are missing values."""
+        columns = self.columns + ([self.segment] if self.segment else [])
+        for block in self._blocks(df, columns):
+            values = pd.DataFrame({
+                col: pd.to_numeric(block[col].map(self.maps[col]) if col in self.maps else block[col],
+                                   errors="coerce")
+                for col in self.columns
+            })
+            self._merge_into(None, self._summarise(values.to_numpy(dtype=float)))
+            if self.segment:
+                grouped = values.groupby(block[self.segment].to_numpy(), sort=False)
+                n = grouped.count()
+                summaries = np.stack([
+                    n.to_numpy(dtype=float),
+                    grouped.mean().fillna(0).to_numpy(),
+                    (grouped.var(ddof=0) * n).fillna(0).to_numpy(),
+                    grouped.min().fillna(np.inf).to_numpy(),
+                    grouped.max().fillna(-np.inf).to_numpy(),
+                ], axis=1)
+                for key, summary in zip(n.index, summaries):
+                    self._merge_into(key.item() if hasattr(key, "item") else key, summary)
+        return self
+
+    def _summarise(self, values):
+        present = ~np.isnan(values)
+        n = present.sum(axis=0).astype(float)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(n > 0, np.where(present, values, 0.0).sum(axis=0) / n, 0.0)
+        m2 = (np.where(present, values - mean, 0.0) ** 2).sum(axis=0)
+        return np.array([
+            n, mean, m2,
+            np.where(present, values, np.inf).min(axis=0, initial=np.inf),
+            np.where(present, values, -np.inf).max(axis=0, initial=-np.inf),
+        ])
+
+    def _merge_into(self, key, other):
+        mine = self._stats.get(key)
+        self._stats[key] = other.copy() if mine is None else _merge_stats(mine, other)
+
+    def merge(self, other):
+        """Folds other (same config) into self and returns self."""
+        if other.config() != self.config():
+            raise ValueError("Cannot merge running stats of different columns or segments")
+        for key, stats in other._stats.items():
+            self._merge_into(key, stats)
+        return self
+
+    def segments(self):
+        """Segment values seen so far."""
+        return [key for key in self._stats if key is not None]
+
+    def count(self, column, segment=None):
+        return int(self._column(column, segment)[self.N])
+
+    def mean(self, column, segment=None):
+        return self._present(self.MEAN, column, segment)
+
+    def var(self, column, segment=None, ddof=1):
+        stats = self._column(column, segment)
+        return float(stats[self.M2] / (stats[self.N] - ddof)) if stats[self.N] > ddof else np.nan
+
+    def std(self, column, segment=None, ddof=1):
+        return float(np.sqrt(self.var(column, segment, ddof)))
+
+    def min(self, column, segment=None):
+        return self._present(self.MIN, column, segment)
+
+    def max(self, column, segment=None):
+        return self._present(self.MAX, column, segment)
+
+    def summary(self, segment=None):
+        """count/mean/std/min/max per column as a DataFrame, like describe()."""
+        return pd.DataFrame({
+            stat: [getattr(self, stat)(col, segment) for col in self.columns]
+            for stat in ("count", "mean", "std", "min", "max")
+        }, index=self.columns)
+
+    def _column(self, column, segment):
+        stats = self._stats.get(segment, self._zeros())
+        return stats[:, self.columns.index(column)]
+
+    def _present(self, row, column, segment):
+        stats = self._column(column, segment)
+        return float(stats[row]) if stats[self.N] > 0 else np.nan
+
+
+def _merge_stats(a, b):
+    n = a[RunningStats.N] + b[RunningStats.N]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        weight = np.where(n > 0, a[RunningStats.N] * b[RunningStats.N] / n, 0.0)
+        share = np.where(n > 0, b[RunningStats.N] / n, 0.0)
+    delta = b[RunningStats.MEAN] - a[RunningStats.MEAN]
+    return np.array([
+        n,
+        a[RunningStats.MEAN] + delta * share,
+        a[RunningStats.M2] + b[RunningStats.M2] + delta * delta * weight,
+        np.minimum(a[RunningStats.MIN], b[RunningStats.MIN]),
+        np.maximum(a[RunningStats.MAX], b[RunningStats.MAX]),
+    ])
+
+
+class QuantileSketch:
+    """
+    KLL quantile sketch (Karnin, Lang & Liberty, 2016) of a stream of floats.
+
+    Values are kept in levels; an item on level h stands for 2**h values. When
+    a level outgrows its capacity it is sorted and every other item (random
+    offset) is promoted to the next level. The sketch is exact while it has
+    seen at most k values; beyond that the normalised rank error of quantile()
+    and rank() stays below ~1.65% with 99% probability for k=200 (the bound
+    tabulated for the Apache DataSketches KLL sketch). quantile_error() measures
+    it against exact quantiles. Count, mean, variance, min and max are exact.
+    """
+
+    def __init__(self, k=SKETCH_K, seed=0):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self._rng = np.random.default_rng(seed)
+
+    @classmethod
+    def from_values(cls, values, k=SKETCH_K):
+        return cls(k).update(values)
+
+    def update(self, values):
+        """Adds values; NaN is skipped."""
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if values.size:
+            stats = np.array([values.size, values.mean(), ((values - values.mean()) ** 2).sum(),
+                              values.min(), values.max()])
+            self._merge_moments(stats)
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self._compress()
+        return self
+
+    def merge(self, other):
+        """Folds other into self and returns self."""
+        if other.n == 0:
+            return self
+        self._merge_moments(np.array([other.n, other.mean, other.m2, other.min, other.max]))
+        for h, level in enumerate(other.levels):
+            if h == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[h] = np.concatenate([self.levels[h], level])
+        self._compress()
+        return self
+
+    def _merge_moments(self, other):
+        mine = np.array([self.n, self.mean, self.m2, self.min, self.max])
+        self.n, self.mean, self.m2, self.min, self.max = _merge_stats(mine, other).tolist()
+        self.n = int(self.n)
+
+    def _capacity(self, h):
+        return max(2, int(np.ceil(self.k * (2 / 3) ** (len(self.levels) - 1 - h))))
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            level = self.levels[h]
+            if level.size <= self._capacity(h):
+                h += 1
+                continue
+            level = np.sort(level)
+            # An odd item stays behind so the promoted weight is exact
+            keep = level[-1:] if level.size % 2 else level[:0]
+            pairs = level[:level.size - keep.size]
+            if h + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[h + 1] = np.concatenate([self.levels[h + 1], pairs[self._rng.integers(2)::2]])
+            self.levels[h] = keep
+            # Capacities shrink when a level is added; start over from the bottom
+            h = 0
+
+    @property
+    def exact(self):
+        return len(self.levels) == 1
+
+    def items(self):
+        """(sorted values, weights) currently held."""
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(level.size, 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(values, kind="stable")
+        return values[order], weights[order]
+
+    def quantile(self, q):
+        """
+        Quantile(s) q in [0, 1], interpolated linearly like np.percentile over
+        the values the sketch holds, each repeated by its weight.
+        """
+        q = np.asarray(q, dtype=float)
+        if self.n == 0:
+            return np.full(q.shape, np.nan)
+        if self.exact:
+            return np.percentile(self.levels[0], q * 100)
+        values, weights = self.items()
+        ends = np.cumsum(weights)                    # item i covers positions [ends[i-1], ends[i])
+        position = q * (ends[-1] - 1)
+        below = np.floor(position)
+        lower = values[np.searchsorted(ends, below, side="right").clip(max=values.size - 1)]
+        upper = values[np.searchsorted(ends, below + 1, side="right").clip(max=values.size - 1)]
+        return lower + (position - below) * (upper - lower)
+
+    def rank(self, x):
+        """Approximate fraction of values <= x."""
+        if self.n == 0:
+            return np.nan
+        values, weights = self.items()
+        return float(weights[values <= x].sum() / weights.sum())
+
+    def histogram(self, bins=10, range=None):
+        """
+        np.histogram of the sketched values, counts scaled to n. Each bin count
+        is off by at most twice the rank error times n (one error per edge).
+        """
+        values, weights = self.items()
+        counts, edges = np.histogram(values, bins=bins, range=range, weights=weights)
+        return counts * (self.n / weights.sum() if weights.size else 0.0), edges
+
+    def std(self, ddof=1):
+        return float(np.sqrt(self.m2 / (self.n - ddof))) if self.n > ddof else np.nan
+
+
+def quantile_error(values, sketch, qs=np.linspace(0.01, 0.99, 99)):
+    """
+    Largest normalised rank error of sketch.quantile() over qs, measured on the
+    exact values (e.g. a pandas column): how far, as a fraction of n, the ranks
+    of each sketched quantile are from those of the exact (linear) quantile.
+    """
+    values = np.asarray(values, dtype=float)
+    values = np.sort(values[~np.isnan(values)])
+
+    def ranks(points):
+        # A value repeated many times covers a range of ranks
+        return (np.searchsorted(values, points, side="left") / values.size,
+                np.searchsorted(values, points, side="right") / values.size)
+
+    (low, high), (exact_low, exact_high) = ranks(sketch.quantile(qs)), ranks(np.quantile(values, qs))
+    return float(np.max(np.clip(np.maximum(low - exact_high, exact_low - high), 0, None)))
+
+
+class QuantileSketches(_State):
+    """
+    A QuantileSketch per column, over all rows (segment None) and per value of
+    the segment column; rows without a segment value only count towards the
+    overall sketches. Merges, saves and ingests like RunningStats.
+    """
+
+    def __init__(self, columns, segment=None, k=SKETCH_K):
+        self.columns = list(columns)
+        self.segment = segment
+        self.k = k
+        self.sketches = {None: self._new()}
+
+    def config(self):
+        return {"columns": self.columns, "segment": self.segment, "k": self.k}
+
+    def _new(self):
+        return {col: QuantileSketch(self.k) for col in self.columns}
+
+    def _arrays(self):
+        # Levels of every sketch back to back, with a JSON layout to cut them apart
+        layout, levels = [], []
+        for key, sketches in self.sketches.items():
+            for col, sketch in sketches.items():
+                layout.append([key, col, sketch.n, sketch.mean, sketch.m2, sketch.min, sketch.max,
+                               [level.size for level in sketch.levels]])
+                levels.extend(sketch.levels)
+        return {"layout": json.dumps(layout), "items": np.concatenate(levels)}
+
+    def _restore(self, data):
+        items, offset = data["items"], 0
+        self.sketches = {}
+        for key, col, n, mean, m2, low, high, sizes in json.loads(str(data["layout"])):
+            sketch = QuantileSketch(self.k)
+            sketch.n, sketch.mean, sketch.m2, sketch.min, sketch.max = n, mean, m2, low, high
+            sketch.levels = []
+            for size in sizes:
+                sketch.levels.append(items[offset:offset + size])
+                offset += size
+            self.sketches.setdefault(key, {})[col] = sketch
+
+    def update(self, df):
+        """Adds the rows of df; NaN values are skipped."""
+        columns = self.columns + ([self.segment] if self.segment else [])
+        for block in self._blocks(df, columns):
+            values = block[self.columns].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+            for i, col in enumerate(self.columns):
+                self.sketches[None][col].update(values[:, i])
+            if self.segment:
+                for key, rows in block.groupby(self.segment, sort=False).indices.items():
+                    key = key.item() if hasattr(key, "item") else key
+                    sketches = self.sketches.setdefault(key, self._new())
+                    for i, col in enumerate(self.columns):
+                        sketches[col].update(values[rows, i])
+        return self
+
+    def merge(self, other):
+        """Folds other (same config) into self and returns self."""
+        if other.config() != self.config():
+            raise ValueError("Cannot merge sketches of different columns or segments")
+        for key, sketches in other.sketches.items():
+            mine = self.sketches.setdefault(key, self._new())
+            for col, sketch in sketches.items():
+                mine[col].merge(sketch)
+        return self
+
+    def segments(self):
+        """Segment values seen so far, in order of first appearance."""
+        return [key for key in self.sketches if key is not None]
+
+    def sketch(self, column, segment=None):
+        return self.sketches.get(segment, self._new())[column]
+
+    def relabel(self, labels):
+        """Shallow copy with columns renamed through the labels dict."""
+        copy = QuantileSketches([labels.get(col, col) for col in self.columns], self.segment, self.k)
+        copy.sketches = {key: {labels.get(col, col): sketch for col, sketch in sketches.items()}
+                         for key, sketches in self.sketches.items()}
+        return copy
+
+
+def ingested_state(state, path, merged_df=None, directory=None):
+    """
+    Accumulates state (an empty CoMoments or RunningStats) over the currently
+    selected data (see studentData.source_units), reusing the state saved in
+    path. Units already covered are not read again; new units are loaded,
+    summarised and merged in. When a covered unit has changed or left the
+    selection the state is rebuilt, from merged_df if the caller already holds
+    every selected row, otherwise unit by unit.
+    """
+    units = {key: (_fingerprint(files), load) for key, files, load in source_units(directory)}
+    # JSON round trip, so tuples compare equal to the lists read back from disk
+    signature = json.loads(json.dumps({
+        "window": date_window(), "kind": type(state).__name__, "config": state.config(),
+    }))
+
+    covered = {}
+    if os.path.exists(path):
+        saved, meta = type(state).load(path)
+        saved_covered = meta.get("units", {})
+        if meta.get("signature") == signature and \
+                all(key in units and units[key][0] == fingerprint
+                    for key, fingerprint in saved_covered.items()):
+            state, covered = saved, saved_covered
+
+    pending = [key for key in units if key not in covered]
+    if not pending:
+        return state
+    if not covered and merged_df is not None:
+        state.update(merged_df)
+    else:
+        for key in pending:
+            state.update(add_grade_columns(merge_sources(*units[key][1]())))
+    covered.update({key: units[key][0] for key in pending})
+    state.save(path, units=covered, signature=signature)
+    return state
+
+
+def correlation_state(merged_df=None, columns=CORRELATION_COLUMNS, path=COMOMENTS_PATH, directory=None):
+    """CoMoments of the correlation heatmap features; see ingested_state."""
+    return ingested_state(CoMoments(columns), path, merged_df, directory)
+
+
+def card_state(merged_df=None, path=CARD_STATS_PATH, directory=None):
+    """RunningStats of the KPI and engagement card metrics; see ingested_state."""
+    state = RunningStats(CARD_COLUMNS, segment=CARD_SEGMENT, maps={col: CARD_GRADE_MAP for col in GRADE_COLS})
+    return ingested_state(state, path, merged_df, directory)
+
+
+def sketch_state(merged_df=None, path=SKETCH_PATH, directory=None):
+    """QuantileSketches of the grade distribution charts; see ingested_state."""
+    return ingested_state(QuantileSketches(SKETCH_COLUMNS, segment=SKETCH_SEGMENT), path, merged_df, directory)
+
+
+def _fingerprint(files):
+    return [[os.path.basename(file), os.stat(file).st_mtime_ns, os.stat(file).st_size] for file in files]
+
+
+def check_sketches(merged_df=None, k=SKETCH_K, qs=(0.25, 0.5, 0.75)):
+    """
+    Compares sketch quantiles of the SKETCH_COLUMNS with exact pandas ones,
+    overall and per segment. Returns a DataFrame with both values and the
+    normalised rank error of the sketch over the whole 1..99% range.
+    """
+    if merged_df is None:
+        merged_df = add_grade_columns(merge_sources(*load_sources()))
+    sketches = QuantileSketches(SKETCH_COLUMNS, segment=SKETCH_SEGMENT, k=k).update(merged_df)
+    rows = []
+    for segment in [None] + sketches.segments():
+        part = merged_df if segment is None else merged_df[merged_df[SKETCH_SEGMENT] == segment]
+        for col in SKETCH_COLUMNS:
+            sketch = sketches.sketch(col, segment)
+            exact = part[col].astype(float).quantile(list(qs))
+            rows.append({
+                "segment": segment, "column": col, "n": sketch.n, "exact": sketch.exact,
+                **{f"q{q:g}": exact.loc[q] for q in qs},
+                **{f"sketch_q{q:g}": value for q, value in zip(qs, sketch.quantile(qs))},
+                "rank_error": quantile_error(part[col], sketch) if sketch.n else np.nan,
+            })
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "ingest"
+    if command == "ingest":
+        comoments = correlation_state()
+        print(f"{int(np.diag(comoments.n).max())} rows in {COMOMENTS_PATH}")
+        print(comoments.corr().round(3).to_string())
+        card_stats = card_state()
+        print(f"\n{CARD_STATS_PATH}")
+        print(card_stats.summary().round(3).to_string())
+        sketch_state()
+        print(f"\n{SKETCH_PATH}")
+    elif command == "check":
+        report = check_sketches()
+        print(report.round(4).to_string())
+        print(f"\nmax rank error {report['rank_error'].max():.4f}")
+    else:
+        sys.exit(f"unknown command {command!r}; expected 'ingest' or 'check'")
@@ -0,0 +1,271 @@
+"""
+Loading and preparation of the four student data sources.
+
+Only pandas is imported here, so benchmarks and batch jobs can build the
+merged dataset (load_merged) without pulling in the dashboard stack.
+
+DATA_DIR holds either the four flat CSVs or a layout partitioned by cohort
+(intake) and behaviour month, as written by partition_sources():
+
+    cohort=2025A/demographics.csv
+    cohort=2025A/academicPerformance.csv
+    cohort=2025A/extracurricularActivities.csv
+    cohort=2025A/month=2025-03/behavioralPatterns.csv
+
+With the partitioned layout only the selected cohorts (COHORTS env var,
+comma separated) and the months overlapping the date window (DATA_START /
+DATA_END, YYYY-MM-DD) are read; other partitions are pruned by directory
+name before any file is parsed.
+"""
+import functools
+import os
+import sys
+
+import pandas as pd
+
+
+SOURCE_FILES = {
+    "demographic": "demographics.csv",
+    "academic": "academicPerformance.csv",
+    "activities": "extracurricularActivities.csv",
+    "behavior": "behavioralPatterns.csv",
+}
+
+GRADE_MAP = {'A': 4.0, 'A-': 3.7, 'B+': 3.3, 'B': 3.0, 'B-': 2.7, 'C+': 2.3, 'C': 2.0, 'N/A': None}
+GRADE_COLS = ['Javascript', 'Python', 'HCD', 'Communication']
+# Grade points of the later per-subject conversion behind the plain 'Average Grade'
+LEGACY_GRADE_MAP = {'A': 4, 'B+': 3.5, 'B': 3, 'B-': 2.7, 'C+': 2.5, 'C': 2, 'D': 1, 'N/A': None}
+
+# Columns label-encoded for the performance model (see trainModel)
+CATEGORICAL_COLS = [
+    "StudentID", "Marital Status", "Employment Status", "Gender", "Socioeconomic Status",
+    "Location", "District", "Education Level", "Javascript", "Python", "HCD", "Communication",
+    "Course Completion", "Activity", "Participation Status", "Role", "Start Date", "End Date", "Date"
+]
+TARGET_COL = "PerformanceScore"
+TARGET_WEIGHTS = {
+    "Attendance %": 0.3,
+    "Completed Assignments": 0.4,
+    "Time Spent On Materials (Hours)": 0.2,
+    "Forum Posts": 0.1,
+}
+
+
+ID_COLUMNS = {'ID': 'StudentID', 'Student ID': 'StudentID'}
+STUDENT_SOURCES = ("demographic", "academic", "activities")
+COHORT_PREFIX = "cohort="
+MONTH_PREFIX = "month="
+
+
+def data_dir():
+    """Directory holding the CSVs, overridable with the DATA_DIR env var."""
+    return os.getenv("DATA_DIR", "data")
+
+
+def active_cohorts():
+    """Cohorts selected with the COHORTS env var; None means all of them."""
+    cohorts = [c.strip() for c in os.getenv("COHORTS", "").split(",") if c.strip()]
+    return cohorts or None
+
+
+def date_window():
+    """(start, end) dates from DATA_START / DATA_END; either may be None."""
+    return os.getenv("DATA_START") or None, os.getenv("DATA_END") or None
+
+
+def load_sources(directory=None, cohorts=None, start=None, end=None):
+    """
+    Reads the four sources and renames their ID columns to StudentID for consistency.
+    cohorts, start and end default to the env selection (see active_cohorts and
+    date_window); behaviour rows outside [start, end] are dropped.
+    Returns (demographic_df, academic_df, activities_df, behavior_df).
+    """
+    directory = directory or data_dir()
+    cohorts = cohorts if cohorts is not None else active_cohorts()
+    if start is None and end is None:
+        start, end = date_window()
+
+    if is_partitioned(directory):
+        demographic_df, academic_df, activities_df, behavior_df = \
+            _read_partitions(directory, cohorts, start, end)
+    else:
+        demographic_df = pd.read_csv(os.path.join(directory, SOURCE_FILES["demographic"]))
+        academic_df = pd.read_csv(os.path.join(directory, SOURCE_FILES["academic"]))
+        activities_df = pd.read_csv(os.path.join(directory, SOURCE_FILES["activities"]))
+        behavior_df = pd.read_csv(os.path.join(directory, SOURCE_FILES["behavior"]))
+
+    demographic_df.rename(columns=ID_COLUMNS, inplace=True)
+    academic_df.rename(columns=ID_COLUMNS, inplace=True)
+    return demographic_df, academic_df, activities_df, _filter_dates(behavior_df, start, end)
+
+
+def is_partitioned(directory):
+    return any(name.startswith(COHORT_PREFIX) for name in os.listdir(directory))
+
+
+def list_partitions(directory, cohorts=None, start=None, end=None):
+    """
+    Yields (cohort, month, path) for every behaviour partition that survives
+    pruning; month is None for the cohort's student tables.
+    """
+    start_month = start[:7] if start else None
+    end_month = end[:7] if end else None
+    for entry in sorted(os.scandir(directory), key=lambda e: e.name):
+        if not (entry.is_dir() and entry.name.startswith(COHORT_PREFIX)):
+            continue
+        cohort = entry.name[len(COHORT_PREFIX):]
+        if cohorts is not None and cohort not in cohorts:
+            continue
+        yield cohort, None, entry.path
+        for month_entry in sorted(os.scandir(entry.path), key=lambda e: e.name):
+            if not (month_entry.is_dir() and month_entry.name.startswith(MONTH_PREFIX)):
+                continue
+            month = month_entry.name[len(MONTH_PREFIX):]
+            if (start_month and month < start_month) or (end_month and month > end_month):
+                continue
+            yield cohort, month, month_entry.path
+
+
+def source_units(directory=None, cohorts=None, start=None, end=None):
+    """
+    Splits the selection load_sources would read into units whose merges are
+    disjoint: one per behaviour partition, or the whole directory for the flat
+    layout. Yields (key, files, load): key names the unit, files are the CSVs
+    its contents depend on, and load() returns its four sources like load_sources.
+    """
+    directory = directory or data_dir()
+    cohorts = cohorts if cohorts is not None else active_cohorts()
+    if start is None and end is None:
+        start, end = date_window()
+
+    if not is_partitioned(directory):
+        files = [os.path.join(directory, SOURCE_FILES[name]) for name in SOURCE_FILES]
+        yield "flat", files, lambda: load_sources(directory, cohorts, start, end)
+        return
+
+    student_files = {}
+    for cohort, month, path in list_partitions(directory, cohorts, start, end):
+        if month is None:
+            student_files[cohort] = [os.path.join(path, SOURCE_FILES[name]) for name in STUDENT_SOURCES]
+            continue
+        files = student_files[cohort] + [os.path.join(path, SOURCE_FILES["behavior"])]
+        yield f"{cohort}/{month}", files, functools.partial(_load_unit, files, start, end)
+
+
+def _load_unit(files, start, end):
+    frames = [pd.read_csv(file).rename(columns=ID_COLUMNS) for file in files]
+    frames[-1] = _filter_dates(frames[-1], start, end)
+    return tuple(frames)
+
+
+def partition_sources(sources, directory, cohort):
+    """
+    Writes one cohort's (demographic_df, academic_df, activities_df, behavior_df),
+    as returned by load_sources or syntheticData.make_sources, into the
+    partitioned layout under directory. Existing partitions of the cohort are
+    overwritten month by month.
+    """
+    cohort_dir = os.path.join(directory, COHORT_PREFIX + cohort)
+    os.makedirs(cohort_dir, exist_ok=True)
+    demographic_df, academic_df, activities_df, behavior_df = sources
+    for name, df in zip(STUDENT_SOURCES, (demographic_df, academic_df, activities_df)):
+        df.to_csv(os.path.join(cohort_dir, SOURCE_FILES[name]), index=False)
+    for month, month_df in behavior_df.groupby(behavior_df['Date'].astype(str).str[:7]):
+        month_dir = os.path.join(cohort_dir, MONTH_PREFIX + month)
+        os.makedirs(month_dir, exist_ok=True)
+        month_df.to_csv(os.path.join(month_dir, SOURCE_FILES["behavior"]), index=False)
+    return cohort_dir
+
+
+def _read_partitions(directory, cohorts, start, end):
+    frames = {name: [] for name in SOURCE_FILES}
+    for cohort, month, path in list_partitions(directory, cohorts, start, end):
+        names = ("behavior",) if month else STUDENT_SOURCES
+        for name in names:
+            file = os.path.join(path, SOURCE_FILES[name])
+            if os.path.exists(file):
+                # Rename per file so cohorts written with raw or renamed IDs concat cleanly
+                frames[name].append(pd.read_csv(file).rename(columns=ID_COLUMNS))
+    if not frames["demographic"]:
+        raise FileNotFoundError(f"No partitions in {directory} for cohorts {cohorts}")
+    # An empty window still needs the behaviour columns for the merge
+    if not frames["behavior"]:
+        frames["behavior"].append(pd.DataFrame(columns=['StudentID', 'Date']))
+    return tuple(pd.concat(frames[name], ignore_index=True) for name in SOURCE_FILES)
+
+
+def _filter_dates(behavior_df, start, end):
+    if start is None and end is None:
+        return behavior_df
+    dates = behavior_df['Date'].astype(str)
+    keep = pd.Series(True, index=behavior_df.index)
+    if start:
+        keep &= dates >= start
+    if end:
+        keep &= dates <= end
+    return behavior_df[keep].reset_index(drop=True)
+
+
+def merge_sources(demographic_df, academic_df, activities_df, behavior_df):
+    """One row per student x activity x behaviour record."""
+    return demographic_df.merge(academic_df, on='StudentID') \
+                         .merge(activities_df, on='StudentID') \
+                         .merge(behavior_df, on='StudentID')
+
+
+def add_grade_columns(merged_df):
+    """Adds the numeric '<course>_num' grade columns in place and returns merged_df."""
+    for col in GRADE_COLS:
+        merged_df[col + '_num'] = merged_df[col].map(GRADE_MAP)
+    return merged_df
+
+
+def performance_score(merged_df):
+    """The model's target: a weighted sum of attendance, assignments, study time and posts."""
+    return sum(merged_df[col] * weight for col, weight in TARGET_WEIGHTS.items())
+
+
+def add_derived_columns(merged_df):
+    """
+    Adds the per-row columns the dashboard charts and aggregates read, in place:
+    the numeric grades, missing-grade flag and count, grade spread, both
+    'Average Grade' scales ('Average Grade' itself is the legacy one), and Date
+    as datetime with its Month and Weekday. Returns merged_df.
+    """
+    merged_df['Missing grades'] = merged_df[['Python', 'HCD', 'Communication']].isnull().any(axis=1)
+    add_grade_columns(merged_df)
+    numeric_cols = [col + '_num' for col in GRADE_COLS]
+    merged_df['Grade Std Dev'] = merged_df[numeric_cols].std(axis=1)
+    merged_df['Missing Grades'] = merged_df[numeric_cols].isna().sum(axis=1)
+    merged_df['Average Grade (gpa)'] = merged_df[numeric_cols].mean(axis=1)
+    legacy_points = merged_df[GRADE_COLS].apply(lambda grades: pd.to_numeric(grades.map(LEGACY_GRADE_MAP),
+                                                                             errors='coerce'))
+    merged_df['Average Grade (legacy)'] = legacy_points.mean(axis=1)
+    merged_df['Average Grade'] = merged_df['Average Grade (legacy)']
+
+    merged_df['Date'] = pd.to_datetime(merged_df['Date'])
+    merged_df['Month'] = merged_df['Date'].dt.to_period('M').astype(str)
+    merged_df['Weekday'] = merged_df['Date'].dt.day_name()
+    return merged_df
+
+
+def load_merged(directory=None, cohorts=None, start=None, end=None):
+    """merged_df as the dashboard sees it: the selected sources merged, with add_derived_columns."""
+    return add_derived_columns(merge_sources(*load_sources(directory, cohorts, start, end)))
+
+
+def melt_grades(merged_df):
+    """Long format (StudentID, Course Completion, Course, Grade) for per-course visuals."""
+    melted = merged_df.melt(id_vars=['StudentID', 'Course Completion'],
+                            value_vars=[col + '_num' for col in GRADE_COLS],
+                            var_name='Course', value_name='Grade')
+    melted['Course'] = melted['Course'].str.replace('_num', '')
+    return melted
+
+
+if __name__ == "__main__":
+    # python studentData.py <cohort> <dest_dir> [source_dir]
+    # Copies the flat CSVs of source_dir (default DATA_DIR) into dest_dir as one cohort.
+    cohort, dest = sys.argv[1], sys.argv[2]
+    source = sys.argv[3] if len(sys.argv) > 3 else None
+    print(partition_sources(load_sources(source), dest, cohort))
@@ -0,0 +1,78 @@
+"""
+StudentID -> row-range index over the student tables, for the drill-down view.
+
+    index = StudentIndex.from_sources(*load_sources())
+    index.rows("behavior", "S001")     # that student's behaviour records
+    index.merged("S001")               # that student's merged rows, as in merged_df
+
+Every table is sorted by StudentID once when the index is built, and the
+[start, stop) row range of each student is kept in a dict, so a lookup is a
+dict access plus an iloc slice whatever the cohort size, instead of a boolean
+mask over the fanned-out merged_df. Like studentData, only pandas and numpy
+are imported.
+"""
+import numpy as np
+
+from studentData import SOURCE_FILES, merge_sources
+
+
+# Secondary sort keys, so per-student rows come out in time order
+SORT_KEYS = {"activities": ["Start Date"], "behavior": ["Date"]}
+
+
+class StudentIndex:
+    """Sorted copies of the source tables plus each student's row range in them."""
+
+    def __init__(self, tables):
+        self.tables = {}
+        self.ranges = {}
+        for name, df in tables.items():
+            self.add(name, df)
+
+    @classmethod
+    def from_sources(cls, demographic_df, academic_df, activities_df, behavior_df):
+        return cls(dict(zip(SOURCE_FILES, (demographic_df, academic_df, activities_df, behavior_df))))
+
+    @classmethod
+    def from_sorted(cls, tables):
+        """Index over tables add() already sorted (another index's tables), used as they are."""
+        index = cls({})
+        for name, df in tables.items():
+            index.tables[name] = df
+            index.ranges[name] = row_ranges(df["StudentID"].to_numpy())
+        return index
+
+    def add(self, name, df):
+        """Sorts df by StudentID (rows without one are dropped) and indexes it as name."""
+        keys = ["StudentID"] + [col for col in SORT_KEYS.get(name, []) if col in df.columns]
+        df = df[df["StudentID"].notna()].sort_values(keys, kind="mergesort").reset_index(drop=True)
+        self.tables[name] = df
+        self.ranges[name] = row_ranges(df["StudentID"].to_numpy())
+
+    def __contains__(self, student_id):
+        return any(student_id in ranges for ranges in self.ranges.values())
+
+    def __len__(self):
+        return len(self.student_ids())
+
+    def student_ids(self):
+        return sorted(set().union(*self.ranges.values()))
+
+    def rows(self, name, student_id):
+        """The student's rows of table name; empty (with the columns) when absent."""
+        start, stop = self.ranges[name].get(student_id, (0, 0))
+        return self.tables[name].iloc[start:stop]
+
+    def merged(self, student_id):
+        """The student's rows of merged_df, rebuilt from the four table slices."""
+        return merge_sources(*(self.rows(name, student_id) for name in SOURCE_FILES))
+
+
+def row_ranges(sorted_ids):
+    """{id: (start, stop)} for each run of equal ids in an already sorted array."""
+    if len(sorted_ids) == 0:
+        return {}
+    breaks = np.flatnonzero(sorted_ids[1:] != sorted_ids[:-1]) + 1
+    starts = np.concatenate(([0], breaks))
+    stops = np.concatenate((breaks, [len(sorted_ids)]))
+    return dict(zip(sorted_ids[starts].tolist(), zip(starts.tolist(), stops.tolist())))
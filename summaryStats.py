@@ -0,0 +1,372 @@
+"""
+Server-side summary statistics for the box and violin charts.
+
+px.box / px.violin serialise every row so the browser can compute quartiles and
+densities itself. Here the quartiles, whiskers, outliers and kernel density are
+computed per group in pandas/numpy and only those numbers are sent, so the
+figure payload depends on the number of groups, not on the number of students.
+
+The figure builders also take streamingStats.QuantileSketches instead of a
+frame: x then names the sketched columns, y their values, and color may be the
+sketch segment. Such summaries merge across partitions and workers, at the
+sketch's rank error once a group outgrows SKETCH_K values.
+"""
+import numpy as np
+import pandas as pd
+import plotly.colors
+import plotly.graph_objects as go
+
+from streamingStats import QuantileSketch, QuantileSketches
+
+
+# Outliers beyond this count are thinned to evenly spaced ranks (extremes kept)
+MAX_OUTLIERS = 50
+KDE_POINTS = 100
+KDE_BINS = 512
+# A numeric violin x with more distinct values is binned into at most this many groups
+MAX_VIOLIN_GROUPS = 12
+
+
+def describe_distribution(values, kde=False):
+    """
+    Quartiles, Tukey whiskers, mean and outliers of values, as plotted by a box.
+    Quartiles use linear interpolation, the default quartilemethod of plotly.
+    kde: also return a kernel density estimate under 'kde_y' / 'kde_density'
+    values may be a QuantileSketch (see _describe_sketch).
+    """
+    if isinstance(values, QuantileSketch):
+        return _describe_sketch(values, kde)
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        return None
+
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    low_limit, high_limit = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+    inside = values[(values >= low_limit) & (values <= high_limit)]
+    outliers = np.sort(values[(values < low_limit) | (values > high_limit)])
+    if outliers.size > MAX_OUTLIERS:
+        keep = np.linspace(0, outliers.size - 1, MAX_OUTLIERS).round().astype(int)
+        outliers = outliers[keep]
+
+    stats = {
+        "n": int(values.size),
+        "mean": float(values.mean()),
+        "q1": float(q1),
+        "median": float(median),
+        "q3": float(q3),
+        "lowerfence": float(inside.min()),
+        "upperfence": float(inside.max()),
+        "outliers": outliers,
+    }
+    if kde:
+        stats["kde_y"], stats["kde_density"] = kernel_density(values)
+    return stats
+
+
+def _describe_sketch(sketch, kde=False):
+    """
+    describe_distribution() of a QuantileSketch: quartiles from the sketch,
+    fences and outliers from the values it holds plus the exact min and max.
+    Identical to the raw-value result while the sketch is exact.
+    """
+    if sketch.n == 0:
+        return None
+    q1, median, q3 = sketch.quantile([0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    low_limit, high_limit = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+    values, _ = sketch.items()
+    if not sketch.exact:
+        # The true extremes may have been compacted away
+        values = np.unique(np.concatenate([values, [sketch.min, sketch.max]]))
+    inside = values[(values >= low_limit) & (values <= high_limit)]
+    outliers = values[(values < low_limit) | (values > high_limit)]
+    if outliers.size > MAX_OUTLIERS:
+        keep = np.linspace(0, outliers.size - 1, MAX_OUTLIERS).round().astype(int)
+        outliers = outliers[keep]
+
+    stats = {
+        "n": sketch.n,
+        "mean": sketch.mean,
+        "q1": float(q1),
+        "median": float(median),
+        "q3": float(q3),
+        "lowerfence": float(inside.min()) if inside.size else float(median),
+        "upperfence": float(inside.max()) if inside.size else float(median),
+        "outliers": outliers,
+    }
+    if kde:
+        stats["kde_y"], stats["kde_density"] = kernel_density(sketch)
+    return stats
+
+
+def kernel_density(values, points=KDE_POINTS):
+    """
+    Gaussian KDE on a grid of `points` values, using the same Silverman bandwidth
+    and 'soft' span (2 bandwidths past min/max) as plotly.js violins.
+    Rows are binned first, so cost is O(n + KDE_BINS * points) rather than O(n * points).
+    values may be a QuantileSketch, whose weighted values are binned instead.
+    """
+    if isinstance(values, QuantileSketch):
+        n, std = values.n, values.std() if values.n > 1 else 0.0
+        iqr = np.subtract(*values.quantile([0.75, 0.25]))
+        low, high = values.min, values.max
+        values, weights = values.items()
+    else:
+        n = values.size
+        std = values.std(ddof=1) if n > 1 else 0.0
+        iqr = np.subtract(*np.percentile(values, [75, 25]))
+        low, high = values.min(), values.max()
+        weights = None
+    spread = min(std, iqr / 1.349) if iqr > 0 else std
+    bandwidth = 1.059 * spread * n ** -0.2
+    if bandwidth <= 0:
+        # Every value identical: draw a narrow bump instead of a spike
+        bandwidth = max(abs(values[0]) * 0.05, 0.1)
+
+    grid = np.linspace(low - 2 * bandwidth, high + 2 * bandwidth, points)
+    counts, edges = np.histogram(values, bins=KDE_BINS, range=(grid[0], grid[-1]), weights=weights)
+    centers = (edges[:-1] + edges[1:]) / 2
+    scaled = (grid[:, None] - centers[None, :]) / bandwidth
+    density = np.exp(-0.5 * scaled ** 2) @ counts / (n * bandwidth * np.sqrt(2 * np.pi))
+    return grid, density
+
+
+def summarise_groups(df, y, x=None, color=None, kde=False):
+    """
+    One row of describe_distribution() output per (x, color) group of df[y].
+    Groups keep their order of first appearance, like plotly express.
+    df may be QuantileSketches (see summarise_sketches).
+    """
+    if isinstance(df, QuantileSketches):
+        return summarise_sketches(df, x, color=color, kde=kde)
+    keys = [c for c in dict.fromkeys([x, color]) if c is not None]
+    rows = []
+    if keys:
+        for key, group in df.groupby(keys, sort=False, dropna=False):
+            stats = describe_distribution(group[y], kde=kde)
+            if stats is None:
+                continue
+            key = key if isinstance(key, tuple) else (key,)
+            rows.append({**dict(zip(keys, key)), **stats})
+    else:
+        stats = describe_distribution(df[y], kde=kde)
+        if stats is not None:
+            rows.append(stats)
+    return pd.DataFrame(rows)
+
+
+def summarise_sketches(sketches, x, color=None, kde=False):
+    """
+    summarise_groups() over QuantileSketches, as if they were the long format
+    (x = column name, value) of the sketched columns: one row per column, or
+    per column and segment when color is the sketch segment.
+    """
+    segmented = color is not None and color != x
+    if segmented and color != sketches.segment:
+        raise ValueError(f"Sketches are segmented by {sketches.segment!r}, not {color!r}")
+    rows = []
+    for column in sketches.columns:
+        for segment in sketches.segments() if segmented else [None]:
+            stats = describe_distribution(sketches.sketch(column, segment), kde=kde)
+            if stats is None:
+                continue
+            keys = {x: column, color: segment} if segmented else dict.fromkeys([x, color or x], column)
+            rows.append({**keys, **stats})
+    return pd.DataFrame(rows)
+
+
+def summary_box_figure(df, x, y, color=None, title=None,
+                       color_discrete_map=None, color_discrete_sequence=None):
+    """
+    Equivalent of px.box(df, x, y, color) built from precomputed quartiles.
+    df may be QuantileSketches (see summarise_sketches).
+    """
+    summary = summarise_groups(df, y, x=x, color=color)
+    grouped = color is not None and color != x
+    fig = go.Figure()
+
+    for name, part, trace_color in _color_groups(summary, color, color_discrete_map, color_discrete_sequence):
+        positions = part[x].tolist()
+        fig.add_trace(go.Box(
+            x=positions,
+            q1=part["q1"].tolist(),
+            median=part["median"].tolist(),
+            q3=part["q3"].tolist(),
+            lowerfence=part["lowerfence"].tolist(),
+            upperfence=part["upperfence"].tolist(),
+            name=name,
+            legendgroup=name,
+            showlegend=color is not None,
+            offsetgroup=name if grouped else None,
+            marker_color=trace_color,
+        ))
+        out_x, out_y = _outlier_points(part, positions)
+        if out_y:
+            fig.add_trace(go.Scatter(
+                x=out_x,
+                y=out_y,
+                mode="markers",
+                name=name,
+                legendgroup=name,
+                showlegend=False,
+                offsetgroup=name if grouped else None,
+                marker=dict(color=trace_color),
+                hovertemplate=f"{x}=%{{x}}<br>{y}=%{{y}}<extra></extra>",
+            ))
+
+    fig.update_layout(
+        title=title,
+        xaxis_title=x,
+        yaxis_title=y,
+        boxmode="group" if grouped else "overlay",
+        scattermode="group" if grouped else "overlay",
+    )
+    if color is not None:
+        fig.update_layout(legend_title=color)
+    return fig
+
+
+def summary_violin_figure(df, x, y, color=None, title=None,
+                          color_discrete_map=None, color_discrete_sequence=None,
+                          box=True, meanline=False, points_marker=None, max_groups=MAX_VIOLIN_GROUPS):
+    """
+    Equivalent of px.violin(df, x, y, color, box=box) drawn from a server-side KDE.
+    Each violin is a filled outline; the inner box, mean line and outliers are
+    drawn from the same precomputed summary. Only outliers are shown as points.
+    points_marker: marker style for the outlier points
+    max_groups: a numeric x with more distinct values is binned into at most this
+    many equal-width groups, each drawn at its midpoint, so the trace count stays bounded
+    df may be QuantileSketches (see summarise_sketches).
+    """
+    if isinstance(df, pd.DataFrame) and x is not None:
+        df = _bin_numeric_x(df, x, max_groups)
+    summary = summarise_groups(df, y, x=x, color=color, kde=True)
+    grouped = color is not None and color != x
+    color_groups = list(_color_groups(summary, color, color_discrete_map, color_discrete_sequence))
+
+    categories = list(dict.fromkeys(summary[x])) if not summary.empty else []
+    numeric_x = not summary.empty and pd.api.types.is_numeric_dtype(summary[x])
+    if numeric_x:
+        base = {c: float(c) for c in categories}
+        gaps = np.diff(sorted(base.values()))
+        spacing = float(gaps.min()) if gaps.size else 1.0
+    else:
+        base = {c: float(i) for i, c in enumerate(categories)}
+        spacing = 1.0
+
+    slot = 0.8 * spacing / (len(color_groups) if grouped else 1)
+    fig = go.Figure()
+
+    for k, (name, part, trace_color) in enumerate(color_groups):
+        offset = (-0.4 * spacing + slot * (k + 0.5)) if grouped else 0.0
+        first = True
+        for _, stats in part.iterrows():
+            pos = base[stats[x]] + offset
+            half_width = 0.45 * slot * stats["kde_density"] / stats["kde_density"].max()
+            fig.add_trace(go.Scatter(
+                x=np.concatenate([pos + half_width, (pos - half_width)[::-1]]),
+                y=np.concatenate([stats["kde_y"], stats["kde_y"][::-1]]),
+                fill="toself",
+                mode="lines",
+                line=dict(color=trace_color, width=1),
+                name=name,
+                legendgroup=name,
+                showlegend=color is not None and first,
+                hoveron="fills",
+                text=f"{x}={stats[x]}<br>n={stats['n']}<br>median={stats['median']:.2f}",
+                hoverinfo="text",
+            ))
+            first = False
+
+            if box:
+                fig.add_trace(go.Box(
+                    x=[pos],
+                    q1=[stats["q1"]],
+                    median=[stats["median"]],
+                    q3=[stats["q3"]],
+                    lowerfence=[stats["lowerfence"]],
+                    upperfence=[stats["upperfence"]],
+                    width=0.15 * slot,
+                    name=name,
+                    legendgroup=name,
+                    showlegend=False,
+                    marker_color=trace_color,
+                ))
+            if meanline:
+                mean_half = 0.45 * slot * np.interp(stats["mean"], stats["kde_y"], stats["kde_density"]) \
+                    / stats["kde_density"].max()
+                fig.add_trace(go.Scatter(
+                    x=[pos - mean_half, pos + mean_half],
+                    y=[stats["mean"], stats["mean"]],
+                    mode="lines",
+                    line=dict(color=trace_color, dash="dash"),
+                    legendgroup=name,
+                    showlegend=False,
+                    hoverinfo="skip",
+                ))
+            if len(stats["outliers"]):
+                fig.add_trace(go.Scatter(
+                    x=[pos] * len(stats["outliers"]),
+                    y=stats["outliers"],
+                    mode="markers",
+                    legendgroup=name,
+                    showlegend=False,
+                    marker=points_marker or dict(color=trace_color),
+                    hovertemplate=f"{x}={stats[x]}<br>{y}=%{{y}}<extra></extra>",
+                ))
+
+    fig.update_layout(
+        title=title,
+        xaxis_title=x,
+        yaxis_title=y,
+        boxmode="overlay",
+    )
+    if color is not None:
+        fig.update_layout(legend_title=color)
+    if not numeric_x:
+        fig.update_xaxes(tickvals=list(base.values()), ticktext=[str(c) for c in categories])
+    return fig
+
+
+def _bin_numeric_x(df, x, max_groups):
+    """
+    df with a numeric x of more than max_groups distinct values replaced by the
+    midpoint of its bin; bins are at most max_groups steps of 1, 2, 2.5 or 5 x 10^k.
+    """
+    values = df[x]
+    if not pd.api.types.is_numeric_dtype(values) or values.nunique() <= max_groups:
+        return df
+    low, high = values.min(), values.max()
+    step = 10.0 ** np.floor(np.log10((high - low) / max_groups))
+    factors = iter((1, 2, 2.5, 5, 10, 20, 25, 50, 100))
+    while True:
+        width = step * next(factors)
+        start = np.floor(low / width) * width
+        if np.floor((high - start) / width) < max_groups:
+            break
+    return df.assign(**{x: (start + (np.floor((values - start) / width) + 0.5) * width).round(10)})
+
+
+def _color_groups(summary, color, color_discrete_map, color_discrete_sequence):
+    """Yields (trace name, summary rows, colour) the way plotly express assigns colours."""
+    sequence = color_discrete_sequence or plotly.colors.qualitative.Plotly
+    if summary.empty:
+        return
+    if color is None:
+        yield "", summary, sequence[0]
+        return
+    val_map = dict(color_discrete_map or {})
+    for value in dict.fromkeys(summary[color]):
+        if value not in val_map:
+            val_map[value] = sequence[len(val_map) % len(sequence)]
+        yield str(value), summary[summary[color] == value], val_map[value]
+
+
+def _outlier_points(part, positions):
+    out_x, out_y = [], []
+    for pos, outliers in zip(positions, part["outliers"]):
+        out_x.extend([pos] * len(outliers))
+        out_y.extend(outliers.tolist())
+    return out_x, out_y
@@ -0,0 +1,128 @@
+"""
+Synthetic cohorts matching the schemas of the four CSVs in data/.
+
+Categorical columns are drawn from the values the trained label encoders know
+(a subset of what occurs in the real files) and numeric columns from the same
+ranges as the real data. A cohort of n_rows has n_rows // days students, one
+activity each and one behaviour record per student per day, so the merged
+frame has n_rows rows. Generation is vectorised and handles 10^7 rows.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from studentData import SOURCE_FILES
+
+
+CHOICES = {
+    "Marital Status": ["Single", "Married", "Divorced"],
+    "Employment Status": ["Full-time", "Part-time", "Unemployed"],
+    "Gender": ["Female", "Male"],
+    "Socioeconomic Status": ["Low", "Middle", "High"],
+    "Location": ["Urban", "Suburban", "Rural"],
+    "District": ["Fort Portal", "Gulu", "Kampala", "Mukono", "Wakiso"],
+    "Education Level": ["High School", "Undergraduate", "Postgraduate"],
+    "Javascript": ["A", "A+", "A-", "B", "B+", "C", "C+"],
+    "Python": ["A", "A-", "B", "B+", "B-", "C", "C+"],
+    "HCD": ["A", "A+", "B", "B+", "B-", "C", "C+"],
+    "Communication": ["A", "A+", "B", "B+", "C+"],
+    "Course Completion": ["Completed", "Incomplete"],
+    "Activity": ["Art Club", "Chess Club", "Debate Club", "Drama Club", "Football",
+                 "Music Band", "Student Government", "Volunteering"],
+    "Participation Status": ["Active", "Inactive"],
+    "Role": ["Actor", "Coach", "Member", "Musician", "Player", "President", "Secretary",
+             "Volunteer"],
+    "Start Date": ["2022-09-01", "2022-10-01", "2023-01-01", "2023-02-01", "2023-03-01",
+                   "2023-05-15", "2023-08-01", "2023-09-01"],
+    "End Date": ["2023-04-30", "2023-05-01", "2023-06-30", "2024-01-01", "2024-02-01",
+                 "2024-03-01", "2024-05-15", "2024-06-30"],
+}
+
+# Share of missing course grades in the real data; the Javascript encoder has no 'nan'
+MISSING_GRADE_RATE = {"Javascript": 0.0, "Python": 0.05, "HCD": 0.05, "Communication": 0.05}
+
+
+def student_ids(n_students):
+    width = max(3, len(str(n_students)))
+    return np.char.add("S", np.char.zfill(np.arange(1, n_students + 1).astype(str), width))
+
+
+def make_demographics(ids, rng):
+    n = len(ids)
+    return pd.DataFrame({
+        "ID": ids,
+        "Age": rng.integers(19, 26, n),
+        "Marital Status": rng.choice(CHOICES["Marital Status"], n),
+        "Employment Status": rng.choice(CHOICES["Employment Status"], n),
+        "Gender": rng.choice(CHOICES["Gender"], n),
+        "Socioeconomic Status": rng.choice(CHOICES["Socioeconomic Status"], n),
+        "Income Level": rng.integers(10, 61, n) * 1000,
+        "Location": rng.choice(CHOICES["Location"], n),
+        "District": rng.choice(CHOICES["District"], n),
+        "Education Level": rng.choice(CHOICES["Education Level"], n),
+        "Number Of Children": rng.integers(0, 4, n),
+    })
+
+
+def make_academic(ids, rng):
+    n = len(ids)
+    df = pd.DataFrame({"Student ID": ids, "Attendance %": rng.integers(60, 100, n)})
+    for course, missing_rate in MISSING_GRADE_RATE.items():
+        grades = rng.choice(CHOICES[course], n).astype(object)
+        grades[rng.random(n) < missing_rate] = np.nan
+        df[course] = grades
+    df["Course Completion"] = rng.choice(CHOICES["Course Completion"], n, p=[0.8, 0.2])
+    return df
+
+
+def make_activities(ids, rng):
+    n = len(ids)
+    return pd.DataFrame({
+        "StudentID": ids,
+        "Activity": rng.choice(CHOICES["Activity"], n),
+        "Participation Status": rng.choice(CHOICES["Participation Status"], n),
+        "Hours Per Week": rng.integers(0, 9, n),
+        "Role": rng.choice(CHOICES["Role"], n),
+        "Start Date": rng.choice(CHOICES["Start Date"], n),
+        "End Date": rng.choice(CHOICES["End Date"], n),
+    })
+
+
+def make_behavior(ids, rng, days=4, start="2025-03-01"):
+    dates = pd.date_range(start, periods=days).strftime("%Y-%m-%d").to_numpy()
+    n = len(ids) * days
+    return pd.DataFrame({
+        "StudentID": np.repeat(ids, days),
+        "Date": np.tile(dates, len(ids)),
+        "Time Spent On Materials (Hours)": rng.integers(2, 9, n) / 2,
+        "Forum Posts": rng.integers(0, 7, n),
+        "Instructor Messages": rng.integers(0, 5, n),
+        "Completed Assignments": rng.integers(1, 5, n),
+        "Time Spent On Forum (Hours)": rng.integers(0, 12, n) / 10,
+    })
+
+
+def make_sources(n_rows, seed=0, days=4, start="2025-03-01"):
+    """
+    Returns (demographic_df, academic_df, activities_df, behavior_df) with raw
+    CSV column names, whose merge has n_rows rows (rounded down to whole students).
+    The default 4 days are the dates the model's Date encoder was trained on.
+    """
+    rng = np.random.default_rng(seed)
+    ids = student_ids(max(1, n_rows // days))
+    return (
+        make_demographics(ids, rng),
+        make_academic(ids, rng),
+        make_activities(ids, rng),
+        make_behavior(ids, rng, days=days, start=start),
+    )
+
+
+def write_sources(directory, n_rows, seed=0, days=4, start="2025-03-01"):
+    """Writes a synthetic cohort as the four CSVs under directory."""
+    os.makedirs(directory, exist_ok=True)
+    frames = make_sources(n_rows, seed=seed, days=days, start=start)
+    for name, df in zip(["demographic", "academic", "activities", "behavior"], frames):
+        df.to_csv(os.path.join(directory, SOURCE_FILES[name]), index=False)
+    return directory
@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The modules live flat at the repository root
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def shipped_data():
+    return os.path.join(ROOT, "data")
+
+
+@pytest.fixture(autouse=True)
+def default_selection(monkeypatch):
+    # Every cohort and date, whatever the shell running the tests selects
+    for name in ("DATA_DIR", "COHORTS", "DATA_START", "DATA_END"):
+        monkeypatch.delenv(name, raising=False)
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+from dash import Dash, dcc
+
+from figureScaling import SCATTER_WEBGL_THRESHOLD, adaptive_scatter, register_scatter_zoom
+
+
+def _zoom_callback(df, x, y, graph_id):
+    fig = adaptive_scatter(df, x, y, graph_id=graph_id, title="Zoom test")
+    app = Dash(__name__)
+    app.layout = dcc.Graph(id=graph_id)
+    return fig.to_plotly_json(), register_scatter_zoom(app, graph_id)
+
+
+def _frame(rows=SCATTER_WEBGL_THRESHOLD * 2):
+    rng = np.random.default_rng(3)
+    return pd.DataFrame({
+        "Date": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, rows), unit="D"),
+        "Course": rng.choice(["Data", "Web", "Mobile"], rows),
+        "Score": rng.normal(70, 10, rows),
+    })
+
+
+def test_zoom_filters_datetime_axis():
+    df = _frame()
+    current, zoom = _zoom_callback(df, "Date", "Score", "zoom-dates")
+
+    fig = zoom({"xaxis.range[0]": "2024-03-01 00:00:00", "xaxis.range[1]": "2024-03-31 12:00:00"}, current)
+
+    shown = pd.to_datetime(np.concatenate([trace.x for trace in fig.data]))
+    inside = df["Date"].between(pd.Timestamp("2024-03-01"), pd.Timestamp("2024-03-31 12:00"))
+    assert len(shown) == inside.sum()
+    assert list(fig.layout.xaxis.range) == ["2024-03-01 00:00:00", "2024-03-31 12:00:00"]
+
+
+def test_zoom_skips_categorical_axis():
+    df = _frame()
+    current, zoom = _zoom_callback(df, "Course", "Score", "zoom-courses")
+
+    # Plotly reports category positions, not values, for a categorical axis
+    fig = zoom({"xaxis.range[0]": 0.5, "xaxis.range[1]": 1.5, "yaxis.range": [60, 80]}, current)
+
+    shown = sum(len(trace.y) for trace in fig.data)
+    assert shown == df["Score"].between(60, 80).sum()
+
+
+def test_zoom_keeps_only_titles_from_current_figure():
+    df = _frame()
+    current, zoom = _zoom_callback(df, "Date", "Score", "zoom-titles")
+    current["layout"]["xaxis"]["type"] = "log"
+    current["layout"]["legend"] = {"orientation": "h"}
+
+    fig = zoom({"yaxis.range": [60, 80]}, current)
+
+    assert fig.layout.title.text == "Zoom test"
+    assert fig.layout.xaxis.title.text == "Date"
+    assert fig.layout.xaxis.type is None
+    assert fig.layout.legend.orientation is None
@@ -0,0 +1,17 @@
+from benchmark import import_seconds
+
+# Loaded lazily by the callbacks that need them, never at import
+LAZY_MODULES = ("shap", "google.generativeai")
+
+
+def test_dashboard_import_skips_shap_and_gemini(tmp_path, monkeypatch):
+    # Keep the dashboard's cache files out of .cache; without stored interactions nothing may compute them
+    for name, file_name in (("COMOMENTS_PATH", "comoments.npz"), ("CARD_STATS_PATH", "card_stats.npz"),
+                            ("SKETCH_PATH", "sketches.npz"), ("SQLITE_PATH", "student.db"),
+                            ("SHAP_INTERACTIONS_PATH", "shap_interactions.npz"), ("JOB_CACHE_DIR", "jobs")):
+        monkeypatch.setenv(name, str(tmp_path / file_name))
+
+    _, loaded = import_seconds(["studentData", "studentIndex", "analyseData"])
+
+    assert "analyseData" in loaded
+    assert [name for name in LAZY_MODULES if name in loaded] == []
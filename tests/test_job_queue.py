@@ -0,0 +1,47 @@
+import threading
+import time
+
+import diskcache
+from dash import DiskcacheManager
+
+from jobQueue import DedupDiskcacheManager
+
+
+def _sleep_job(key, progress_key, args, context):
+    time.sleep(2)
+
+
+def test_simultaneous_identical_jobs_share_one_process(tmp_path, monkeypatch):
+    spawned = []
+    spawn = DiskcacheManager.call_job_fn
+
+    def slow_spawn(self, key, job_fn, args, context):
+        # Widen the window between checking for an in-flight job and recording the new one
+        time.sleep(0.3)
+        pid = spawn(self, key, job_fn, args, context)
+        spawned.append(pid)
+        return pid
+
+    monkeypatch.setattr(DiskcacheManager, "call_job_fn", slow_spawn)
+    manager = DedupDiskcacheManager(diskcache.Cache(str(tmp_path)))
+    start = threading.Barrier(2)
+    pids = []
+
+    def request():
+        start.wait()
+        pids.append(manager.call_job_fn("same-key", _sleep_job, (), {}))
+
+    threads = [threading.Thread(target=request) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    try:
+        assert len(spawned) == 1
+        assert pids == [spawned[0], spawned[0]]
+        # The process is only killed once both requests cancel it
+        manager.terminate_job(pids[0])
+        assert manager.job_running(pids[0])
+    finally:
+        manager.terminate_job(pids[0])
@@ -0,0 +1,10 @@
+import metrics
+
+
+def test_label_values_are_escaped():
+    metrics.reset()
+    metrics.count("ask_total", question='C:\\data "all"\nrows')
+
+    lines = metrics.render_metrics().splitlines()
+
+    assert 'ask_total{question="C:\\\\data \\"all\\"\\nrows"} 1.0' in lines
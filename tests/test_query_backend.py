@@ -0,0 +1,50 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from queryBackend import AGGREGATES, SqliteBackend, aggregate_sql, build_database, check_parity
+from studentData import GRADE_COLS, SOURCE_FILES, load_sources, merge_sources
+from syntheticData import write_sources
+
+
+def sqlite_parity(directory, tmp_path):
+    backend = SqliteBackend(build_database(str(tmp_path / "student.db"), directory))
+    return check_parity(merge_sources(*load_sources(directory)), backend)
+
+
+def test_every_aggregate_matches_pandas_on_shipped_data(shipped_data, tmp_path):
+    assert sqlite_parity(shipped_data, tmp_path) == {}
+
+
+@pytest.fixture
+def synthetic_cohort(tmp_path):
+    directory = str(tmp_path / "data")
+    write_sources(directory, 4000, seed=3)
+    # Some students without any course grade at all, besides the partly missing ones
+    path = os.path.join(directory, SOURCE_FILES["academic"])
+    academic = pd.read_csv(path)
+    academic.loc[:24, GRADE_COLS] = np.nan
+    academic.to_csv(path, index=False)
+    return directory
+
+
+def test_every_aggregate_matches_pandas_on_synthetic_cohort(synthetic_cohort, tmp_path):
+    merged = merge_sources(*load_sources(synthetic_cohort))
+    assert merged[GRADE_COLS].isna().all(axis=1).any()
+    assert merged[GRADE_COLS].isna().any(axis=1).sum() > merged[GRADE_COLS].isna().all(axis=1).sum()
+
+    assert sqlite_parity(synthetic_cohort, tmp_path) == {}
+
+
+def test_parity_covers_every_aggregate(synthetic_cohort, tmp_path):
+    backend = SqliteBackend(build_database(str(tmp_path / "student.db"), synthetic_cohort))
+    for name in AGGREGATES:
+        assert not backend.aggregate(name).empty, name
+
+
+def test_where_value_is_bound_as_parameter():
+    sql, params = aggregate_sql(AGGREGATES["dropouts_by_date"])
+    assert "Incomplete" not in sql
+    assert params == ["Incomplete"]
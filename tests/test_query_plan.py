@@ -0,0 +1,44 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import metrics
+from llmBackend import StubBackend
+from queryPlan import PLAN_PROMPT, PlanError, answer_question, parse_plan
+
+
+def _frame():
+    return pd.DataFrame({
+        "District": pd.Series(["Kampala", np.nan, "Wakiso", 1.5], dtype=object),
+        "Enrolled": pd.to_datetime(["2024-01-01", "2024-02-01", None, "2024-03-01"]),
+        "Average Grade": [70.0, 65.0, np.nan, 80.0],
+    })
+
+
+@pytest.mark.parametrize("value", ["", None, "not a date"])
+def test_empty_or_invalid_dates_are_rejected(value):
+    plan = {"filters": [{"column": "Enrolled", "op": ">", "value": value}]}
+    with pytest.raises(PlanError):
+        parse_plan(json.dumps(plan), _frame())
+
+
+def test_plan_failing_on_the_data_falls_back_to_the_sample_prompt():
+    # Parses, but < between the mixed values of District raises in pandas
+    plan = {"filters": [{"column": "District", "op": "<", "value": "M"}],
+            "metrics": [{"column": "Average Grade", "agg": "mean"}]}
+    prompts = []
+
+    def answer(prompt):
+        prompts.append(prompt)
+        return json.dumps(plan) if prompt.startswith(PLAN_PROMPT[:PLAN_PROMPT.index("\n")]) else "fallback"
+
+    metrics.reset()
+    reply = answer_question(StubBackend(answer=answer), _frame(), "Which districts start before M?", mode="plan")
+
+    assert reply == "fallback"
+    assert "DataFrame (sample)" in prompts[-1]
+    outcomes = {labels: value for (name, labels), value in metrics.snapshot()["counters"].items()
+                if name == "ask_plan_total"}
+    assert outcomes == {(("outcome", "invalid"),): 1}
@@ -0,0 +1,43 @@
+import os
+
+from dash import Dash, dcc, html
+
+from snapshotExport import export_snapshot
+
+
+def _app(title):
+    app = Dash(__name__)
+    app.layout = html.Div([html.H4(title), dcc.Graph(figure={"data": [{"y": [1, 2, 3]}]})])
+    return app
+
+
+def _releases(tmp_path):
+    return sorted(name for name in os.listdir(tmp_path) if name.startswith("snapshot."))
+
+
+def test_export_publishes_through_a_symlink(tmp_path):
+    output = str(tmp_path / "snapshot")
+
+    export_snapshot(_app("First"), output, plotlyjs="cdn")
+    first = os.readlink(output)
+    index = export_snapshot(_app("Second"), output, plotlyjs="cdn")
+
+    assert os.path.islink(output)
+    assert os.readlink(output) != first
+    # Only the published release is left behind
+    assert _releases(tmp_path) == [os.readlink(output)]
+    with open(index, encoding="utf-8") as f:
+        assert "Second" in f.read()
+
+
+def test_export_replaces_a_plain_output_directory(tmp_path):
+    output = tmp_path / "snapshot"
+    output.mkdir()
+    (output / "index.html").write_text("old export")
+
+    index = export_snapshot(_app("Fresh"), str(output), plotlyjs="cdn")
+
+    assert os.path.islink(output)
+    assert _releases(tmp_path) == [os.readlink(output)]
+    with open(index, encoding="utf-8") as f:
+        assert "Fresh" in f.read()
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from streamingStats import SKETCH_COLUMNS, SKETCH_K, SKETCH_SEGMENT, QuantileSketch, QuantileSketches, quantile_error
+from studentData import add_grade_columns, load_merged
+from syntheticData import write_sources
+
+
+# Documented normalised rank error of a k=200 sketch, at 99% confidence
+RANK_ERROR_BOUND = 0.0165
+
+
+def merged_sketch(values, parts):
+    """One sketch per part of values, merged like partitions or workers would be."""
+    sketches = [QuantileSketch(seed=seed).update(part) for seed, part in enumerate(np.array_split(values, parts))]
+    merged = sketches[0]
+    for sketch in sketches[1:]:
+        merged.merge(sketch)
+    return merged
+
+
+@pytest.mark.parametrize("distribution", ["normal", "lognormal", "integers"])
+def test_merged_sketch_stays_within_rank_error_bound(distribution):
+    rng = np.random.default_rng(1)
+    values = {
+        "normal": rng.normal(3, 1, 200_000),
+        "lognormal": rng.lognormal(0, 1, 200_000),
+        "integers": rng.integers(0, 50, 200_000).astype(float),
+    }[distribution]
+    sketch = merged_sketch(values, parts=8)
+
+    assert not sketch.exact
+    assert sketch.n == values.size
+    assert sketch.mean == pytest.approx(values.mean())
+    assert sketch.std() == pytest.approx(values.std(ddof=1))
+    assert quantile_error(values, sketch) <= RANK_ERROR_BOUND
+
+
+def test_sketch_is_exact_up_to_k():
+    values = np.random.default_rng(2).normal(size=SKETCH_K)
+    sketch = merged_sketch(values, parts=4)
+
+    assert sketch.exact
+    qs = np.linspace(0, 1, 21)
+    np.testing.assert_allclose(sketch.quantile(qs), np.quantile(values, qs))
+
+
+def test_histogram_counts_within_rank_error_bound():
+    values = np.random.default_rng(3).normal(size=100_000)
+    sketch = merged_sketch(values, parts=5)
+
+    counts, edges = sketch.histogram(bins=20, range=(-4, 4))
+    exact, exact_edges = np.histogram(values, bins=20, range=(-4, 4))
+
+    np.testing.assert_array_equal(edges, exact_edges)
+    assert np.abs(counts - exact).max() <= 2 * RANK_ERROR_BOUND * values.size
+
+
+def test_grade_sketches_of_synthetic_partitions_match_pandas(tmp_path):
+    merged = add_grade_columns(load_merged(write_sources(str(tmp_path), 120_000, seed=4)))
+    partitions = np.array_split(np.arange(len(merged)), 6)
+    sketches = QuantileSketches(SKETCH_COLUMNS, segment=SKETCH_SEGMENT)
+    for rows in partitions:
+        sketches.merge(QuantileSketches(SKETCH_COLUMNS, segment=SKETCH_SEGMENT).update(merged.iloc[rows]))
+
+    for segment in [None] + sketches.segments():
+        part = merged if segment is None else merged[merged[SKETCH_SEGMENT] == segment]
+        for column in SKETCH_COLUMNS:
+            sketch = sketches.sketch(column, segment)
+            assert sketch.n == part[column].notna().sum()
+            assert sketch.n > SKETCH_K
+            assert quantile_error(pd.to_numeric(part[column]), sketch) <= RANK_ERROR_BOUND
@@ -0,0 +1,27 @@
+import pytest
+
+from studentData import load_merged
+from syntheticData import write_sources
+from timePyramid import VIEWS, TimePyramid, check_views, raw_views
+
+
+def test_day_views_match_raw_group_bys_on_shipped_data(shipped_data):
+    assert check_views(load_merged(shipped_data)) == {}
+
+
+@pytest.mark.parametrize("days", [30, 800])
+def test_day_views_match_raw_group_bys_on_synthetic_cohort(tmp_path, days):
+    merged_df = load_merged(write_sources(str(tmp_path), 40 * days, seed=5, days=days, start="2015-01-01"))
+    assert check_views(merged_df) == {}
+
+
+def test_check_views_covers_every_view(shipped_data):
+    assert set(raw_views(load_merged(shipped_data))) == set(VIEWS)
+
+
+def test_coarser_levels_add_up_to_the_day_level(tmp_path):
+    pyramid = TimePyramid.from_frame(load_merged(write_sources(str(tmp_path), 40 * 800, seed=6, days=800,
+                                                               start="2015-01-01")))
+    day = pyramid.view("forum_posts", level="day")["Forum Posts"].sum()
+    for level in ("week", "month"):
+        assert pyramid.view("forum_posts", level=level)["Forum Posts"].sum() == day
@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+"""
+Day, week and month pre-aggregates of the behaviour and outcome metrics the
+temporal charts plot, so a chart over any date window is read from a few
+hundred buckets instead of grouping every row by Date.
+
+    pyramid = TimePyramid.from_frame(merged_df)
+    pyramid.resolution(start, end)                # "day", "week" or "month"
+    pyramid.view("forum_posts", start, end)       # Date, Forum Posts
+
+    python timePyramid.py --days 30 365 3650 --students 200
+
+Every level holds additive statistics per non-empty bucket (row counts,
+sums and non-missing counts, forum posts per weekday), so means are exact
+ratios and coarser levels are sums of the day level. resolution() picks the
+finest level with at most MAX_POINTS buckets in the window and view() slices
+that level by binary search: the cost depends on MAX_POINTS, not on how many
+rows or years of behaviour logs the cohort has. Buckets that overlap the
+window are included whole, so a week or month view may reach a few days past
+its ends.
+
+VIEWS are the datasets of the temporal figures, with the columns of the
+queryBackend aggregates they replace:
+
+  forum_posts     Date, Forum Posts (sum)              fig_forum_2
+  average_grade   Date, Average Grade (legacy, mean)   fig_progress
+  dropouts        Date, StudentID (Incomplete rows)    fig_dropout
+  seasonal        Month, study hours and grade means   fig_seasonal, always monthly
+  weekday         Weekday, Forum Posts (sum)           fig_weekly
+
+The CLI builds synthetic cohorts over more and more days, times the raw
+group-bys against the pyramid views over the whole range and checks that the
+day-level views equal them (check_views); it exits 1 on a mismatch.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+
+MAX_POINTS = int(os.getenv("TIMELINE_MAX_POINTS", 400))
+# Finest first: name -> pandas period frequency
+LEVELS = {"day": "D", "week": "W", "month": "M"}
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+VIEWS = ("forum_posts", "average_grade", "dropouts", "seasonal", "weekday")
+
+STUDY_HOURS = "Time Spent On Materials (Hours)"
+# The temporal aggregates average the legacy grade scale (queryBackend.AGGREGATES)
+GRADE_COLUMNS = ("Average Grade (legacy)", "Average Grade")
+
+
+class TimePyramid:
+    """Bucketed sums of the temporal metrics at every level of LEVELS."""
+
+    def __init__(self, levels):
+        # level -> DataFrame indexed by bucket start, sorted
+        self.levels = levels
+        self._starts = {level: frame.index.to_numpy() for level, frame in levels.items()}
+
+    @classmethod
+    def from_frame(cls, merged_df):
+        df = merged_df
+        dates = pd.to_datetime(df["Date"])
+        grade = df[next(col for col in GRADE_COLUMNS if col in df.columns)]
+        weekday = dates.dt.dayofweek.to_numpy()
+        stats = pd.DataFrame({
+            "rows": 1,
+            "forum_posts": df["Forum Posts"],
+            "study_hours_sum": df[STUDY_HOURS].fillna(0),
+            "study_hours_count": df[STUDY_HOURS].notna(),
+            "grade_sum": grade.fillna(0),
+            "grade_count": grade.notna(),
+            "dropouts": (df["Course Completion"] == "Incomplete") & df["StudentID"].notna(),
+        }, index=df.index)
+        for number, name in enumerate(WEEKDAYS):
+            stats[f"posts:{name}"] = df["Forum Posts"].where(weekday == number, 0)
+            stats[f"rows:{name}"] = weekday == number
+        stats = stats.astype({col: np.int64 for col in stats.columns if stats[col].dtype == bool})
+
+        day = stats.groupby(dates.dt.normalize().to_numpy(), sort=True).sum()
+        day.index = pd.DatetimeIndex(day.index)
+        levels = {}
+        for level, freq in LEVELS.items():
+            frame = day
+            if freq != "D":
+                frame = day.groupby(day.index.to_period(freq), sort=True).sum()
+                frame.index = frame.index.start_time
+            levels[level] = frame
+        return cls(levels)
+
+    @property
+    def date_range(self):
+        """(first, last) day with data, or (None, None) when there is none."""
+        starts = self._starts["day"]
+        if not len(starts):
+            return None, None
+        return pd.Timestamp(starts[0]), pd.Timestamp(starts[-1])
+
+    def window(self, level, start=None, end=None):
+        """Buckets of level overlapping [start, end], both days included."""
+        frame, starts = self.levels[level], self._starts[level]
+        lo, hi = 0, len(starts)
+        if start is not None:
+            lo = starts.searchsorted(pd.Timestamp(start).to_period(LEVELS[level]).start_time.to_datetime64())
+        if end is not None:
+            hi = starts.searchsorted(pd.Timestamp(end).to_datetime64(), side="right")
+        return frame.iloc[lo:max(lo, hi)]
+
+    def resolution(self, start=None, end=None, max_points=MAX_POINTS):
+        """Finest level with at most max_points buckets in the window."""
+        for level in LEVELS:
+            if len(self.window(level, start, end)) <= max_points:
+                return level
+        return level
+
+    def view(self, name, start=None, end=None, level=None):
+        """Dataset of VIEWS[name] over [start, end] at level (default: resolution())."""
+        if name not in VIEWS:
+            raise KeyError(f"Unknown timeline view {name!r}; expected one of {', '.join(VIEWS)}")
+        if name == "seasonal":
+            level = "month"
+        level = level or self.resolution(start, end)
+        buckets = self.window(level, start, end)
+        dates = pd.Series(buckets.index, name="Date")
+
+        if name == "forum_posts":
+            return pd.DataFrame({"Date": dates, "Forum Posts": buckets["forum_posts"].to_numpy()})
+        if name == "average_grade":
+            return pd.DataFrame({"Date": dates, "Average Grade": _ratio(buckets, "grade")})
+        if name == "dropouts":
+            counted = buckets[buckets["dropouts"] > 0]
+            return pd.DataFrame({"Date": pd.Series(counted.index, name="Date"),
+                                 "StudentID": counted["dropouts"].to_numpy()})
+        if name == "seasonal":
+            return pd.DataFrame({"Month": buckets.index.to_period("M").astype(str),
+                                 STUDY_HOURS: _ratio(buckets, "study_hours"),
+                                 "Average Grade": _ratio(buckets, "grade")})
+        posts = pd.Series({day: buckets[f"posts:{day}"].sum() for day in WEEKDAYS})
+        present = pd.Series({day: buckets[f"rows:{day}"].sum() > 0 for day in WEEKDAYS})
+        posts = posts.where(present) if not present.all() else posts
+        return posts.rename("Forum Posts").rename_axis("Weekday").reset_index()
+
+
+def _ratio(buckets, stat):
+    """Mean from a bucket sum and its non-missing count; NaN for buckets without values."""
+    counts = buckets[f"{stat}_count"].to_numpy()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, buckets[f"{stat}_sum"].to_numpy() / counts, np.nan)
+
+
+def raw_views(merged_df):
+    """The group-bys over every row that the pyramid views replace, for the CLI."""
+    df = merged_df
+    grade = next(col for col in GRADE_COLUMNS if col in df.columns)
+    return {
+        "forum_posts": df.groupby("Date")["Forum Posts"].sum().reset_index(),
+        "average_grade": df.groupby("Date")[grade].mean().rename("Average Grade").reset_index(),
+        "dropouts": df[df["Course Completion"] == "Incomplete"].groupby("Date")[["StudentID"]].count()
+                    .reset_index(),
+        "seasonal": df.groupby("Month")[[STUDY_HOURS, grade]].mean()
+                    .rename(columns={grade: "Average Grade"}).reset_index(),
+        "weekday": df.groupby("Weekday")["Forum Posts"].sum().reindex(WEEKDAYS).reset_index(),
+    }
+
+
+def check_views(merged_df, pyramid=None):
+    """
+    Compares every day-level view over the whole range with raw_views().
+    Returns a {view: error message} dict, empty when all views match.
+    """
+    pyramid = pyramid or TimePyramid.from_frame(merged_df)
+    mismatches = {}
+    for name, expected in raw_views(merged_df).items():
+        try:
+            pd.testing.assert_frame_equal(pyramid.view(name, level="day"), expected, check_dtype=False)
+        except AssertionError as e:
+            mismatches[name] = str(e)
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--days", type=int, nargs="+", default=[30, 365, 3650])
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    from studentData import load_merged
+    from syntheticData import write_sources
+
+    print(f"{'days':>6} {'rows':>10} {'build s':>9} {'raw s':>8} {'view s':>8} {'level':>6} {'views':>8}")
+    failed = False
+    for days in args.days:
+        with tempfile.TemporaryDirectory() as directory:
+            write_sources(directory, args.students * days, seed=args.seed, days=days, start="2015-01-01")
+            merged_df = load_merged(directory)
+        start = time.perf_counter()
+        pyramid = TimePyramid.from_frame(merged_df)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        raw_views(merged_df)
+        raw = time.perf_counter() - start
+        start = time.perf_counter()
+        for name in VIEWS:
+            pyramid.view(name)
+        view = time.perf_counter() - start
+        mismatches = check_views(merged_df, pyramid)
+        failed = failed or bool(mismatches)
+        print(f"{days:>6} {len(merged_df):>10} {build:>9.3f} {raw:>8.4f} {view:>8.4f} "
+              f"{pyramid.resolution():>6} {', '.join(mismatches) or 'match':>8}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+"""
+Reproducible training of the performance model the dashboard explains.
+
+    python trainModel.py                               # grid search, writes models/<version>/
+    python trainModel.py --workers 4 --folds 5 --publish
+    python trainModel.py --grid quick --data /tmp/cohort
+
+Replaces train.ipynb. The training frame is built by studentData (load_sources
+and merge_sources, the same merged_df the dashboard loads), the target is
+studentData.performance_score and the categorical columns are label-encoded
+the way analyseData.encode_features expects. A cross-validated grid search
+(GridSearchCV) spreads its fits over a pool of --workers processes. The
+hold-out split, the folds and every forest are seeded from --seed, so the same
+data and seed give the same model whatever the number of workers.
+
+Each run writes a version directory, named by UTC time and a hash of the
+training frame:
+
+    models/20261019T101500Z-3f2a9c1e/
+        student_performance_model.pkl
+        label_encoders.pkl
+        drift_reference.json    binned feature distributions (see driftMonitor)
+        metadata.json           features, grid, best parameters, CV and hold-out
+                                metrics, search wall-clock, seed, data fingerprint
+
+--publish also copies the pickles and the drift reference over the ones the
+dashboard loads.
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import GridSearchCV, KFold, train_test_split
+from sklearn.preprocessing import LabelEncoder
+
+from driftMonitor import REFERENCE_FILE, DriftReference
+from studentData import CATEGORICAL_COLS, TARGET_COL, TARGET_WEIGHTS, load_sources, merge_sources, \
+    performance_score
+
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+MODELS_DIR = os.getenv("MODELS_DIR", os.path.join(ROOT, "models"))
+MODEL_FILE = "student_performance_model.pkl"
+ENCODERS_FILE = "label_encoders.pkl"
+METADATA_FILE = "metadata.json"
+
+SEED = 42
+TEST_SIZE = 0.2
+FOLDS = 5
+SCORING = "r2"
+PARAM_GRIDS = {
+    # The notebook's single configuration
+    "quick": {"n_estimators": [100]},
+    "default": {
+        "n_estimators": [100, 200],
+        "max_depth": [None, 8, 16],
+        "min_samples_leaf": [1, 2, 4],
+        "max_features": [1.0, 0.5],
+    },
+}
+# Candidates kept in metadata.json, best first
+TOP_CANDIDATES = 10
+
+
+def training_frame(directory=None):
+    """merged_df for the selected data plus the target column."""
+    df = merge_sources(*load_sources(directory))
+    df[TARGET_COL] = performance_score(df)
+    return df
+
+
+def fit_encoders(df):
+    """One LabelEncoder per categorical column, fitted on its string values."""
+    return {col: LabelEncoder().fit(df[col].astype(str)) for col in CATEGORICAL_COLS if col in df.columns}
+
+
+def encode(df, label_encoders):
+    """(X, y): every column but StudentID and the target, in merged order, categoricals encoded."""
+    features = [col for col in df.columns if col not in (TARGET_COL, "StudentID")]
+    return encode_features(df, label_encoders, features), df[TARGET_COL]
+
+
+def encode_features(df, label_encoders, features):
+    """df[features] with the categorical columns label-encoded and missing values filled with 0."""
+    X = df[list(features)].copy()
+    for col, encoder in label_encoders.items():
+        if col in X.columns:
+            X[col] = encoder.transform(X[col].astype(str))
+    return X.fillna(0)
+
+
+def data_fingerprint(df):
+    """Content hash of the training frame, independent of row order."""
+    row_hashes = np.sort(pd.util.hash_pandas_object(df, index=False).to_numpy())
+    digest = hashlib.sha1(row_hashes.tobytes())
+    digest.update(json.dumps(list(df.columns)).encode())
+    return digest.hexdigest()
+
+
+def search(X, y, grid, folds=FOLDS, workers=1, seed=SEED):
+    """
+    Cross-validated grid search over RandomForestRegressor with the fits run on
+    workers processes. Returns (search, benchmark): the fitted GridSearchCV,
+    refitted on all of X, and its wall-clock figures.
+    """
+    cv = KFold(n_splits=folds, shuffle=True, random_state=seed)
+    grid_search = GridSearchCV(RandomForestRegressor(random_state=seed), grid, scoring=SCORING,
+                               cv=cv, n_jobs=workers, refit=True)
+    start = time.perf_counter()
+    grid_search.fit(X, y)
+    wall = time.perf_counter() - start
+
+    results = grid_search.cv_results_
+    candidates = len(results["params"])
+    # What the same fits would take one after another
+    serial = float(np.sum(results["mean_fit_time"] + results["mean_score_time"]) * folds)
+    benchmark = {
+        "workers": workers,
+        "candidates": candidates,
+        "fits": candidates * folds,
+        "wall_seconds": round(wall, 3),
+        "serial_fit_seconds": round(serial, 3),
+        "speedup": round(serial / wall, 2) if wall else None,
+        "fits_per_second": round(candidates * folds / wall, 2) if wall else None,
+        "refit_seconds": round(grid_search.refit_time_, 3),
+    }
+    return grid_search, benchmark
+
+
+def evaluate(model, X, y):
+    predicted = model.predict(X)
+    return {
+        "r2": float(r2_score(y, predicted)) if len(y) > 1 else None,
+        "mae": float(mean_absolute_error(y, predicted)),
+        "rmse": float(np.sqrt(mean_squared_error(y, predicted))),
+        "rows": int(len(y)),
+    }
+
+
+def train(directory=None, grid="default", folds=FOLDS, workers=1, seed=SEED, test_size=TEST_SIZE):
+    """
+    Builds the features, searches the grid on the training split and scores the
+    best model on the hold-out split. Returns (model, label_encoders, reference,
+    metadata), reference being the drift reference of the whole training frame.
+    """
+    df = training_frame(directory)
+    label_encoders = fit_encoders(df)
+    X, y = encode(df, label_encoders)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=seed)
+
+    param_grid = PARAM_GRIDS[grid] if isinstance(grid, str) else grid
+    grid_search, benchmark = search(X_train, y_train, param_grid, folds=folds, workers=workers, seed=seed)
+    results = grid_search.cv_results_
+    ranked = np.argsort(results["rank_test_score"], kind="stable")[:TOP_CANDIDATES]
+
+    metadata = {
+        "data": {
+            "directory": os.path.abspath(directory or os.getenv("DATA_DIR", "data")),
+            "rows": int(len(df)),
+            "students": int(df["StudentID"].nunique()),
+            "fingerprint": data_fingerprint(df),
+        },
+        "features": list(X.columns),
+        "categorical": list(label_encoders),
+        "target": {"column": TARGET_COL, "weights": TARGET_WEIGHTS},
+        "seed": seed,
+        "split": {"test_size": test_size, "train_rows": int(len(X_train)), "test_rows": int(len(X_test))},
+        "search": {
+            "grid": param_grid,
+            "folds": folds,
+            "scoring": SCORING,
+            "best_params": grid_search.best_params_,
+            "candidates": [{"params": results["params"][i],
+                            "mean_score": float(results["mean_test_score"][i]),
+                            "std_score": float(results["std_test_score"][i])} for i in ranked],
+            "benchmark": benchmark,
+        },
+        "metrics": {
+            "cv": {SCORING: float(grid_search.best_score_),
+                   f"{SCORING}_std": float(results["std_test_score"][grid_search.best_index_])},
+            "train": evaluate(grid_search.best_estimator_, X_train, y_train),
+            "test": evaluate(grid_search.best_estimator_, X_test, y_test),
+        },
+    }
+    reference = DriftReference.from_frame(df, X.columns)
+    return grid_search.best_estimator_, label_encoders, reference, metadata
+
+
+def write_artifacts(model, label_encoders, reference, metadata, models_dir=MODELS_DIR):
+    """Writes a new version directory under models_dir and returns its path."""
+    created = datetime.now(timezone.utc)
+    version = f"{created:%Y%m%dT%H%M%SZ}-{metadata['data']['fingerprint'][:8]}"
+    metadata = {"version": version, "created": created.isoformat(timespec="seconds"),
+                **metadata, "environment": _environment()}
+
+    target = os.path.join(models_dir, version)
+    tmp_dir = os.path.join(models_dir, f".{version}.tmp-{os.getpid()}")
+    os.makedirs(tmp_dir)
+    joblib.dump(model, os.path.join(tmp_dir, MODEL_FILE))
+    joblib.dump(label_encoders, os.path.join(tmp_dir, ENCODERS_FILE))
+    reference.save(os.path.join(tmp_dir, REFERENCE_FILE))
+    with open(os.path.join(tmp_dir, METADATA_FILE), "w") as f:
+        json.dump(metadata, f, indent=2, default=str)
+    os.rename(tmp_dir, target)
+    return target
+
+
+def publish(version_dir, destination=ROOT):
+    """Copies a version's artifacts over the ones the dashboard loads, one atomic replace each."""
+    for name in (MODEL_FILE, ENCODERS_FILE, REFERENCE_FILE):
+        tmp_path = os.path.join(destination, f".{name}.tmp-{os.getpid()}")
+        shutil.copyfile(os.path.join(version_dir, name), tmp_path)
+        os.replace(tmp_path, os.path.join(destination, name))
+
+
+def _environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "sklearn": sklearn.__version__,
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "cpus": os.cpu_count(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--data", help="data directory (default DATA_DIR)")
+    parser.add_argument("--grid", choices=sorted(PARAM_GRIDS), default="default")
+    parser.add_argument("--folds", type=int, default=FOLDS)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="processes for the search fits (default: one per CPU)")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--test-size", type=float, default=TEST_SIZE)
+    parser.add_argument("--models-dir", default=MODELS_DIR)
+    parser.add_argument("--publish", action="store_true",
+                        help="copy the new model over the one the dashboard loads")
+    args = parser.parse_args(argv)
+
+    model, label_encoders, reference, metadata = train(args.data, grid=args.grid, folds=args.folds,
+                                            workers=args.workers, seed=args.seed,
+                                            test_size=args.test_size)
+    version_dir = write_artifacts(model, label_encoders, reference, metadata, args.models_dir)
+    if args.publish:
+        publish(version_dir)
+
+    benchmark = metadata["search"]["benchmark"]
+    print(version_dir)
+    print(f"best {metadata['search']['best_params']}  "
+          f"cv {SCORING} {metadata['metrics']['cv'][SCORING]:.4f}  "
+          f"test rmse {metadata['metrics']['test']['rmse']:.4f}")
+    print(f"{benchmark['fits']} fits on {benchmark['workers']} workers in {benchmark['wall_seconds']}s "
+          f"(serial {benchmark['serial_fit_seconds']}s, x{benchmark['speedup']})")
+
+
+if __name__ == "__main__":
+    sys.exit(main())